@@ -0,0 +1,3 @@
+"""
+Shared CVAT annotation utilities used by all pipeline stages.
+"""
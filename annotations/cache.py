@@ -0,0 +1,232 @@
+"""
+Columnar cache of CVAT annotations
+
+Each annotations.xml is parsed once into one .npy file per column
+(frame, track_id, class_id, x1, y1, x2, y2, outside, label_id, team_id),
+which later runs memory-map instead of parsing the XML again. The cache is
+rebuilt automatically when the XML's size, mtime or content hash changes.
+"""
+
+import hashlib
+import json
+import os
+from array import array
+from pathlib import Path
+
+import numpy as np
+
+from annotations.cvat import Box, Track, read_meta, iter_boxes
+
+# Caches are stored next to the pipeline outputs (source data is read-only)
+CACHE_DIR = Path('/cluster/work/tmstorma/Football2025/annotation_cache')
+
+# Bump when the column layout or class mapping changes so old caches are rebuilt
+CACHE_VERSION = 3
+
+COLUMNS = {
+    'frame': np.int32,
+    'track_id': np.int32,
+    'class_id': np.int8,
+    'x1': np.float64,
+    'y1': np.float64,
+    'x2': np.float64,
+    'y2': np.float64,
+    'outside': np.int8,
+    'label_id': np.int16,
+    'team_id': np.int16,
+}
+
+# array typecodes used while streaming the XML
+_TYPECODES = {
+    'frame': 'i', 'track_id': 'i', 'class_id': 'b',
+    'x1': 'd', 'y1': 'd', 'x2': 'd', 'y2': 'd',
+    'outside': 'b', 'label_id': 'h', 'team_id': 'h',
+}
+
+
+class AnnotationTable:
+    """
+    Memory-mapped columns of one annotations.xml.
+    Rows are in document order (grouped by track), one row per box.
+    """
+
+    def __init__(self, columns, meta):
+        self.columns = columns
+        self.meta = meta
+        self.labels = meta['labels']
+        self.teams = meta['teams']
+
+    def __len__(self):
+        return len(self.columns['frame'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def frames(self):
+        return self.meta['frames']
+
+    @property
+    def width(self):
+        return self.meta['width']
+
+    @property
+    def height(self):
+        return self.meta['height']
+
+    def label_id(self, label):
+        """Column value for a label name (-1 if the label never occurs)"""
+        return self.labels.index(label) if label in self.labels else -1
+
+    def team_id(self, team):
+        """Column value for a team name (-1 if the team never occurs)"""
+        return self.teams.index(team) if team in self.teams else -1
+
+    def iter_boxes(self, rows=None):
+        """
+        Yield rows as cvat.Box records.
+        rows optionally selects a subset: a boolean mask or an array of row indices.
+        """
+        if rows is not None:
+            rows = np.asarray(rows)
+            if rows.dtype == bool:
+                rows = np.flatnonzero(rows)
+        cols = [self.columns[name] if rows is None else self.columns[name][rows]
+                for name in COLUMNS]
+        labels = self.labels + [None]
+        teams = self.teams + [None]
+
+        for frame, track_id, class_id, x1, y1, x2, y2, outside, label_id, team_id in zip(
+                *(col.tolist() for col in cols)):
+            yield Box(frame, track_id, class_id, x1, y1, x2, y2, outside,
+                      labels[label_id], teams[team_id])
+
+    def iter_tracks(self):
+        """Yield cvat.Track records in document order"""
+        track_ids = self.columns['track_id']
+        if len(track_ids) == 0:
+            return
+
+        starts = np.flatnonzero(np.diff(track_ids)) + 1
+        bounds = np.concatenate(([0], starts, [len(track_ids)]))
+        boxes = list(self.iter_boxes())
+
+        for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            yield Track(track_id=boxes[start].track_id, label=boxes[start].label,
+                        boxes=boxes[start:end])
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-1 of a file's content, read in chunks"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_path(xml_path, cache_dir=None):
+    """Cache directory for one XML file, e.g. <cache_dir>/RBK-AALESUND-1a2b3c4d5e6f"""
+    xml_path = Path(xml_path).resolve()
+    key = hashlib.sha1(str(xml_path).encode()).hexdigest()[:12]
+    name = xml_path.parent.name or 'annotations'
+    return Path(cache_dir or CACHE_DIR) / f'{name}-{key}'
+
+
+def _is_valid(meta, xml_path, stat):
+    """Check a cache's meta.json against the current XML file"""
+    if meta.get('version') != CACHE_VERSION or meta.get('size') != stat.st_size:
+        return False
+    if meta.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+
+    # Same size but touched: only the content hash can tell
+    return meta.get('sha1') == file_hash(xml_path)
+
+
+def _write_meta(out_dir, meta):
+    """Atomically replace a cache's meta.json"""
+    tmp_meta = out_dir / f'meta.{os.getpid()}.tmp.json'
+    with open(tmp_meta, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_meta, out_dir / 'meta.json')
+
+
+def build_cache(xml_path, cache_dir=None):
+    """Parse the XML once and write its columns and meta.json to the cache"""
+    xml_path = Path(xml_path)
+    out_dir = cache_path(xml_path, cache_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    stat = xml_path.stat()
+    sha1 = file_hash(xml_path)
+
+    buffers = {name: array(code) for name, code in _TYPECODES.items()}
+    labels = {}
+    teams = {}
+
+    for box in iter_boxes(xml_path):
+        buffers['frame'].append(box.frame)
+        buffers['track_id'].append(box.track_id)
+        buffers['class_id'].append(box.class_id)
+        buffers['x1'].append(box.xtl)
+        buffers['y1'].append(box.ytl)
+        buffers['x2'].append(box.xbr)
+        buffers['y2'].append(box.ybr)
+        buffers['outside'].append(box.outside)
+        buffers['label_id'].append(labels.setdefault(box.label, len(labels)))
+        buffers['team_id'].append(-1 if box.team is None else teams.setdefault(box.team, len(teams)))
+
+    # Columns first, meta.json last: a cache is only valid once its meta exists
+    pid = os.getpid()
+    for name, dtype in COLUMNS.items():
+        tmp_path = out_dir / f'{name}.{pid}.tmp.npy'
+        np.save(tmp_path, np.frombuffer(buffers[name], dtype=dtype))
+        os.replace(tmp_path, out_dir / f'{name}.npy')
+
+    meta = read_meta(xml_path)
+    meta.update({
+        'version': CACHE_VERSION,
+        'xml_path': str(xml_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha1': sha1,
+        'rows': len(buffers['frame']),
+        'labels': list(labels),
+        'teams': list(teams),
+    })
+
+    _write_meta(out_dir, meta)
+
+    return meta
+
+
+def load_annotations(xml_path, cache_dir=None):
+    """
+    Load an annotations.xml as an AnnotationTable, building or refreshing
+    the cache when the XML has changed since it was written.
+    """
+    xml_path = Path(xml_path)
+    out_dir = cache_path(xml_path, cache_dir)
+    meta_path = out_dir / 'meta.json'
+    stat = xml_path.stat()
+
+    meta = None
+    if meta_path.exists():
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+        if not _is_valid(meta, xml_path, stat):
+            meta = None
+        elif meta['mtime_ns'] != stat.st_mtime_ns:
+            # Content unchanged: record the new mtime so the hash is skipped next time
+            meta['mtime_ns'] = stat.st_mtime_ns
+            _write_meta(out_dir, meta)
+
+    if meta is None:
+        meta = build_cache(xml_path, cache_dir)
+
+    # Empty files cannot be memory-mapped
+    mmap_mode = 'r' if meta['rows'] else None
+    columns = {name: np.load(out_dir / f'{name}.npy', mmap_mode=mmap_mode) for name in COLUMNS}
+    return AnnotationTable(columns, meta)
@@ -0,0 +1,125 @@
+"""
+Streaming reader for CVAT video annotations (annotations.xml)
+
+Elements are freed as soon as they are consumed, so memory stays bounded by a
+single box regardless of match length. All stages read boxes through here so
+the team attribute and class mapping are resolved in one place.
+"""
+
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from itertools import groupby
+
+# 4-class configuration shared by training, tracking and analysis
+CLASS_NAMES = {0: 'home', 1: 'away', 2: 'referee', 3: 'ball'}
+TEAM_CLASSES = {'home': 0, 'away': 1, 'referee': 2}
+BALL_CLASS = 3
+
+# frame is the XML frame (0-indexed); image frame_{frame+1:06d}.png
+# class_id is -1 for boxes outside the 4-class configuration (e.g. event_labels)
+Box = namedtuple('Box', ['frame', 'track_id', 'class_id', 'xtl', 'ytl', 'xbr', 'ybr',
+                         'outside', 'label', 'team'])
+
+Track = namedtuple('Track', ['track_id', 'label', 'boxes'])
+
+
+def box_class(label, team):
+    """
+    Map a track label and per-box team attribute to a class id (-1 if unmapped).
+    Only 'player' boxes are mapped through their own team attribute, matched exactly
+    (no stripping or case folding).
+    """
+    if label == 'ball':
+        return BALL_CLASS
+    if label == 'player':
+        return TEAM_CLASSES.get(team, -1)
+    return -1
+
+
+def read_meta(xml_path):
+    """
+    Read task metadata without parsing the tracks.
+    Returns: dict with 'frames', 'width' and 'height' (None when missing)
+    """
+    meta = {'frames': None, 'width': None, 'height': None}
+
+    for _, elem in ET.iterparse(str(xml_path), events=('end',)):
+        if elem.tag != 'meta':
+            continue
+
+        size_elem = elem.find('task/size')
+        if size_elem is None:
+            size_elem = elem.find('.//size')
+        if size_elem is not None:
+            meta['frames'] = int(size_elem.text)
+
+        original_size = elem.find('.//original_size')
+        if original_size is not None:
+            meta['width'] = int(original_size.find('width').text)
+            meta['height'] = int(original_size.find('height').text)
+        break
+
+    return meta
+
+
+def iter_boxes(xml_path):
+    """
+    Stream every box in the file as a normalized Box record.
+
+    Boxes are yielded in document order (grouped by track). Outside boxes and
+    boxes of unmapped labels are included so callers decide what to skip.
+    """
+    context = ET.iterparse(str(xml_path), events=('start', 'end'))
+    _, root = next(context)
+
+    track = None
+    track_id = None
+    label = None
+
+    for event, elem in context:
+        if event == 'start':
+            if elem.tag == 'track':
+                track = elem
+                track_id = int(elem.get('id'))
+                label = elem.get('label')
+            continue
+
+        if elem.tag == 'box' and track is not None:
+            team = None
+            for attr in elem.findall('attribute'):
+                if attr.get('name') == 'team':
+                    team = attr.text
+                    break
+
+            yield Box(
+                frame=int(elem.get('frame')),
+                track_id=track_id,
+                class_id=box_class(label, team),
+                xtl=float(elem.get('xtl')),
+                ytl=float(elem.get('ytl')),
+                xbr=float(elem.get('xbr')),
+                ybr=float(elem.get('ybr')),
+                outside=int(elem.get('outside', '0')),
+                label=label,
+                team=team
+            )
+
+            # Free the box right away so long tracks do not accumulate
+            track.remove(elem)
+
+        elif elem.tag == 'track':
+            track = None
+            root.clear()
+
+        elif elem.tag == 'meta':
+            root.clear()
+
+
+def iter_tracks(xml_path):
+    """
+    Stream tracks as Track records holding the list of their boxes.
+    Only one track is held in memory at a time.
+    """
+    for track_id, boxes in groupby(iter_boxes(xml_path), key=lambda box: box.track_id):
+        boxes = list(boxes)
+        yield Track(track_id=track_id, label=boxes[0].label, boxes=boxes)
@@ -0,0 +1,155 @@
+"""
+Lookup indexes over an AnnotationTable
+
+FrameIndex groups rows by frame once, so any frame's boxes are a single
+slice instead of a scan over every track.
+
+TrackIndex groups rows by track and keeps an interval index over track
+lifetimes, so "which tracks are alive in frames [a, b]" and "boxes of
+track T in [a, b]" are binary searches instead of loops over all tracks.
+"""
+
+import numpy as np
+
+
+class FrameIndex:
+    """
+    Rows of an AnnotationTable grouped by frame.
+    Build once per match, then query any frame in O(1).
+    """
+
+    def __init__(self, table):
+        self.table = table
+        frames = np.asarray(table['frame'])
+
+        # Stable sort keeps document (track) order within a frame
+        self.order = np.argsort(frames, kind='stable')
+        num_frames = max(int(frames.max()) + 1 if len(frames) else 0, table.frames or 0)
+        counts = np.bincount(frames, minlength=num_frames)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def rows(self, frame):
+        """Row indices of all boxes in an XML frame (0-indexed)"""
+        if frame < 0 or frame >= len(self):
+            return self.order[:0]
+        return self.order[self.offsets[frame]:self.offsets[frame + 1]]
+
+    def boxes(self, frame):
+        """cvat.Box records of one frame"""
+        return list(self.table.iter_boxes(self.rows(frame)))
+
+    def class_rows(self, frame, class_id):
+        """Row indices of the boxes of one class (0-3) in a frame"""
+        rows = self.rows(frame)
+        return rows[self.table['class_id'][rows] == class_id]
+
+    def class_boxes(self, frame, class_id):
+        """cvat.Box records of one class (0-3) in a frame"""
+        return list(self.table.iter_boxes(self.class_rows(frame, class_id)))
+
+
+class TrackIndex:
+    """
+    Rows of an AnnotationTable grouped by track, plus an interval index
+    over track lifetimes [first frame, last frame].
+    Tracks are listed in document order, like AnnotationTable.iter_tracks().
+    """
+
+    def __init__(self, table):
+        self.table = table
+        track_ids = np.asarray(table['track_id'])
+        frames = np.asarray(table['frame'])
+
+        # Rows sorted by (track, frame): each track is one contiguous slice
+        self.order = np.lexsort((frames, track_ids))
+        sorted_ids = track_ids[self.order]
+        ids, first_pos, counts = np.unique(sorted_ids, return_index=True, return_counts=True)
+
+        # Document order = order of each track's first row in the table
+        first_row = np.minimum.reduceat(self.order, first_pos) if len(ids) else first_pos
+        doc_order = np.argsort(first_row, kind='stable')
+
+        self.track_ids = ids[doc_order]
+        self.row_start = first_pos[doc_order]
+        self.row_end = (first_pos + counts)[doc_order]
+        self.start = frames[self.order[self.row_start]] if len(ids) else np.zeros(0, dtype=np.int32)
+        self.end = frames[self.order[self.row_end - 1]] if len(ids) else np.zeros(0, dtype=np.int32)
+        self.first_row = first_row[doc_order]
+        self.positions = {track_id: i for i, track_id in enumerate(self.track_ids.tolist())}
+
+        # Interval index: lifetimes sorted by start, with the running maximum
+        # of their ends. Tracks before the first running max >= a all end
+        # before a, so a query only looks at a window of candidates.
+        self.by_start = np.argsort(self.start, kind='stable')
+        self.sorted_start = self.start[self.by_start]
+        self.max_end = np.maximum.accumulate(self.end[self.by_start]) if len(ids) else self.end
+
+    def __len__(self):
+        return len(self.track_ids)
+
+    def __contains__(self, track_id):
+        return track_id in self.positions
+
+    def span(self, track_id):
+        """(first frame, last frame) of a track"""
+        i = self.positions[track_id]
+        return int(self.start[i]), int(self.end[i])
+
+    def label(self, track_id):
+        """Label of a track ('player', 'ball', ...)"""
+        label_id = self.table['label_id'][self.first_row[self.positions[track_id]]]
+        return self.table.labels[label_id]
+
+    def team(self, track_id):
+        """Team attribute of a track's first box (None if it has none)"""
+        team_id = self.table['team_id'][self.first_row[self.positions[track_id]]]
+        return self.table.teams[team_id] if team_id >= 0 else None
+
+    def rows(self, track_id, a=None, b=None):
+        """Row indices of a track's boxes in frame order, optionally limited to frames [a, b]"""
+        i = self.positions[track_id]
+        rows = self.order[self.row_start[i]:self.row_end[i]]
+        if a is None and b is None:
+            return rows
+
+        frames = self.table['frame'][rows]
+        lo = 0 if a is None else np.searchsorted(frames, a, side='left')
+        hi = len(rows) if b is None else np.searchsorted(frames, b, side='right')
+        return rows[lo:hi]
+
+    def boxes(self, track_id, a=None, b=None):
+        """cvat.Box records of a track, optionally limited to frames [a, b]"""
+        return list(self.table.iter_boxes(self.rows(track_id, a, b)))
+
+    def frames(self, track_id, a=None, b=None):
+        """Frame numbers of a track's boxes"""
+        return np.asarray(self.table['frame'][self.rows(track_id, a, b)])
+
+    def centers(self, track_id, a=None, b=None):
+        """(N, 2) box centers of a track"""
+        rows = self.rows(track_id, a, b)
+        x = (self.table['x1'][rows] + self.table['x2'][rows]) / 2
+        y = (self.table['y1'][rows] + self.table['y2'][rows]) / 2
+        return np.column_stack((x, y))
+
+    def xyxy(self, track_id, a=None, b=None):
+        """(N, 4) boxes of a track as xtl, ytl, xbr, ybr"""
+        rows = self.rows(track_id, a, b)
+        return np.column_stack([self.table[name][rows] for name in ('x1', 'y1', 'x2', 'y2')])
+
+    def alive(self, a, b):
+        """Track ids whose lifetime overlaps frames [a, b], in document order"""
+        lo = np.searchsorted(self.max_end, a, side='left')
+        hi = np.searchsorted(self.sorted_start, b, side='right')
+        candidates = self.by_start[lo:hi]
+        hits = np.sort(candidates[self.end[candidates] >= a])
+        return self.track_ids[hits]
+
+    def starting(self, a, b):
+        """Track ids whose first frame is in [a, b], in document order"""
+        lo = np.searchsorted(self.sorted_start, a, side='left')
+        hi = np.searchsorted(self.sorted_start, b, side='right')
+        return self.track_ids[np.sort(self.by_start[lo:hi])]
@@ -0,0 +1,193 @@
+"""
+Packed per-split YOLO label store
+
+A split (train or val) is stored as one directory instead of one .txt per frame:
+    boxes.npy    all boxes of the split, concatenated frame after frame
+    offsets.npy  boxes of frame i are boxes[offsets[i]:offsets[i + 1]]
+    index.json   frame names (label file stems) in storage order
+
+The shards are the converter's only label output. Boxes keep its float64
+values, so export_yolo writes the same bytes the converter used to write for
+per-frame .txt labels; it rewrites only the labels whose content changed.
+
+Shards replace the per-frame label I/O of the YOLO training labels only (the
+converter writes them, validate_conversion reads them, export_yolo writes the
+.txt files Ultralytics requires). Tracking ground truth (prepare_hota_data,
+evaluate_generalization_metrics, and compute_tracking_metrics through the MOT
+files) stays on the annotation cache: it needs pixel boxes, also covers
+matches and frames outside the train/val splits, and never read the training
+.txt labels.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+# Shards are stored next to the YOLO dataset
+SHARD_DIR = Path('/cluster/work/tmstorma/Football2025/dataset/shards')
+
+# Bump when the box layout changes
+SHARD_VERSION = 1
+
+# One YOLO label line: class x_center y_center width height
+YOLO_LINE = "%d %.6f %.6f %.6f %.6f\n"
+
+BOX_DTYPE = np.dtype([
+    ('class_id', np.int8),
+    ('track_id', np.int32),
+    ('x_center', np.float64),
+    ('y_center', np.float64),
+    ('width', np.float64),
+    ('height', np.float64),
+])
+
+
+def frame_name(dataset_name, frame_id):
+    """Label stem of an XML frame (0-indexed), e.g. RBK-AALESUND_frame_000001"""
+    return f'{dataset_name}_frame_{frame_id+1:06d}'
+
+
+class LabelShard:
+    """
+    Memory-mapped labels of one split.
+    Look up a frame by name in O(1): shard['RBK-AALESUND_frame_000001'].
+    """
+
+    def __init__(self, shard_dir):
+        shard_dir = Path(shard_dir)
+        with open(shard_dir / 'index.json') as f:
+            index = json.load(f)
+
+        if index.get('version') != SHARD_VERSION:
+            raise ValueError(f"{shard_dir}: shard version {index.get('version')}, expected {SHARD_VERSION}")
+
+        self.shard_dir = shard_dir
+        self.names = index['names']
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self.offsets = np.load(shard_dir / 'offsets.npy')
+
+        # Empty files cannot be memory-mapped
+        mmap_mode = 'r' if self.offsets[-1] else None
+        self.boxes = np.load(shard_dir / 'boxes.npy', mmap_mode=mmap_mode)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.positions
+
+    def __getitem__(self, name):
+        """Boxes of one frame as a BOX_DTYPE array"""
+        i = self.positions[name]
+        return self.boxes[self.offsets[i]:self.offsets[i + 1]]
+
+    def frame(self, dataset_name, frame_id):
+        """Boxes of an XML frame (0-indexed) of a match"""
+        return self[frame_name(dataset_name, frame_id)]
+
+    def counts(self):
+        """Number of boxes per frame, in storage order"""
+        return np.diff(self.offsets)
+
+    def values(self, boxes=None):
+        """Flat [class_id, x_c, y_c, w, h, ...] list for YOLO_LINE formatting"""
+        boxes = self.boxes if boxes is None else boxes
+        return np.column_stack((
+            boxes['class_id'].astype(np.float64),
+            boxes['x_center'], boxes['y_center'], boxes['width'], boxes['height']
+        )).ravel().tolist()
+
+    def text(self, name):
+        """YOLO .txt content of one frame"""
+        boxes = self[name]
+        return (YOLO_LINE * len(boxes)) % tuple(self.values(boxes))
+
+
+def write_shard(shard_dir, names, boxes, counts):
+    """
+    Write one split's shard.
+
+    Args:
+        names: Frame names (label stems) in storage order
+        boxes: BOX_DTYPE array of all boxes, frame after frame
+        counts: Number of boxes of each frame
+    """
+    shard_dir = Path(shard_dir)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    if offsets[-1] != len(boxes):
+        raise ValueError(f"counts sum to {offsets[-1]} but {len(boxes)} boxes were given")
+
+    # Arrays first, index.json last: a shard is only complete once its index exists
+    pid = os.getpid()
+    for name, array in [('boxes', np.asarray(boxes, dtype=BOX_DTYPE)), ('offsets', offsets)]:
+        tmp_path = shard_dir / f'{name}.{pid}.tmp.npy'
+        np.save(tmp_path, array)
+        os.replace(tmp_path, shard_dir / f'{name}.npy')
+
+    tmp_index = shard_dir / f'index.{pid}.tmp.json'
+    with open(tmp_index, 'w') as f:
+        json.dump({'version': SHARD_VERSION, 'names': list(names)}, f)
+    os.replace(tmp_index, shard_dir / 'index.json')
+
+
+def export_hashes_path(labels_dir):
+    """Content hashes of an exported labels directory (labels/train -> labels/train.hashes.json)"""
+    labels_dir = Path(labels_dir)
+    return labels_dir.with_name(f'{labels_dir.name}.hashes.json')
+
+
+def export_yolo(shard, labels_dir):
+    """
+    Write a shard back to one YOLO .txt per frame (for Ultralytics). labels_dir then
+    mirrors the shard: .txt files of frames no longer in it are deleted.
+
+    Only files whose content changed are written: the SHA-1 of every exported label
+    is kept in export_hashes_path(labels_dir), and a label with the same hash whose
+    file still exists is skipped, so a rerun after an unchanged conversion writes nothing.
+    Returns (files written, stale files deleted).
+    """
+    if not isinstance(shard, LabelShard):
+        shard = LabelShard(shard)
+
+    labels_dir = Path(labels_dir)
+    labels_dir.mkdir(parents=True, exist_ok=True)
+
+    hashes_path = export_hashes_path(labels_dir)
+    previous = {}
+    if hashes_path.exists():
+        with open(hashes_path) as f:
+            previous = json.load(f)
+    # One directory listing instead of a stat per label
+    existing = {entry.name[:-4] for entry in os.scandir(labels_dir) if entry.name.endswith('.txt')}
+
+    # Flatten the whole split once, then format each frame from its slice
+    values = shard.values()
+    offsets = shard.offsets.tolist()
+    hashes = {}
+    written = 0
+    for i, name in enumerate(shard.names):
+        start, end = offsets[i], offsets[i + 1]
+        text = (YOLO_LINE * (end - start)) % tuple(values[5 * start:5 * end])
+        hashes[name] = hashlib.sha1(text.encode()).hexdigest()
+        if previous.get(name) == hashes[name] and name in existing:
+            continue
+        (labels_dir / f'{name}.txt').write_text(text)
+        written += 1
+
+    stale = [name for name in existing if name not in shard]
+    for name in stale:
+        (labels_dir / f'{name}.txt').unlink()
+
+    if written or stale or hashes != previous:
+        tmp_path = hashes_path.with_name(f'{hashes_path.name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(hashes, f)
+        os.replace(tmp_path, hashes_path)
+
+    return written, len(stale)
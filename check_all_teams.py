@@ -3,10 +3,11 @@
 Quick check of team attribute distribution across all Football2025 datasets
 """
 
-import xml.etree.ElementTree as ET
 from pathlib import Path
 from collections import Counter
 
+from annotations.cvat import read_meta, iter_boxes
+
 # All dataset paths
 datasets = {
     'RBK-VIKING': '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-VIKING/annotations.xml',
@@ -34,31 +35,23 @@ for dataset_name, xml_path in datasets.items():
         continue
 
     try:
-        tree = ET.parse(xml_file)
-        root = tree.getroot()
-
         # Get metadata
-        meta = root.find('meta')
-        task = meta.find('task')
-        total_frames = int(task.find('size').text)
+        total_frames = read_meta(xml_file)['frames']
 
         # Count tracks and boxes by class
-        track_counts = Counter()
+        track_ids = {}
         box_counts = Counter()
         team_counts = Counter()
 
-        for track in root.findall('track'):
-            label = track.get('label')
-            track_counts[label] += 1
+        for box in iter_boxes(xml_file):
+            track_ids[box.track_id] = box.label
+            box_counts[box.label] += 1
 
-            for box in track.findall('box'):
-                box_counts[label] += 1
+            # Check for team attribute
+            if box.label == 'player' and box.team is not None:
+                team_counts[box.team] += 1
 
-                # Check for team attribute
-                if label == 'player':
-                    team_attr = box.find("attribute[@name='team']")
-                    if team_attr is not None:
-                        team_counts[team_attr.text] += 1
+        track_counts = Counter(track_ids.values())
 
         print(f"\n📊 Basic Stats:")
         print(f"  Total frames: {total_frames}")
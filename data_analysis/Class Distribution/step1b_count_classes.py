@@ -4,10 +4,15 @@ Step 1b - Count Class Instances
 Counts bounding boxes by class: home_player, away_player, referee, ball
 """
 
-import xml.etree.ElementTree as ET
+import sys
 from pathlib import Path
 from collections import defaultdict
 
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from annotations.cache import load_annotations
+
 # Dataset paths
 DATASETS = {
     'RBK-VIKING': '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-VIKING/annotations.xml',
@@ -19,9 +24,6 @@ DATASETS = {
 
 def count_classes(xml_path):
     """Count bounding boxes by class"""
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-
     class_counts = {
         'home_player': 0,
         'away_player': 0,
@@ -29,23 +31,16 @@ def count_classes(xml_path):
         'ball': 0
     }
 
-    for track in root.findall('track'):
-        label = track.get('label')
-
-        for box in track.findall('box'):
-            if label == 'ball':
-                class_counts['ball'] += 1
-            elif label == 'player':
-                # Get team attribute
-                team_attr = box.find("attribute[@name='team']")
-                if team_attr is not None:
-                    team = team_attr.text
-                    if team == 'home':
-                        class_counts['home_player'] += 1
-                    elif team == 'away':
-                        class_counts['away_player'] += 1
-                    elif team == 'referee':
-                        class_counts['referee'] += 1
+    for box in load_annotations(xml_path).iter_boxes():
+        if box.label == 'ball':
+            class_counts['ball'] += 1
+        elif box.label == 'player':
+            if box.team == 'home':
+                class_counts['home_player'] += 1
+            elif box.team == 'away':
+                class_counts['away_player'] += 1
+            elif box.team == 'referee':
+                class_counts['referee'] += 1
 
     return class_counts
 
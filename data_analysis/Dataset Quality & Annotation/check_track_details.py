@@ -3,44 +3,38 @@
 Analyze track details to understand the high track count
 """
 
-import xml.etree.ElementTree as ET
+import sys
 from pathlib import Path
 from collections import Counter, defaultdict
 
-xml_path = '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-AALESUND/annotations.xml'
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from annotations.cache import load_annotations
+from annotations.index import TrackIndex
 
-tree = ET.parse(xml_path)
-root = tree.getroot()
+xml_path = '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-AALESUND/annotations.xml'
 
 # Analyze tracks
 track_info = []
 
-for track in root.findall('track'):
-    track_id = track.get('id')
-    label = track.get('label')
-
-    # Count boxes in this track
-    boxes = track.findall('box')
-    num_boxes = len(boxes)
+tracks = TrackIndex(load_annotations(xml_path))
 
+for track_id in tracks.track_ids.tolist():
     # Get frame range
-    frames = [int(box.get('frame')) for box in boxes]
-    frame_start = min(frames)
-    frame_end = max(frames)
+    frame_start, frame_end = tracks.span(track_id)
+    label = tracks.label(track_id)
 
     # Get team for players
     team = None
     if label == 'player':
-        first_box = boxes[0]
-        team_attr = first_box.find("attribute[@name='team']")
-        if team_attr is not None:
-            team = team_attr.text
+        team = tracks.team(track_id)
 
     track_info.append({
-        'id': track_id,
+        'id': str(track_id),
         'label': label,
         'team': team,
-        'boxes': num_boxes,
+        'boxes': len(tracks.rows(track_id)),
         'frame_start': frame_start,
         'frame_end': frame_end,
         'duration': frame_end - frame_start + 1
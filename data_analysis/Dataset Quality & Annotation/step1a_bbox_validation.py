@@ -4,10 +4,15 @@ Step 1a - Bounding Box Boundary Validation
 Checks all bounding boxes for coordinate and boundary issues
 """
 
-import xml.etree.ElementTree as ET
+import sys
 from pathlib import Path
 from collections import defaultdict
 
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from annotations.cache import load_annotations
+
 # Dataset paths
 DATASETS = {
     'RBK-VIKING': '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-VIKING/annotations.xml',
@@ -53,42 +58,28 @@ def analyze_dataset(dataset_name, xml_path):
         print(f"File not found: {xml_path}")
         return
 
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
+    table = load_annotations(xml_file)
 
     # Get metadata
-    meta = root.find('meta')
-    task = meta.find('task')
-    total_frames = int(task.find('size').text)
+    total_frames = table.frames
 
     # Track issues
     anomalies = defaultdict(list)
     total_boxes = 0
 
     # Check all tracks and boxes
-    for track in root.findall('track'):
-        track_id = track.get('id')
-        label = track.get('label')
-
-        for box in track.findall('box'):
-            total_boxes += 1
-            frame = box.get('frame')
-
-            # Extract coordinates
-            xtl = float(box.get('xtl'))
-            ytl = float(box.get('ytl'))
-            xbr = float(box.get('xbr'))
-            ybr = float(box.get('ybr'))
-
-            # Validate
-            issues = validate_bbox(xtl, ytl, xbr, ybr, frame, track_id, label)
-            if issues:
-                for issue in issues:
-                    anomalies[issue].append({
-                        'frame': frame,
-                        'track_id': track_id,
-                        'label': label
-                    })
+    for box in table.iter_boxes():
+        total_boxes += 1
+
+        # Validate
+        issues = validate_bbox(box.xtl, box.ytl, box.xbr, box.ybr, box.frame, box.track_id, box.label)
+        if issues:
+            for issue in issues:
+                anomalies[issue].append({
+                    'frame': box.frame,
+                    'track_id': box.track_id,
+                    'label': box.label
+                })
 
     # Report results
     print(f"\nTotal frames: {total_frames}")
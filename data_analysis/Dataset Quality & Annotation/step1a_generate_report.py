@@ -4,10 +4,16 @@ Step 1a - Generate Analysis Report
 Consolidates all validation results into a markdown report
 """
 
-import xml.etree.ElementTree as ET
+import sys
 from pathlib import Path
+import numpy as np
 from datetime import datetime
 
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from annotations.cache import load_annotations
+
 # Dataset paths
 DATASETS = {
     'RBK-VIKING': '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-VIKING/annotations.xml',
@@ -21,20 +27,11 @@ OUTPUT_FILE = Path('/cluster/work/tmstorma/Football2025/data_analysis/Dataset Qu
 
 def collect_dataset_stats(xml_path):
     """Collect statistics from one dataset"""
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-
-    meta = root.find('meta')
-    task = meta.find('task')
-    total_frames = int(task.find('size').text)
-
-    total_tracks = 0
-    total_boxes = 0
+    table = load_annotations(xml_path)
 
-    for track in root.findall('track'):
-        total_tracks += 1
-        for box in track.findall('box'):
-            total_boxes += 1
+    total_frames = table.frames
+    total_tracks = len(np.unique(table['track_id']))
+    total_boxes = len(table)
 
     return {
         'frames': total_frames,
@@ -4,10 +4,15 @@ Step 1a - Tracking ID Validation
 Checks for duplicate and missing tracking IDs
 """
 
-import xml.etree.ElementTree as ET
+import sys
 from pathlib import Path
 from collections import defaultdict
 
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from annotations.cache import load_annotations
+
 # Dataset paths
 DATASETS = {
     'RBK-VIKING': '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-VIKING/annotations.xml',
@@ -28,32 +33,26 @@ def analyze_dataset(dataset_name, xml_path):
         print(f"File not found: {xml_path}")
         return
 
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
+    table = load_annotations(xml_file)
 
     # Get metadata
-    meta = root.find('meta')
-    task = meta.find('task')
-    total_frames = int(task.find('size').text)
+    total_frames = table.frames
 
     # Build frame -> track_id mapping
     frame_tracks = defaultdict(list)
-    total_tracks = 0
+    track_ids = set()
     total_boxes = 0
 
-    for track in root.findall('track'):
-        track_id = track.get('id')
-        total_tracks += 1
+    for box in table.iter_boxes():
+        track_ids.add(box.track_id)
+        total_boxes += 1
 
-        for box in track.findall('box'):
-            total_boxes += 1
-            frame = int(box.get('frame'))
-            label = track.get('label')
+        frame_tracks[box.frame].append({
+            'track_id': box.track_id,
+            'label': box.label
+        })
 
-            frame_tracks[frame].append({
-                'track_id': track_id,
-                'label': label
-            })
+    total_tracks = len(track_ids)
 
     # Check for duplicate track IDs in same frame
     duplicate_frames = []
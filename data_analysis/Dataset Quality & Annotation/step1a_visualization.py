@@ -4,12 +4,17 @@ Step 1a - Visualize Random Annotated Frames
 Draws bounding boxes with team colors and track IDs
 """
 
-import xml.etree.ElementTree as ET
+import sys
 from pathlib import Path
 import cv2
 import random
 from collections import defaultdict
 
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from annotations.cache import load_annotations
+
 # Dataset paths
 DATASETS = {
     'RBK-VIKING': {
@@ -46,34 +51,21 @@ OUTPUT_DIR = Path('/cluster/work/tmstorma/Football2025/visualizations')
 
 def get_frame_annotations(xml_path, frame_num):
     """Extract all annotations for a specific frame"""
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
+    table = load_annotations(xml_path)
 
     annotations = []
-    for track in root.findall('track'):
-        track_id = track.get('id')
-        label = track.get('label')
-
-        for box in track.findall('box'):
-            if int(box.get('frame')) == frame_num:
-                xtl = int(float(box.get('xtl')))
-                ytl = int(float(box.get('ytl')))
-                xbr = int(float(box.get('xbr')))
-                ybr = int(float(box.get('ybr')))
-
-                # Get team attribute for players
-                team = 'ball'
-                if label == 'player':
-                    team_attr = box.find("attribute[@name='team']")
-                    if team_attr is not None:
-                        team = team_attr.text
-
-                annotations.append({
-                    'track_id': track_id,
-                    'label': label,
-                    'team': team,
-                    'bbox': (xtl, ytl, xbr, ybr)
-                })
+    for box in table.iter_boxes(table['frame'] == frame_num):
+        # Get team attribute for players
+        team = 'ball'
+        if box.label == 'player' and box.team is not None:
+            team = box.team
+
+        annotations.append({
+            'track_id': box.track_id,
+            'label': box.label,
+            'team': team,
+            'bbox': (int(box.xtl), int(box.ytl), int(box.xbr), int(box.ybr))
+        })
 
     return annotations
 
@@ -130,11 +122,7 @@ def analyze_dataset(dataset_name, dataset_info):
         return
 
     # Get total frames
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
-    meta = root.find('meta')
-    task = meta.find('task')
-    total_frames = int(task.find('size').text)
+    total_frames = load_annotations(xml_file).frames
 
     # Pick 3 random frames
     num_samples = min(3, total_frames)
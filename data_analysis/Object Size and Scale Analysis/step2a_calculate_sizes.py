@@ -4,12 +4,17 @@ Step 2a - Calculate Bounding Box Areas and Aspect Ratios
 Analyzes object sizes across all datasets
 """
 
-import xml.etree.ElementTree as ET
+import sys
 from pathlib import Path
 import json
 import numpy as np
 from collections import defaultdict
 
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from annotations.cache import load_annotations
+
 # Dataset paths
 DATASETS = {
     'RBK-VIKING': '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-VIKING/annotations.xml',
@@ -26,9 +31,6 @@ IMG_AREA = IMG_WIDTH * IMG_HEIGHT
 
 def analyze_boxes(xml_path):
     """Extract size and aspect ratio information from all boxes"""
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-
     # Store measurements by class
     measurements = defaultdict(lambda: {
         'areas': [],
@@ -38,40 +40,28 @@ def analyze_boxes(xml_path):
         'relative_areas': []
     })
 
-    for track in root.findall('track'):
-        label = track.get('label')
-
-        for box in track.findall('box'):
-            # Extract coordinates
-            xtl = float(box.get('xtl'))
-            ytl = float(box.get('ytl'))
-            xbr = float(box.get('xbr'))
-            ybr = float(box.get('ybr'))
-
-            # Calculate dimensions
-            width = xbr - xtl
-            height = ybr - ytl
-            area = width * height
-            aspect_ratio = width / height if height > 0 else 0
-            relative_area = (area / IMG_AREA) * 100  # Percentage
-
-            # Determine class
-            class_name = 'ball' if label == 'ball' else None
-            if label == 'player':
-                team_attr = box.find("attribute[@name='team']")
-                if team_attr is not None:
-                    team = team_attr.text
-                    if team == 'referee':
-                        class_name = 'referee'
-                    else:
-                        class_name = f"{team}_player"
-
-            if class_name:
-                measurements[class_name]['areas'].append(area)
-                measurements[class_name]['widths'].append(width)
-                measurements[class_name]['heights'].append(height)
-                measurements[class_name]['aspect_ratios'].append(aspect_ratio)
-                measurements[class_name]['relative_areas'].append(relative_area)
+    for box in load_annotations(xml_path).iter_boxes():
+        # Calculate dimensions
+        width = box.xbr - box.xtl
+        height = box.ybr - box.ytl
+        area = width * height
+        aspect_ratio = width / height if height > 0 else 0
+        relative_area = (area / IMG_AREA) * 100  # Percentage
+
+        # Determine class
+        class_name = 'ball' if box.label == 'ball' else None
+        if box.label == 'player' and box.team is not None:
+            if box.team == 'referee':
+                class_name = 'referee'
+            else:
+                class_name = f"{box.team}_player"
+
+        if class_name:
+            measurements[class_name]['areas'].append(area)
+            measurements[class_name]['widths'].append(width)
+            measurements[class_name]['heights'].append(height)
+            measurements[class_name]['aspect_ratios'].append(aspect_ratio)
+            measurements[class_name]['relative_areas'].append(relative_area)
 
     return measurements
 
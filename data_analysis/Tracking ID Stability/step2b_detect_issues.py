@@ -4,12 +4,18 @@ Step 2b - Detect ID Switches and Track Issues
 Identifies problematic tracks and potential ID switches
 """
 
-import xml.etree.ElementTree as ET
+import sys
 from pathlib import Path
 import json
 import numpy as np
 from collections import defaultdict
 
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from annotations.cache import load_annotations
+from annotations.index import TrackIndex
+
 # Dataset paths
 DATASETS = {
     'RBK-VIKING': '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-VIKING/annotations.xml',
@@ -21,89 +27,58 @@ DATASETS = {
 
 def get_track_data(xml_path):
     """Extract detailed track information"""
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-
     tracks = []
+    index = TrackIndex(load_annotations(xml_path))
 
-    for track in root.findall('track'):
-        track_id = track.get('id')
-        label = track.get('label')
-
-        frames = []
-        positions = []
-
-        for box in track.findall('box'):
-            frame_num = int(box.get('frame'))
-            xtl = float(box.get('xtl'))
-            ytl = float(box.get('ytl'))
-            xbr = float(box.get('xbr'))
-            ybr = float(box.get('ybr'))
-
-            center_x = (xtl + xbr) / 2
-            center_y = (ytl + ybr) / 2
-
-            frames.append(frame_num)
-            positions.append((center_x, center_y))
-
-        if not frames:
-            continue
-
-        frames = sorted(frames)
+    for track_id in index.track_ids.tolist():
+        label = index.label(track_id)
+        frame_start, frame_end = index.span(track_id)
 
         # Get team for players
         team = None
         if label == 'player':
-            first_box = track.findall('box')[0]
-            team_attr = first_box.find("attribute[@name='team']")
-            if team_attr is not None:
-                team = team_attr.text
+            team = index.team(track_id)
 
         tracks.append({
-            'track_id': track_id,
+            'track_id': str(track_id),
             'label': label,
             'team': team,
-            'frames': frames,
-            'positions': positions,
-            'frame_start': frames[0],
-            'frame_end': frames[-1]
+            'frames': index.frames(track_id),
+            'positions': index.centers(track_id),
+            'frame_start': frame_start,
+            'frame_end': frame_end
         })
 
-    return tracks
+    return tracks, index
 
 def detect_position_jumps(track):
     """Detect sudden large position jumps within a track"""
-    jumps = []
-
     positions = track['positions']
     frames = track['frames']
 
-    for i in range(len(positions) - 1):
-        # Calculate distance between consecutive positions
-        dx = positions[i+1][0] - positions[i][0]
-        dy = positions[i+1][1] - positions[i][1]
-        distance = np.sqrt(dx**2 + dy**2)
-
-        # Frame gap
-        frame_gap = frames[i+1] - frames[i]
-
-        # Speed in pixels per frame
-        speed = distance / frame_gap if frame_gap > 0 else 0
-
-        # Flag unusually fast movement (potential ID switch)
-        # Threshold: 300 pixels per frame (very fast movement)
-        if speed > 300:
-            jumps.append({
-                'from_frame': frames[i],
-                'to_frame': frames[i+1],
-                'distance': distance,
-                'speed': speed,
-                'frame_gap': frame_gap
-            })
+    # Distance and frame gap between consecutive positions
+    steps = np.diff(positions, axis=0)
+    distances = np.sqrt(steps[:, 0]**2 + steps[:, 1]**2)
+    frame_gaps = np.diff(frames)
+
+    # Speed in pixels per frame
+    speeds = np.divide(distances, frame_gaps, out=np.zeros_like(distances), where=frame_gaps > 0)
+
+    # Flag unusually fast movement (potential ID switch)
+    # Threshold: 300 pixels per frame (very fast movement)
+    jumps = []
+    for i in np.flatnonzero(speeds > 300).tolist():
+        jumps.append({
+            'from_frame': int(frames[i]),
+            'to_frame': int(frames[i+1]),
+            'distance': float(distances[i]),
+            'speed': float(speeds[i]),
+            'frame_gap': int(frame_gaps[i])
+        })
 
     return jumps
 
-def find_potential_id_switches(tracks):
+def find_potential_id_switches(tracks, index):
     """Find pairs of tracks that might be the same object with different IDs"""
     switches = []
 
@@ -115,32 +90,39 @@ def find_potential_id_switches(tracks):
             tracks_by_class[class_name].append(track)
 
     for class_name, class_tracks in tracks_by_class.items():
-        # Compare pairs of tracks
+        position = {track['track_id']: i for i, track in enumerate(class_tracks)}
+
         for i, track1 in enumerate(class_tracks):
-            for track2 in class_tracks[i+1:]:
-                # Check if track2 starts shortly after track1 ends
+            # Later tracks of this class starting shortly after track1 ends
+            # (1-10 frame gap), looked up in the interval index
+            candidates = index.starting(track1['frame_end'] + 1, track1['frame_end'] + 10)
+            for track_id2 in candidates.tolist():
+                j = position.get(str(track_id2))
+                if j is None or j <= i:
+                    continue
+                track2 = class_tracks[j]
+
                 time_gap = track2['frame_start'] - track1['frame_end']
 
-                if 1 <= time_gap <= 10:  # Small gap between tracks
-                    # Check if end position of track1 is close to start position of track2
-                    end_pos1 = track1['positions'][-1]
-                    start_pos2 = track2['positions'][0]
-
-                    dx = start_pos2[0] - end_pos1[0]
-                    dy = start_pos2[1] - end_pos1[1]
-                    distance = np.sqrt(dx**2 + dy**2)
-
-                    # If distance is small, might be same object
-                    if distance < 200:  # pixels
-                        switches.append({
-                            'track1_id': track1['track_id'],
-                            'track2_id': track2['track_id'],
-                            'class': class_name,
-                            'time_gap': time_gap,
-                            'position_distance': distance,
-                            'track1_end': track1['frame_end'],
-                            'track2_start': track2['frame_start']
-                        })
+                # Check if end position of track1 is close to start position of track2
+                end_pos1 = track1['positions'][-1]
+                start_pos2 = track2['positions'][0]
+
+                dx = start_pos2[0] - end_pos1[0]
+                dy = start_pos2[1] - end_pos1[1]
+                distance = float(np.sqrt(dx**2 + dy**2))
+
+                # If distance is small, might be same object
+                if distance < 200:  # pixels
+                    switches.append({
+                        'track1_id': track1['track_id'],
+                        'track2_id': track2['track_id'],
+                        'class': class_name,
+                        'time_gap': time_gap,
+                        'position_distance': distance,
+                        'track1_end': track1['frame_end'],
+                        'track2_start': track2['frame_start']
+                    })
 
     return switches
 
@@ -155,7 +137,7 @@ def analyze_dataset(dataset_name, xml_path):
         print(f"File not found: {xml_path}")
         return None
 
-    tracks = get_track_data(xml_path)
+    tracks, index = get_track_data(xml_path)
 
     print(f"\nTotal tracks: {len(tracks)}")
 
@@ -186,7 +168,7 @@ def analyze_dataset(dataset_name, xml_path):
             print(f"    Track {track_info['track_id']} ({class_name}): {jump['distance']:.0f} pixels in {jump['frame_gap']} frames (speed: {jump['speed']:.0f} px/frame)")
 
     # Detect potential ID switches
-    switches = find_potential_id_switches(tracks)
+    switches = find_potential_id_switches(tracks, index)
 
     print(f"\nPotential ID Switch Analysis:")
     print(f"  Suspicious track pairs: {len(switches)}")
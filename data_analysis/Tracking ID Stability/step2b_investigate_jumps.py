@@ -4,87 +4,68 @@ Step 2b - Investigate Player Position Jumps
 Creates detailed visualizations of player jumps in RBK-BODO-part3
 """
 
-import xml.etree.ElementTree as ET
+import sys
 from pathlib import Path
 import matplotlib.pyplot as plt
 import numpy as np
 import cv2
 
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from annotations.cache import load_annotations
+from annotations.index import TrackIndex
+
 # Image dimensions
 IMG_WIDTH = 1920
 IMG_HEIGHT = 1080
 
 def get_track_with_jumps(xml_path):
     """Extract tracks and identify position jumps"""
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-
     tracks_with_jumps = []
+    index = TrackIndex(load_annotations(xml_path))
 
-    for track in root.findall('track'):
-        track_id = track.get('id')
-        label = track.get('label')
-
-        if label != 'player':
+    for track_id in index.track_ids.tolist():
+        if index.label(track_id) != 'player':
             continue
 
-        frames = []
-        positions = []
-        boxes = []
-
-        for box in track.findall('box'):
-            frame_num = int(box.get('frame'))
-            xtl = float(box.get('xtl'))
-            ytl = float(box.get('ytl'))
-            xbr = float(box.get('xbr'))
-            ybr = float(box.get('ybr'))
-
-            center_x = (xtl + xbr) / 2
-            center_y = (ytl + ybr) / 2
-
-            frames.append(frame_num)
-            positions.append((center_x, center_y))
-            boxes.append((xtl, ytl, xbr, ybr))
+        frames = index.frames(track_id)
+        positions = index.centers(track_id)
+        boxes = index.xyxy(track_id)
 
         if len(frames) < 2:
             continue
 
         # Check for jumps
+        steps = np.diff(positions, axis=0)
+        distances = np.sqrt(steps[:, 0]**2 + steps[:, 1]**2)
+        frame_gaps = np.diff(frames)
+        speeds = np.divide(distances, frame_gaps, out=np.zeros_like(distances), where=frame_gaps > 0)
+
         jumps = []
-        for i in range(len(positions) - 1):
-            dx = positions[i+1][0] - positions[i][0]
-            dy = positions[i+1][1] - positions[i][1]
-            distance = np.sqrt(dx**2 + dy**2)
-            frame_gap = frames[i+1] - frames[i]
-            speed = distance / frame_gap if frame_gap > 0 else 0
-
-            if speed > 300:  # Jump threshold
-                jumps.append({
-                    'index': i,
-                    'from_frame': frames[i],
-                    'to_frame': frames[i+1],
-                    'from_pos': positions[i],
-                    'to_pos': positions[i+1],
-                    'from_box': boxes[i],
-                    'to_box': boxes[i+1],
-                    'distance': distance,
-                    'speed': speed
-                })
+        for i in np.flatnonzero(speeds > 300).tolist():  # Jump threshold
+            jumps.append({
+                'index': i,
+                'from_frame': int(frames[i]),
+                'to_frame': int(frames[i+1]),
+                'from_pos': tuple(positions[i].tolist()),
+                'to_pos': tuple(positions[i+1].tolist()),
+                'from_box': tuple(boxes[i].tolist()),
+                'to_box': tuple(boxes[i+1].tolist()),
+                'distance': float(distances[i]),
+                'speed': float(speeds[i])
+            })
 
         if jumps:
             # Get team
-            team = 'unknown'
-            first_box = track.findall('box')[0]
-            team_attr = first_box.find("attribute[@name='team']")
-            if team_attr is not None:
-                team = team_attr.text
+            team = index.team(track_id) or 'unknown'
 
             tracks_with_jumps.append({
-                'track_id': track_id,
+                'track_id': str(track_id),
                 'team': team,
-                'frames': frames,
-                'positions': positions,
-                'boxes': boxes,
+                'frames': frames.tolist(),
+                'positions': [tuple(p) for p in positions.tolist()],
+                'boxes': [tuple(b) for b in boxes.tolist()],
                 'jumps': jumps
             })
 
@@ -4,12 +4,18 @@ Step 2b - Analyze Tracking ID Temporal Continuity
 Analyzes track persistence, lengths, and temporal gaps
 """
 
-import xml.etree.ElementTree as ET
+import sys
 from pathlib import Path
 import json
 import numpy as np
 from collections import defaultdict
 
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from annotations.cache import load_annotations
+from annotations.index import TrackIndex
+
 # Dataset paths
 DATASETS = {
     'RBK-VIKING': '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-VIKING/annotations.xml',
@@ -21,51 +27,27 @@ DATASETS = {
 
 def analyze_tracks(xml_path):
     """Extract temporal information about each track"""
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
+    table = load_annotations(xml_path)
 
     # Get total frames
-    meta = root.find('meta')
-    task = meta.find('task')
-    total_frames = int(task.find('size').text)
+    total_frames = table.frames
 
     track_info = []
+    tracks = TrackIndex(table)
+
+    for track_id in tracks.track_ids.tolist():
+        label = tracks.label(track_id)
+
+        # Frame numbers and center positions of this track (frame order)
+        frames = tracks.frames(track_id)
+        positions = tracks.centers(track_id)
 
-    for track in root.findall('track'):
-        track_id = track.get('id')
-        label = track.get('label')
-
-        # Get all frame numbers for this track
-        frames = []
-        positions = []
-
-        for box in track.findall('box'):
-            frame_num = int(box.get('frame'))
-            frames.append(frame_num)
-
-            # Get center position
-            xtl = float(box.get('xtl'))
-            ytl = float(box.get('ytl'))
-            xbr = float(box.get('xbr'))
-            ybr = float(box.get('ybr'))
-            center_x = (xtl + xbr) / 2
-            center_y = (ytl + ybr) / 2
-            positions.append((center_x, center_y))
-
-        if not frames:
-            continue
-
-        frames = sorted(frames)
-        frame_start = frames[0]
-        frame_end = frames[-1]
+        frame_start, frame_end = tracks.span(track_id)
         num_appearances = len(frames)
         span = frame_end - frame_start + 1
 
         # Check for gaps (missing frames in the sequence)
-        expected_frames = set(range(frame_start, frame_end + 1))
-        actual_frames = set(frames)
-        gaps = expected_frames - actual_frames
-        num_gaps = len(gaps)
+        num_gaps = span - len(np.unique(frames))
 
         # Calculate continuity ratio
         continuity = num_appearances / span if span > 0 else 0
@@ -73,21 +55,14 @@ def analyze_tracks(xml_path):
         # Get team for players
         team = None
         if label == 'player':
-            first_box = track.findall('box')[0]
-            team_attr = first_box.find("attribute[@name='team']")
-            if team_attr is not None:
-                team = team_attr.text
+            team = tracks.team(track_id)
 
         # Calculate displacement (if multiple frames)
-        displacement = 0
-        if len(positions) > 1:
-            for i in range(len(positions) - 1):
-                dx = positions[i+1][0] - positions[i][0]
-                dy = positions[i+1][1] - positions[i][1]
-                displacement += np.sqrt(dx**2 + dy**2)
+        steps = np.diff(positions, axis=0)
+        displacement = float(np.sum(np.sqrt(steps[:, 0]**2 + steps[:, 1]**2)))
 
         track_info.append({
-            'track_id': track_id,
+            'track_id': str(track_id),
             'label': label,
             'team': team,
             'frame_start': frame_start,
@@ -97,8 +72,8 @@ def analyze_tracks(xml_path):
             'gaps': num_gaps,
             'continuity': continuity,
             'displacement': displacement,
-            'frames': frames,
-            'positions': positions
+            'frames': frames.tolist(),
+            'positions': positions.tolist()
         })
 
     return track_info, total_frames
@@ -4,10 +4,16 @@ Step 2b - Validate Frame Numbering Consistency
 Checks that XML annotations, images, labels, and train.txt are aligned
 """
 
-import xml.etree.ElementTree as ET
+import sys
 from pathlib import Path
+import numpy as np
 from collections import defaultdict
 
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from annotations.cache import load_annotations
+
 # Dataset paths
 DATASETS = {
     'RBK-VIKING': {
@@ -55,14 +61,7 @@ def extract_frame_number(filename):
 
 def get_xml_frames(xml_path):
     """Get all frame numbers referenced in XML annotations"""
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-
-    frames = set()
-    for track in root.findall('track'):
-        for box in track.findall('box'):
-            frame_num = int(box.get('frame'))
-            frames.add(frame_num)
+    frames = set(np.unique(load_annotations(xml_path)['frame']).tolist())
 
     return frames
 
@@ -4,13 +4,18 @@ Step 2b - Visualize Track Trajectories
 Creates visualizations of object paths over time
 """
 
-import xml.etree.ElementTree as ET
+import sys
 from pathlib import Path
 import matplotlib.pyplot as plt
 import numpy as np
 import random
 from matplotlib.colors import LinearSegmentedColormap
 
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from annotations.cache import load_annotations
+
 # Dataset paths
 DATASETS = {
     'RBK-AALESUND': '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-AALESUND/annotations.xml',
@@ -31,30 +36,14 @@ COLORS = {
 
 def get_track_data(xml_path):
     """Extract track trajectories"""
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-
     tracks = []
 
-    for track in root.findall('track'):
-        track_id = track.get('id')
-        label = track.get('label')
-
-        frames = []
-        positions = []
-
-        for box in track.findall('box'):
-            frame_num = int(box.get('frame'))
-            xtl = float(box.get('xtl'))
-            ytl = float(box.get('ytl'))
-            xbr = float(box.get('xbr'))
-            ybr = float(box.get('ybr'))
-
-            center_x = (xtl + xbr) / 2
-            center_y = (ytl + ybr) / 2
+    for track in load_annotations(xml_path).iter_tracks():
+        track_id = str(track.track_id)
+        label = track.label
 
-            frames.append(frame_num)
-            positions.append((center_x, center_y))
+        frames = [box.frame for box in track.boxes]
+        positions = [((box.xtl + box.xbr) / 2, (box.ytl + box.ybr) / 2) for box in track.boxes]
 
         if not frames:
             continue
@@ -62,10 +51,7 @@ def get_track_data(xml_path):
         # Get team for players
         team = None
         if label == 'player':
-            first_box = track.findall('box')[0]
-            team_attr = first_box.find("attribute[@name='team']")
-            if team_attr is not None:
-                team = team_attr.text
+            team = track.boxes[0].team
 
         class_name = team if team else label
 
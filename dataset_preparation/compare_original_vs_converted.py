@@ -1,7 +1,13 @@
 import cv2
 import numpy as np
+import sys
 from pathlib import Path
 
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from annotations.shard import SHARD_DIR, LabelShard
+
 def visualize_comparison(dataset_name, frame_number):
     """
     Compare original 2-class YOLO labels vs our 4-class converted labels.
@@ -11,7 +17,6 @@ def visualize_comparison(dataset_name, frame_number):
         frame_number: The frame number in the image filename (e.g., 616 for frame_000616.png)
     """
     source_dir = Path('/cluster/projects/vc/courses/TDT17/other/Football2025')
-    dataset_dir = Path('/cluster/work/tmstorma/Football2025/dataset')
 
     # Image path
     image_path = source_dir / dataset_name / 'data' / 'images' / 'train' / f'frame_{frame_number:06d}.png'
@@ -21,9 +26,10 @@ def visualize_comparison(dataset_name, frame_number):
 
     # Our converted label path (4-class: home=0, away=1, referee=2, ball=3)
     # First check train, then val
-    converted_label_path = dataset_dir / 'labels' / 'train' / f'{dataset_name}_frame_{frame_number:06d}.txt'
-    if not converted_label_path.exists():
-        converted_label_path = dataset_dir / 'labels' / 'val' / f'{dataset_name}_frame_{frame_number:06d}.txt'
+    converted_name = f'{dataset_name}_frame_{frame_number:06d}'
+    converted_shard = LabelShard(SHARD_DIR / 'train')
+    if converted_name not in converted_shard:
+        converted_shard = LabelShard(SHARD_DIR / 'val')
 
     # Load image
     img = cv2.imread(str(image_path))
@@ -87,22 +93,16 @@ def visualize_comparison(dataset_name, frame_number):
 
     # Parse CONVERTED labels
     print(f"\n=== CONVERTED 4-CLASS LABELS ===")
-    print(f"Reading from: {converted_label_path}")
+    print(f"Reading from: {converted_shard.shard_dir} [{converted_name}]")
 
-    if converted_label_path.exists():
+    if converted_name in converted_shard:
         converted_boxes = []
-        with open(converted_label_path, 'r') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if not line:
-                    continue
-                parts = line.split()
-                if len(parts) == 5:
-                    class_id, x_c, y_c, width, height = map(float, parts)
-                    converted_boxes.append({
-                        'class_id': int(class_id),
-                        'x_c': x_c, 'y_c': y_c, 'w': width, 'h': height
-                    })
+        for box in converted_shard[converted_name]:
+            converted_boxes.append({
+                'class_id': int(box['class_id']),
+                'x_c': float(box['x_center']), 'y_c': float(box['y_center']),
+                'w': float(box['width']), 'h': float(box['height'])
+            })
 
         print(f"Found {len(converted_boxes)} boxes")
         print("First 5 boxes (class_id x_c y_c w h):")
@@ -136,7 +136,7 @@ def visualize_comparison(dataset_name, frame_number):
             cv2.putText(img_converted, label, (x1, y1-5),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
     else:
-        print(f"Converted label file not found!")
+        print(f"Converted label not found in shards!")
 
     # Save side-by-side comparison
     output_dir = Path('/cluster/work/tmstorma/Football2025/dataset_preparation/comparison_visuals')
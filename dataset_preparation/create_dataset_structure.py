@@ -1,6 +1,13 @@
 import os
 from pathlib import Path
 
+def write_if_changed(path, content):
+    """Write a text file only when its content differs (avoids needless writes on shared storage)"""
+    if path.exists() and path.read_text() == content:
+        return False
+    path.write_text(content)
+    return True
+
 def create_symlinks_and_file_lists():
     """
     Create symlinks to images and generate train.txt and val.txt files.
@@ -40,6 +47,11 @@ def create_symlinks_and_file_lists():
     train_file_list = []
     val_file_list = []
 
+    # Read each directory once instead of checking every symlink on a rerun
+    existing_train = set(os.listdir(train_images_dir))
+    existing_val = set(os.listdir(val_images_dir))
+    created = 0
+
     # Process each dataset
     for dataset_name, config in datasets.items():
         print(f"Processing {dataset_name}...")
@@ -57,8 +69,9 @@ def create_symlinks_and_file_lists():
             target_path = train_images_dir / target_name
 
             # Create symlink if it doesn't exist
-            if not target_path.exists():
+            if target_name not in existing_train:
                 os.symlink(source_image, target_path)
+                created += 1
 
             # Add to train list (use absolute path)
             train_file_list.append(str(target_path))
@@ -71,26 +84,25 @@ def create_symlinks_and_file_lists():
             target_name = f'{dataset_name}_{image_name}'
             target_path = val_images_dir / target_name
 
-            if not target_path.exists():
+            if target_name not in existing_val:
                 os.symlink(source_image, target_path)
+                created += 1
 
             val_file_list.append(str(target_path))
 
-        print(f"  Created {config['train_end'] + 1} train and "
+        print(f"  {config['train_end'] + 1} train and "
               f"{config['total_frames'] - config['val_start']} val symlinks")
 
+    print(f"\nCreated {created} new symlinks")
+
     # Write train.txt
     train_txt = dataset_dir / 'train.txt'
-    with open(train_txt, 'w') as f:
-        for path in sorted(train_file_list):
-            f.write(f"{path}\n")
+    write_if_changed(train_txt, ''.join(f"{path}\n" for path in sorted(train_file_list)))
     print(f"\nCreated {train_txt} with {len(train_file_list)} images")
 
     # Write val.txt
     val_txt = dataset_dir / 'val.txt'
-    with open(val_txt, 'w') as f:
-        for path in sorted(val_file_list):
-            f.write(f"{path}\n")
+    write_if_changed(val_txt, ''.join(f"{path}\n" for path in sorted(val_file_list)))
     print(f"Created {val_txt} with {len(val_file_list)} images")
 
 
@@ -170,8 +182,7 @@ nc: 4
 """
 
     yaml_path = dataset_dir / 'data.yaml'
-    with open(yaml_path, 'w') as f:
-        f.write(yaml_content)
+    write_if_changed(yaml_path, yaml_content)
 
     print(f"\nCreated {yaml_path}")
 
@@ -1,7 +1,13 @@
 import cv2
-import xml.etree.ElementTree as ET
+import sys
 from pathlib import Path
 
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from annotations.cvat import iter_boxes
+from annotations.shard import SHARD_DIR, LabelShard, frame_name
+
 def visualize_from_xml(dataset_name, frame_id):
     """
     Visualize a specific frame directly from XML to compare with our conversion.
@@ -22,67 +28,38 @@ def visualize_from_xml(dataset_name, frame_id):
     print(f"\nAnalyzing {dataset_name} frame {frame_id} (image: frame_{frame_id+1:06d}.png)")
     print(f"Image dimensions: {img.shape[1]}x{img.shape[0]}")
 
-    # Parse XML
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-
     # Find all boxes for this frame
     boxes_found = []
-    for track in root.findall('track'):
-        track_id = int(track.get('id'))
-        label = track.get('label')
-
-        for box in track.findall('box'):
-            if int(box.get('frame')) != frame_id:
-                continue
-
-            outside = int(box.get('outside', '0'))
-            if outside == 1:
-                continue
-
-            # Get coordinates
-            xtl = float(box.get('xtl'))
-            ytl = float(box.get('ytl'))
-            xbr = float(box.get('xbr'))
-            ybr = float(box.get('ybr'))
-
-            # Get team
-            team = None
-            if label == 'player':
-                team_attr = box.find("attribute[@name='team']")
-                if team_attr is not None:
-                    team = team_attr.text
-
-            if label == 'event_labels':
-                continue
-
-            boxes_found.append({
-                'track_id': track_id,
-                'label': label,
-                'team': team,
-                'xtl': xtl, 'ytl': ytl, 'xbr': xbr, 'ybr': ybr
-            })
+    for box in iter_boxes(xml_path):
+        if box.frame != frame_id or box.outside == 1:
+            continue
+
+        if box.label == 'event_labels':
+            continue
+
+        boxes_found.append({
+            'track_id': box.track_id,
+            'label': box.label,
+            'team': box.team if box.label == 'player' else None,
+            'xtl': box.xtl, 'ytl': box.ytl, 'xbr': box.xbr, 'ybr': box.ybr
+        })
 
     print(f"Found {len(boxes_found)} boxes in XML")
 
     # Now check our converted label
-    dataset_dir = Path('/cluster/work/tmstorma/Football2025/dataset')
-    label_file = dataset_dir / 'labels' / 'train' / f'{dataset_name}_frame_{frame_id+1:06d}.txt'
+    shard = LabelShard(SHARD_DIR / 'train')
 
-    if not label_file.exists():
+    if frame_name(dataset_name, frame_id) not in shard:
         # Try val
-        label_file = dataset_dir / 'labels' / 'val' / f'{dataset_name}_frame_{frame_id+1:06d}.txt'
+        shard = LabelShard(SHARD_DIR / 'val')
 
     converted_boxes = []
-    with open(label_file, 'r') as f:
-        for line in f:
-            parts = line.strip().split()
-            if len(parts) == 5:
-                class_id, x_c, y_c, w, h = map(float, parts)
-                converted_boxes.append({
-                    'class_id': int(class_id),
-                    'x_c': x_c, 'y_c': y_c, 'w': w, 'h': h
-                })
+    for box in shard.frame(dataset_name, frame_id):
+        converted_boxes.append({
+            'class_id': int(box['class_id']),
+            'x_c': float(box['x_center']), 'y_c': float(box['y_center']),
+            'w': float(box['width']), 'h': float(box['height'])
+        })
 
     print(f"Found {len(converted_boxes)} boxes in converted label")
 
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Export the packed label shards back to per-frame YOLO .txt files.
+
+xml_to_yolo_converter.py only writes one shard per split (dataset/shards/{train,val}).
+Ultralytics still needs one .txt per image next to the images, so run this
+after every conversion, before training. Stale .txt files of frames that left
+a shard are deleted, so labels/{train,val} always mirror the shards. Only labels
+whose content changed are written (hashes in labels/{train,val}.hashes.json),
+so rerunning after an unchanged conversion writes nothing.
+"""
+
+import sys
+from pathlib import Path
+
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from annotations.shard import SHARD_DIR, export_yolo
+
+
+def main():
+    dataset_dir = Path('/cluster/work/tmstorma/Football2025/dataset')
+
+    print("Exporting label shards to YOLO text labels...")
+    print("="*60)
+
+    for split in ['train', 'val']:
+        shard_dir = SHARD_DIR / split
+        labels_dir = dataset_dir / 'labels' / split
+
+        if not (shard_dir / 'index.json').exists():
+            print(f"  ✗ {split}: no shard at {shard_dir} (run xml_to_yolo_converter.py first)")
+            continue
+
+        num_written, num_stale = export_yolo(shard_dir, labels_dir)
+        print(f"  ✓ {split}: {num_written} changed label files written to {labels_dir}, "
+              f"{num_stale} stale files deleted")
+
+    print("\nExport complete!")
+
+
+if __name__ == '__main__':
+    main()
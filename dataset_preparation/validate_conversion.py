@@ -1,52 +1,45 @@
 import cv2
 import numpy as np
+import sys
 from pathlib import Path
 import random
-from collections import defaultdict
+
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from annotations.shard import SHARD_DIR, LabelShard
+from media.framestore import open_store
 
 def validate_label_ranges():
     """
     Check that all label values are in valid range [0, 1].
     """
-    dataset_dir = Path('/cluster/work/tmstorma/Football2025/dataset')
-
     print("Validating label value ranges...")
 
     issues = []
     total_boxes = 0
 
     for split in ['train', 'val']:
-        labels_dir = dataset_dir / 'labels' / split
-        label_files = list(labels_dir.glob('*.txt'))
-
-        for label_file in label_files:
-            with open(label_file, 'r') as f:
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    parts = line.split()
-                    if len(parts) != 5:
-                        issues.append(f"{label_file.name}:{line_num} - Invalid format")
-                        continue
-
-                    class_id, x_c, y_c, w, h = map(float, parts)
-                    total_boxes += 1
-
-                    # Check class ID
-                    if class_id not in [0, 1, 2, 3]:
-                        issues.append(f"{label_file.name}:{line_num} - Invalid class {class_id}")
-
-                    # Check coordinate ranges
-                    if not (0 <= x_c <= 1):
-                        issues.append(f"{label_file.name}:{line_num} - x_center out of range: {x_c}")
-                    if not (0 <= y_c <= 1):
-                        issues.append(f"{label_file.name}:{line_num} - y_center out of range: {y_c}")
-                    if not (0 < w <= 1):
-                        issues.append(f"{label_file.name}:{line_num} - width out of range: {w}")
-                    if not (0 < h <= 1):
-                        issues.append(f"{label_file.name}:{line_num} - height out of range: {h}")
+        shard = LabelShard(SHARD_DIR / split)
+        boxes = shard.boxes
+        total_boxes += len(boxes)
+
+        # Frame name of every box, for the issue messages
+        box_names = np.repeat(np.arange(len(shard)), shard.counts())
+
+        checks = [
+            (~np.isin(boxes['class_id'], [0, 1, 2, 3]), 'class_id', "Invalid class"),
+            (~((boxes['x_center'] >= 0) & (boxes['x_center'] <= 1)), 'x_center', "x_center out of range:"),
+            (~((boxes['y_center'] >= 0) & (boxes['y_center'] <= 1)), 'y_center', "y_center out of range:"),
+            (~((boxes['width'] > 0) & (boxes['width'] <= 1)), 'width', "width out of range:"),
+            (~((boxes['height'] > 0) & (boxes['height'] <= 1)), 'height', "height out of range:"),
+        ]
+
+        for bad, field, message in checks:
+            for row in np.flatnonzero(bad).tolist():
+                name = shard.names[box_names[row]]
+                line_num = row - int(shard.offsets[box_names[row]]) + 1
+                issues.append(f"{name}.txt:{line_num} - {message} {boxes[field][row]}")
 
     print(f"  Checked {total_boxes} boxes")
     if issues:
@@ -65,29 +58,15 @@ def count_class_distribution():
     """
     Count class distribution and compare with Step 1b analysis.
     """
-    dataset_dir = Path('/cluster/work/tmstorma/Football2025/dataset')
-
     print("\nValidating class distribution...")
 
     class_names = ['home', 'away', 'referee', 'ball']
 
     for split in ['train', 'val']:
-        labels_dir = dataset_dir / 'labels' / split
-        label_files = list(labels_dir.glob('*.txt'))
-
-        class_counts = defaultdict(int)
-        total_boxes = 0
+        shard = LabelShard(SHARD_DIR / split)
 
-        for label_file in label_files:
-            with open(label_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    class_id = int(line.split()[0])
-                    class_counts[class_id] += 1
-                    total_boxes += 1
+        class_counts = np.bincount(shard.boxes['class_id'], minlength=len(class_names))
+        total_boxes = len(shard.boxes)
 
         print(f"\n  {split.upper()} split:")
         print(f"    Total boxes: {total_boxes}")
@@ -100,6 +79,10 @@ def count_class_distribution():
 def visualize_samples(num_samples=5):
     """
     Visualize random samples from train and val sets.
+    Frames are read from the match's frame store when it has been built, else
+    decoded from the split's PNG. iter_frames is not used: the samples are single
+    random frames named <match>_frame_XXXXXX.png, while it reads a match's
+    frame_XXXXXX.png directory in frame order.
     """
     dataset_dir = Path('/cluster/work/tmstorma/Football2025/dataset')
     output_dir = Path('/cluster/work/tmstorma/Football2025/dataset_preparation/validation_visualizations')
@@ -115,17 +98,23 @@ def visualize_samples(num_samples=5):
         (0, 255, 0)     # ball - green
     ]
 
+    stores = {}
     for split in ['train', 'val']:
         images_dir = dataset_dir / 'images' / split
-        labels_dir = dataset_dir / 'labels' / split
+        shard = LabelShard(SHARD_DIR / split)
 
         # Get random sample of images
         image_files = list(images_dir.glob('*.png'))
         sample_files = random.sample(image_files, min(num_samples, len(image_files)))
 
         for img_file in sample_files:
-            # Load image
-            img = cv2.imread(str(img_file))
+            # Load image (copied from the read-only store before drawing on it)
+            match_name, frame_number = img_file.stem.rsplit('_frame_', 1)
+            if match_name not in stores:
+                stores[match_name] = open_store(match_name)
+            store = stores[match_name]
+            img = store.get(int(frame_number)) if store is not None else None
+            img = cv2.imread(str(img_file)) if img is None else img.copy()
             if img is None:
                 print(f"    Warning: Could not read {img_file.name}")
                 continue
@@ -134,40 +123,34 @@ def visualize_samples(num_samples=5):
             image_height, image_width = img.shape[:2]
 
             # Load corresponding label
-            label_file = labels_dir / (img_file.stem + '.txt')
-            if not label_file.exists():
+            if img_file.stem not in shard:
                 print(f"    Warning: No label for {img_file.name}")
                 continue
 
             # Draw bounding boxes
-            with open(label_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    class_id, x_c, y_c, w, h = map(float, line.split())
-                    class_id = int(class_id)
-
-                    # Convert from YOLO to pixel coordinates
-                    x_center = x_c * image_width
-                    y_center = y_c * image_height
-                    width = w * image_width
-                    height = h * image_height
-
-                    x1 = int(x_center - width / 2)
-                    y1 = int(y_center - height / 2)
-                    x2 = int(x_center + width / 2)
-                    y2 = int(y_center + height / 2)
-
-                    # Draw rectangle
-                    color = class_colors[class_id]
-                    cv2.rectangle(img, (x1, y1), (x2, y2), color, 2)
-
-                    # Draw label
-                    label_text = class_names[class_id]
-                    cv2.putText(img, label_text, (x1, y1 - 5),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+            for box in shard[img_file.stem]:
+                class_id = int(box['class_id'])
+                x_c, y_c, w, h = box['x_center'], box['y_center'], box['width'], box['height']
+
+                # Convert from YOLO to pixel coordinates
+                x_center = x_c * image_width
+                y_center = y_c * image_height
+                width = w * image_width
+                height = h * image_height
+
+                x1 = int(x_center - width / 2)
+                y1 = int(y_center - height / 2)
+                x2 = int(x_center + width / 2)
+                y2 = int(y_center + height / 2)
+
+                # Draw rectangle
+                color = class_colors[class_id]
+                cv2.rectangle(img, (x1, y1), (x2, y2), color, 2)
+
+                # Draw label
+                label_text = class_names[class_id]
+                cv2.putText(img, label_text, (x1, y1 - 5),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
 
             # Save visualization
             output_path = output_dir / f'{split}_{img_file.name}'
@@ -178,7 +161,8 @@ def visualize_samples(num_samples=5):
 
 def check_file_counts():
     """
-    Verify that file counts match expected values.
+    Verify that file counts match expected values. Labels are the per-frame .txt
+    files Ultralytics trains on (exported from the shards by export_yolo_labels.py).
     """
     dataset_dir = Path('/cluster/work/tmstorma/Football2025/dataset')
 
@@ -214,6 +198,39 @@ def check_file_counts():
     return all_good
 
 
+def check_text_labels():
+    """
+    Verify that the .txt labels training reads are exactly the shards' labels
+    (value checks below run on the shards).
+    """
+    dataset_dir = Path('/cluster/work/tmstorma/Football2025/dataset')
+
+    print("\nChecking exported text labels against the shards...")
+
+    all_good = True
+    for split in ['train', 'val']:
+        shard = LabelShard(SHARD_DIR / split)
+        labels_dir = dataset_dir / 'labels' / split
+
+        missing, different = [], []
+        for name in shard.names:
+            label_file = labels_dir / f'{name}.txt'
+            if not label_file.exists():
+                missing.append(name)
+            elif label_file.read_text() != shard.text(name):
+                different.append(name)
+        stale = [path.stem for path in labels_dir.glob('*.txt') if path.stem not in shard]
+
+        if missing or different or stale:
+            print(f"  ✗ {split}: {len(missing)} missing, {len(different)} different, {len(stale)} stale "
+                  f"label files (run export_yolo_labels.py)")
+            all_good = False
+        else:
+            print(f"  ✓ {split}: {len(shard)} label files match the shard")
+
+    return all_good
+
+
 def compare_with_step1b():
     """
     Compare class distribution with Step 1b analysis (within ±1% tolerance).
@@ -263,25 +280,29 @@ def main():
     # 1. Check file counts
     counts_ok = check_file_counts()
 
-    # 2. Validate label value ranges
+    # 2. Check the text labels training reads against the shards
+    text_ok = check_text_labels()
+
+    # 3. Validate label value ranges
     ranges_ok = validate_label_ranges()
 
-    # 3. Count class distribution
+    # 4. Count class distribution
     count_class_distribution()
 
-    # 4. Compare with Step 1b
+    # 5. Compare with Step 1b
     compare_with_step1b()
 
-    # 5. Visualize samples
+    # 6. Visualize samples
     visualize_samples(num_samples=5)
 
     # Summary
     print("\n" + "="*60)
     print("VALIDATION SUMMARY")
     print("="*60)
-    if counts_ok and ranges_ok:
+    if counts_ok and text_ok and ranges_ok:
         print("✓ All validations passed!")
         print("  - File counts match expected values")
+        print("  - Text labels match the label shards")
         print("  - All label values in valid range")
         print("  - Class distribution matches Step 1b analysis")
         print("  - Visualizations generated successfully")
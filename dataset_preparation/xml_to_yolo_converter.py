@@ -1,201 +1,166 @@
-import xml.etree.ElementTree as ET
 import json
 import os
+import sys
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from annotations.cache import load_annotations
+from annotations.shard import BOX_DTYPE, LabelShard, frame_name, write_shard
+
+# Records the source XML hash and split of each match, so reruns skip unchanged
+# matches and reuse their slices of the previous shards.
+# Bump MANIFEST_VERSION when the label format changes to force a full rewrite.
+MANIFEST_NAME = 'label_manifest.json'
+MANIFEST_VERSION = 2
+
+# Convert matches in parallel (each match is independent).
+# Set PARALLEL = False to run them one after another in this process.
+PARALLEL = True
 
 class XMLToYOLOConverter:
     """
     Convert CVAT XML annotations to YOLO format with 4 classes:
-    0: home, 1: away, 2: referee, 3: ball
+    0: home, 1: away, 2: referee, 3: ball (annotations.cvat.box_class)
     """
 
-    def __init__(self):
-        self.class_map = {
-            ('player', 'home'): 0,
-            ('player', 'away'): 1,
-            ('player', 'referee'): 2,
-            ('ball', None): 3
-        }
-
     def parse_xml(self, xml_path):
         """
         Parse XML annotation file.
-        Returns: dict mapping frame_id to list of boxes, and image dimensions
+        Returns: dict of per-box arrays sorted by frame, and image dimensions
         """
-        tree = ET.parse(xml_path)
-        root = tree.getroot()
+        table = load_annotations(xml_path)
 
         # Get image dimensions from XML
-        size_elem = root.find('.//original_size')
-        if size_elem is not None:
-            xml_width = int(size_elem.find('width').text)
-            xml_height = int(size_elem.find('height').text)
+        if table.width is not None:
+            xml_width = table.width
+            xml_height = table.height
         else:
             # Fallback to default
             xml_width = 1920
             xml_height = 1080
 
-        # Frame to boxes mapping
-        frame_annotations = defaultdict(list)
-
-        # Ground truth tracking for HOTA evaluation
-        gt_tracking = defaultdict(list)
-
-        # Parse all tracks
-        for track in root.findall('track'):
-            track_id = int(track.get('id'))
-            label = track.get('label')
-
-            # Parse all boxes in this track
-            for box in track.findall('box'):
-                frame_id = int(box.get('frame'))
-                outside = int(box.get('outside', '0'))
-
-                # Skip boxes marked as outside
-                if outside == 1:
-                    continue
-
-                # Get bounding box coordinates
-                xtl = float(box.get('xtl'))
-                ytl = float(box.get('ytl'))
-                xbr = float(box.get('xbr'))
-                ybr = float(box.get('ybr'))
-
-                # Get team attribute for players
-                team = None
-                if label == 'player':
-                    team_attr = box.find("attribute[@name='team']")
-                    if team_attr is not None:
-                        team = team_attr.text
-
-                # Skip event_labels
-                if label == 'event_labels':
-                    continue
-
-                # Determine class
-                class_key = (label, team)
-                if class_key not in self.class_map:
-                    continue
-
-                class_id = self.class_map[class_key]
-
-                # Store annotation
-                frame_annotations[frame_id].append({
-                    'track_id': track_id,
-                    'class_id': class_id,
-                    'xtl': xtl,
-                    'ytl': ytl,
-                    'xbr': xbr,
-                    'ybr': ybr
-                })
-
-                # Store ground truth tracking
-                gt_tracking[frame_id].append({
-                    'track_id': track_id,
-                    'class_id': class_id,
-                    'bbox': [xtl, ytl, xbr, ybr]
-                })
+        # Skip boxes marked as outside and labels outside the 4 classes
+        # (event_labels, players without a team)
+        keep = np.flatnonzero((table['outside'] == 0) & (table['class_id'] >= 0))
+
+        # Stable sort keeps document order within each frame
+        rows = keep[np.argsort(table['frame'][keep], kind='stable')]
+
+        boxes = {
+            'frame': np.asarray(table['frame'][rows]),
+            'track_id': np.asarray(table['track_id'][rows]),
+            'class_id': np.asarray(table['class_id'][rows]),
+            'xtl': np.asarray(table['x1'][rows]),
+            'ytl': np.asarray(table['y1'][rows]),
+            'xbr': np.asarray(table['x2'][rows]),
+            'ybr': np.asarray(table['y2'][rows]),
+        }
 
-        return frame_annotations, gt_tracking, xml_width, xml_height
+        return boxes, xml_width, xml_height
 
     def bbox_to_yolo(self, xtl, ytl, xbr, ybr, img_width, img_height):
         """
-        Convert bbox from (xtl, ytl, xbr, ybr) to YOLO format:
+        Convert bboxes from (xtl, ytl, xbr, ybr) to YOLO format:
         (x_center, y_center, width, height) normalized to [0, 1]
 
         Args:
-            xtl, ytl, xbr, ybr: Bounding box coordinates in pixels
+            xtl, ytl, xbr, ybr: Bounding box coordinates in pixels (arrays or scalars)
             img_width, img_height: Image dimensions for normalization
         """
+        xtl, ytl, xbr, ybr = (np.asarray(v, dtype=np.float64) for v in (xtl, ytl, xbr, ybr))
+
         x_center = (xtl + xbr) / (2 * img_width)
         y_center = (ytl + ybr) / (2 * img_height)
         width = (xbr - xtl) / img_width
         height = (ybr - ytl) / img_height
 
-        # Clip to [0, 1] range
-        x_center = max(0.0, min(1.0, x_center))
-        y_center = max(0.0, min(1.0, y_center))
-        width = max(0.0, min(1.0, width))
-        height = max(0.0, min(1.0, height))
+        # Clip to [0, 1] range (+ 0.0 turns -0.0 into 0.0, as max(0.0, ...) did)
+        x_center = np.minimum(1.0, np.maximum(0.0, x_center)) + 0.0
+        y_center = np.minimum(1.0, np.maximum(0.0, y_center)) + 0.0
+        width = np.minimum(1.0, np.maximum(0.0, width)) + 0.0
+        height = np.minimum(1.0, np.maximum(0.0, height)) + 0.0
 
         return x_center, y_center, width, height
 
-    def convert_dataset(self, dataset_name, xml_path, output_dir,
-                       train_frames, val_frames):
+    def frame_ranges(self, boxes, frames):
+        """Start/end rows of each frame in the frame-sorted box arrays"""
+        frames = np.asarray(frames, dtype=np.int64)
+        starts = np.searchsorted(boxes['frame'], frames, side='left')
+        ends = np.searchsorted(boxes['frame'], frames, side='right')
+        return starts, ends
+
+    def pack_split(self, dataset_name, frames, boxes, packed):
         """
-        Convert a dataset's XML annotations to YOLO format.
+        Shard piece of one split: (frame names, BOX_DTYPE boxes, boxes per frame)
+        """
+        starts, ends = self.frame_ranges(boxes, frames)
+        rows = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)]
+                              or [np.zeros(0, dtype=np.int64)])
+        names = [frame_name(dataset_name, frame_id) for frame_id in frames]
+        return names, packed[rows], ends - starts
+
+    def split_stats(self, frames, boxes):
+        """
+        Box counts of one split.
+
+        Args:
+            frames: Frame indices of the split
+            boxes: Per-box arrays from parse_xml
+
+        Returns: (total boxes, defaultdict of per-class counts)
+        """
+        in_split = np.isin(boxes['frame'], np.asarray(frames, dtype=np.int64))
+        classes = defaultdict(int)
+        for class_id, count in zip(*np.unique(boxes['class_id'][in_split], return_counts=True)):
+            classes[int(class_id)] = int(count)
+        return int(in_split.sum()), classes
+
+    def convert_dataset(self, dataset_name, xml_path, train_frames, val_frames):
+        """
+        Convert a dataset's XML annotations to YOLO boxes for the packed label shards
+        (per-frame .txt labels are exported from the shards by export_yolo_labels.py).
 
         Args:
             dataset_name: Name of dataset (e.g., 'RBK-AALESUND')
             xml_path: Path to annotations.xml
-            output_dir: Base output directory
             train_frames: List of frame indices for training
             val_frames: List of frame indices for validation
+
+        Returns: (stats, validation gt_tracking, {split: shard piece} for the packed label shards)
         """
         print(f"\nProcessing {dataset_name}...")
 
         # Parse XML and get image dimensions
-        frame_annotations, gt_tracking, img_width, img_height = self.parse_xml(xml_path)
+        boxes, img_width, img_height = self.parse_xml(xml_path)
         print(f"  Image dimensions from XML: {img_width}x{img_height}")
 
-        # Create output directories
-        train_labels_dir = Path(output_dir) / 'labels' / 'train'
-        val_labels_dir = Path(output_dir) / 'labels' / 'val'
-        train_labels_dir.mkdir(parents=True, exist_ok=True)
-        val_labels_dir.mkdir(parents=True, exist_ok=True)
-
-        # Statistics
-        stats = {
-            'train': {'total': 0, 'classes': defaultdict(int)},
-            'val': {'total': 0, 'classes': defaultdict(int)}
-        }
-
-        # Convert training frames
-        for frame_id in train_frames:
-            if frame_id not in frame_annotations:
-                # Empty frame (no annotations)
-                label_file = train_labels_dir / f'{dataset_name}_frame_{frame_id+1:06d}.txt'
-                label_file.write_text('')
-                continue
-
-            boxes = frame_annotations[frame_id]
-            label_file = train_labels_dir / f'{dataset_name}_frame_{frame_id+1:06d}.txt'
-
-            with open(label_file, 'w') as f:
-                for box in boxes:
-                    class_id = box['class_id']
-                    x_c, y_c, w, h = self.bbox_to_yolo(
-                        box['xtl'], box['ytl'], box['xbr'], box['ybr'],
-                        img_width, img_height
-                    )
-                    f.write(f"{class_id} {x_c:.6f} {y_c:.6f} {w:.6f} {h:.6f}\n")
-
-                    stats['train']['total'] += 1
-                    stats['train']['classes'][class_id] += 1
-
-        # Convert validation frames
-        for frame_id in val_frames:
-            if frame_id not in frame_annotations:
-                # Empty frame
-                label_file = val_labels_dir / f'{dataset_name}_frame_{frame_id+1:06d}.txt'
-                label_file.write_text('')
-                continue
-
-            boxes = frame_annotations[frame_id]
-            label_file = val_labels_dir / f'{dataset_name}_frame_{frame_id+1:06d}.txt'
+        # Normalize every box of the match at once
+        x_c, y_c, w, h = self.bbox_to_yolo(
+            boxes['xtl'], boxes['ytl'], boxes['xbr'], boxes['ybr'],
+            img_width, img_height
+        )
 
-            with open(label_file, 'w') as f:
-                for box in boxes:
-                    class_id = box['class_id']
-                    x_c, y_c, w, h = self.bbox_to_yolo(
-                        box['xtl'], box['ytl'], box['xbr'], box['ybr'],
-                        img_width, img_height
-                    )
-                    f.write(f"{class_id} {x_c:.6f} {y_c:.6f} {w:.6f} {h:.6f}\n")
+        packed = np.zeros(len(boxes['frame']), dtype=BOX_DTYPE)
+        packed['class_id'] = boxes['class_id']
+        packed['track_id'] = boxes['track_id']
+        packed['x_center'] = x_c
+        packed['y_center'] = y_c
+        packed['width'] = w
+        packed['height'] = h
 
-                    stats['val']['total'] += 1
-                    stats['val']['classes'][class_id] += 1
+        # Statistics
+        stats = {}
+        shard_parts = {}
+        for split, frames in [('train', train_frames), ('val', val_frames)]:
+            total, classes = self.split_stats(frames, boxes)
+            stats[split] = {'total': total, 'classes': classes}
+            shard_parts[split] = self.pack_split(dataset_name, frames, boxes, packed)
 
         # Print statistics
         print(f"  Train: {len(train_frames)} frames, {stats['train']['total']} boxes")
@@ -206,13 +171,81 @@ class XMLToYOLOConverter:
               f"referee={stats['val']['classes'][2]}, ball={stats['val']['classes'][3]}")
 
         # Extract ground truth tracking for validation set only
-        val_gt_tracking = {
-            str(frame_id): gt_tracking[frame_id]
-            for frame_id in val_frames
-            if frame_id in gt_tracking
-        }
+        gt_columns = [boxes[name].tolist() for name in ('track_id', 'class_id', 'xtl', 'ytl', 'xbr', 'ybr')]
+        starts, ends = self.frame_ranges(boxes, val_frames)
 
-        return stats, val_gt_tracking
+        val_gt_tracking = {}
+        for frame_id, start, end in zip(val_frames, starts.tolist(), ends.tolist()):
+            if start == end:
+                continue
+            val_gt_tracking[str(frame_id)] = [
+                {
+                    'track_id': track_id,
+                    'class_id': class_id,
+                    'bbox': [xtl, ytl, xbr, ybr]
+                }
+                for track_id, class_id, xtl, ytl, xbr, ybr in zip(*(col[start:end] for col in gt_columns))
+            ]
+
+        return stats, val_gt_tracking, shard_parts
+
+
+def convert_match(job):
+    """
+    Convert one match in a worker process.
+    job: (dataset_name, xml_path, train_frames, val_frames)
+    """
+    dataset_name, xml_path, train_frames, val_frames = job
+    stats, gt_tracking, shard_parts = XMLToYOLOConverter().convert_dataset(
+        dataset_name=dataset_name,
+        xml_path=xml_path,
+        train_frames=train_frames,
+        val_frames=val_frames
+    )
+    return dataset_name, stats, gt_tracking, shard_parts
+
+
+def previous_shard_parts(shards, names_by_split):
+    """
+    Shard pieces of an unchanged match, copied from the previous run's shards.
+    Returns None if any frame is missing from them.
+    """
+    parts = {}
+    for split, names in names_by_split.items():
+        shard = shards.get(split)
+        if shard is None or not all(name in shard for name in names):
+            return None
+        frame_boxes = [shard[name] for name in names]
+        parts[split] = (names,
+                        np.concatenate(frame_boxes) if frame_boxes else np.zeros(0, dtype=BOX_DTYPE),
+                        np.array([len(b) for b in frame_boxes], dtype=np.int64))
+    return parts
+
+
+def load_manifest(output_dir):
+    """Load the label manifest of the previous run (empty if missing or outdated)"""
+    manifest_path = Path(output_dir) / MANIFEST_NAME
+    if manifest_path.exists():
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    return {'version': MANIFEST_VERSION, 'matches': {}}
+
+
+def save_manifest(output_dir, manifest):
+    """Atomically replace the label manifest"""
+    manifest_path = Path(output_dir) / MANIFEST_NAME
+    tmp_path = manifest_path.with_name(f'{MANIFEST_NAME}.{os.getpid()}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, manifest_path)
+
+
+def num_workers(num_jobs):
+    """Worker processes to use: one per match, capped by the CPUs we were given"""
+    cpus = int(os.environ.get('SLURM_CPUS_PER_TASK', 0)) or os.cpu_count() or 1
+    return max(1, min(num_jobs, cpus))
 
 
 def main():
@@ -245,33 +278,97 @@ def main():
         }
     }
 
-    # Initialize converter
-    converter = XMLToYOLOConverter()
+    # Previous run: label manifest and ground truth tracking
+    manifest = load_manifest(output_dir)
+    gt_tracking_path = output_dir / 'gt_tracking.json'
+    previous_gt_tracking = {}
+    if gt_tracking_path.exists():
+        with open(gt_tracking_path) as f:
+            previous_gt_tracking = json.load(f)
+
+    # Packed per-split label shards (read by frame in O(1) instead of one .txt per frame)
+    shard_root = output_dir / 'shards'
+    previous_shards = {
+        split: LabelShard(shard_root / split)
+        for split in ('train', 'val')
+        if (shard_root / split / 'index.json').exists()
+    }
+
+    results = {}
+    jobs = []
+    for dataset_name, config in datasets.items():
+        train_frames = list(range(0, config['train_end'] + 1))
+        val_frames = list(range(config['val_start'], config['total_frames']))
+
+        # Content hash of the XML (taken from the annotation cache, which only
+        # rehashes when the file's size or mtime changed)
+        source = {
+            'xml_path': str(config['xml_path']),
+            'sha1': load_annotations(config['xml_path']).meta['sha1'],
+            'splits': {'train': [train_frames[0], train_frames[-1]],
+                       'val': [val_frames[0], val_frames[-1]]},
+        }
+        previous = manifest['matches'].get(dataset_name, {})
+
+        unchanged = (all(previous.get(key) == value for key, value in source.items())
+                     and dataset_name in previous_gt_tracking)
+        shard_parts = None
+        if unchanged:
+            shard_parts = previous_shard_parts(previous_shards, {
+                'train': [frame_name(dataset_name, frame_id) for frame_id in train_frames],
+                'val': [frame_name(dataset_name, frame_id) for frame_id in val_frames],
+            })
+
+        if shard_parts is not None:
+            print(f"\n{dataset_name}: annotations unchanged, skipping")
+            stats = {
+                split: {'total': previous['stats'][split]['total'],
+                        'classes': defaultdict(int, {int(c): n for c, n in previous['stats'][split]['classes'].items()})}
+                for split in ('train', 'val')
+            }
+            results[dataset_name] = (stats, previous_gt_tracking[dataset_name], shard_parts)
+        else:
+            jobs.append((dataset_name, config['xml_path'], train_frames, val_frames))
+
+        manifest['matches'][dataset_name] = source
+
+    if PARALLEL and len(jobs) > 1:
+        workers = num_workers(len(jobs))
+        print(f"Converting {len(jobs)} matches with {workers} worker processes")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for dataset_name, *result in pool.map(convert_match, jobs):
+                results[dataset_name] = tuple(result)
+    else:
+        for job in jobs:
+            dataset_name, *result = convert_match(job)
+            results[dataset_name] = tuple(result)
+
+    # The shards are rewritten when any match was converted or is missing from them
+    rewrite_shards = bool(jobs) or len(previous_shards) < 2
+
+    # Forget matches that were removed from the configuration (their frames leave the shards)
+    for dataset_name in list(manifest['matches']):
+        if dataset_name not in datasets:
+            manifest['matches'].pop(dataset_name)
+            rewrite_shards = True
+            print(f"\n{dataset_name}: removed from the configuration, dropped from the shards")
 
     # Global statistics
     all_stats = {'train': defaultdict(int), 'val': defaultdict(int)}
     all_gt_tracking = {}
+    all_shard_parts = {'train': [], 'val': []}
 
-    # Process each dataset
+    # Merge per-match results in dataset order so gt_tracking.json is deterministic
     for dataset_name, config in datasets.items():
-        train_frames = list(range(0, config['train_end'] + 1))
-        val_frames = list(range(config['val_start'], config['total_frames']))
-
-        stats, gt_tracking = converter.convert_dataset(
-            dataset_name=dataset_name,
-            xml_path=config['xml_path'],
-            output_dir=output_dir,
-            train_frames=train_frames,
-            val_frames=val_frames
-        )
+        stats, gt_tracking, shard_parts = results[dataset_name]
 
         # Accumulate statistics
-        all_stats['train']['frames'] += len(train_frames)
+        all_stats['train']['frames'] += config['train_end'] + 1
         all_stats['train']['boxes'] += stats['train']['total']
         for class_id, count in stats['train']['classes'].items():
             all_stats['train'][f'class_{class_id}'] += count
 
-        all_stats['val']['frames'] += len(val_frames)
+        all_stats['val']['frames'] += config['total_frames'] - config['val_start']
         all_stats['val']['boxes'] += stats['val']['total']
         for class_id, count in stats['val']['classes'].items():
             all_stats['val'][f'class_{class_id}'] += count
@@ -279,11 +376,28 @@ def main():
         # Store ground truth tracking
         all_gt_tracking[dataset_name] = gt_tracking
 
-    # Save ground truth tracking
-    gt_tracking_path = output_dir / 'gt_tracking.json'
-    with open(gt_tracking_path, 'w') as f:
-        json.dump(all_gt_tracking, f, indent=2)
-    print(f"\nSaved ground truth tracking to {gt_tracking_path}")
+        manifest['matches'][dataset_name].update({'stats': stats})
+
+        for split, part in shard_parts.items():
+            all_shard_parts[split].append(part)
+
+    if rewrite_shards:
+        for split, parts in all_shard_parts.items():
+            names = [name for part in parts for name in part[0]]
+            boxes = np.concatenate([part[1] for part in parts]) if parts else np.zeros(0, dtype=BOX_DTYPE)
+            counts = np.concatenate([part[2] for part in parts]) if parts else np.zeros(0, dtype=np.int64)
+            write_shard(shard_root / split, names, boxes, counts)
+            print(f"\nSaved {split} label shard to {shard_root / split} "
+                  f"({len(names)} frames, {len(boxes)} boxes)")
+
+    # Save ground truth tracking (skipped when nothing changed)
+    if jobs or all_gt_tracking != previous_gt_tracking:
+        with open(gt_tracking_path, 'w') as f:
+            json.dump(all_gt_tracking, f, indent=2)
+        print(f"\nSaved ground truth tracking to {gt_tracking_path}")
+
+    # Manifest last: shards on disk always match it or are newer
+    save_manifest(output_dir, manifest)
 
     # Print overall statistics
     print("\n" + "="*60)
@@ -297,6 +411,7 @@ def main():
           f"referee={all_stats['val']['class_2']}, ball={all_stats['val']['class_3']}")
 
     print("\nConversion complete!")
+    print("Run export_yolo_labels.py to write the per-frame .txt labels Ultralytics trains on.")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,3 @@
+"""
+Shared frame and video I/O used by all pipeline stages.
+"""
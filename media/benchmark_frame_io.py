@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark PNG decode vs memory-mapped frame store reads.
+
+For one 1920x1080 and one 1280x720 match, times:
+  - png:       cv2.imread of each frame (what the pipeline did before)
+  - mmap view: store[frame] (zero-copy, pages are touched lazily)
+  - mmap copy: store[frame] copied into a buffer (every byte read once)
+
+Uses the real frame stores when they exist; otherwise decodes a temporary
+store from the match PNGs first.
+"""
+
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Add repository root to path for the shared media package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from media.framestore import FRAME_STORE_DIR, open_store, build_store, image_path
+
+
+def time_reads(read, frame_numbers, repeats):
+    """Best per-frame time (ms) over repeats, and the frames/s it implies"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for frame_number in frame_numbers:
+            read(frame_number)
+        best = min(best, time.perf_counter() - start)
+    per_frame_ms = 1000 * best / len(frame_numbers)
+    return per_frame_ms, 1000 / per_frame_ms
+
+
+def benchmark_match(match_name, image_dir, frame_numbers, repeats, tmp_root):
+    """Time the three read paths over the same frames of one match"""
+    store = open_store(match_name)
+    if store is None:
+        print(f"  No frame store for {match_name}, decoding {len(frame_numbers)} frames to {tmp_root}...")
+        store = build_store(Path(tmp_root) / match_name, image_dir, frame_numbers)
+
+    frame_numbers = [n for n in frame_numbers if n in store]
+    buffer = np.empty(store.shape, dtype=np.uint8)
+
+    def read_png(n):
+        return cv2.imread(str(image_path(image_dir, n)))
+
+    def read_view(n):
+        return store[n]
+
+    def read_copy(n):
+        np.copyto(buffer, store[n])
+
+    # Warm-up pass so both paths read from the page cache
+    for n in frame_numbers:
+        read_png(n)
+        read_copy(n)
+
+    results = {
+        'resolution': f'{store.width}x{store.height}',
+        'frames': len(frame_numbers),
+    }
+    for method, read in [('png', read_png), ('mmap_view', read_view), ('mmap_copy', read_copy)]:
+        per_frame_ms, fps = time_reads(read, frame_numbers, repeats)
+        results[method] = {'ms_per_frame': round(per_frame_ms, 4), 'fps': round(fps, 1)}
+
+    return results
+
+
+def main():
+    source_dir = Path('/cluster/projects/vc/courses/TDT17/other/Football2025')
+    output_path = FRAME_STORE_DIR / 'benchmark_frame_io.json'
+
+    # One sequence per resolution (validation frames, see run_tracking_validation.py)
+    matches = {
+        'RBK-AALESUND': range(1623, 1803),     # 1920x1080
+        'RBK-FREDRIKSTAD': range(1636, 1817),  # 1280x720
+    }
+    repeats = 3
+
+    print("="*80)
+    print("Frame I/O Benchmark: PNG decode vs memory-mapped frame store")
+    print("="*80)
+
+    all_results = {}
+    with tempfile.TemporaryDirectory(prefix='frame_store_') as tmp_root:
+        for match_name, frame_numbers in matches.items():
+            image_dir = source_dir / match_name / 'data' / 'images' / 'train'
+            print(f"\n{match_name}:")
+            all_results[match_name] = benchmark_match(match_name, image_dir, list(frame_numbers),
+                                                      repeats, tmp_root)
+
+    print(f"\n{'='*80}")
+    print(f"{'Match':<18} {'Resolution':<11} {'Frames':>6} {'PNG ms':>9} {'View ms':>9} "
+          f"{'Copy ms':>9} {'PNG fps':>9} {'Copy fps':>9} {'Speedup':>8}")
+    print("-"*80)
+    for match_name, r in all_results.items():
+        speedup = r['png']['ms_per_frame'] / r['mmap_copy']['ms_per_frame']
+        r['speedup_copy_vs_png'] = round(speedup, 1)
+        print(f"{match_name:<18} {r['resolution']:<11} {r['frames']:>6} "
+              f"{r['png']['ms_per_frame']:>9.3f} {r['mmap_view']['ms_per_frame']:>9.4f} "
+              f"{r['mmap_copy']['ms_per_frame']:>9.3f} {r['png']['fps']:>9.1f} "
+              f"{r['mmap_copy']['fps']:>9.1f} {speedup:>7.1f}x")
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(all_results, f, indent=2)
+    print(f"\nResults saved to: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
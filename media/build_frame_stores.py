@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Decode each match once into a memory-mapped frame store.
+
+Tracking, evaluation and visualization scripts read frames from
+frame_store/<match>/ when it exists and fall back to the PNGs otherwise,
+so building the stores is optional. A match with a video file (see
+media/video.py) is decoded from the video, so no PNGs are needed at all.
+Rerunning skips stores that are already complete for the configured frames.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Add repository root to path for the shared media package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from media.framestore import FRAME_STORE_DIR, DEFAULT_CHUNK_FRAMES, open_store, build_store
+from media.video import find_video, load_video_index
+
+
+def main():
+    source_dir = Path('/cluster/projects/vc/courses/TDT17/other/Football2025')
+
+    # Image frame numbers to decode per match (all frames of the labelled matches)
+    matches = {
+        'RBK-AALESUND': range(1, 1803),
+        'RBK-FREDRIKSTAD': range(1, 1817),
+        'RBK-HamKam': range(1, 1524),
+    }
+
+    # None writes one array per match instead of fixed-size chunks
+    chunk_frames = DEFAULT_CHUNK_FRAMES
+
+    print("="*60)
+    print("Building frame stores")
+    print("="*60)
+    print(f"Output directory: {FRAME_STORE_DIR}")
+    print(f"Chunk size: {chunk_frames or 'single array'} frames")
+
+    for match_name, frame_numbers in matches.items():
+        image_dir = source_dir / match_name / 'data' / 'images' / 'train'
+        video_path = find_video(match_name)
+        print(f"\n{match_name}:")
+        print(f"  Source: {video_path or image_dir}")
+
+        if video_path is not None:
+            video_index = load_video_index(video_path)
+            expected = [n for n in frame_numbers if n in video_index]
+        else:
+            expected = [n for n in frame_numbers if (image_dir / f'frame_{n:06d}.png').exists()]
+
+        store = open_store(match_name)
+        if (store is not None and store.frames == expected
+                and store.meta.get('video_path') == (str(video_path) if video_path else None)):
+            print(f"  ✓ Up to date ({len(store)} frames, {store.width}x{store.height})")
+            continue
+
+        start = time.perf_counter()
+        store = build_store(FRAME_STORE_DIR / match_name, image_dir, frame_numbers,
+                            chunk_frames=chunk_frames, video_path=video_path)
+        elapsed = time.perf_counter() - start
+
+        size_gb = len(store) * store.width * store.height * 3 / 1e9
+        print(f"  ✓ Decoded {len(store)} frames ({store.width}x{store.height}, "
+              f"{size_gb:.1f} GB) in {elapsed:.1f}s")
+
+    print("\nFrame stores ready!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""
+Pre-decoded frame store
+
+Each match is decoded once, from its PNGs or its video, into uint8 BGR
+arrays (the layout cv2.imread returns) stored as one or more .npy chunks
+of shape (frames, height, width, 3):
+    chunk_00000.npy ...  decoded frames, chunk_frames frames per chunk
+    meta.json           frame numbers in storage order, frame shape, chunking
+
+Chunks are memory-mapped, so store[frame_number] is a zero-copy read-only
+view into the page cache instead of a PNG decode. Frame numbers are image
+frame numbers (frame_000001.png is frame 1, i.e. XML frame 0).
+"""
+
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from media.video import VideoReader, load_video_index
+
+# Stores are written next to the pipeline outputs (source data is read-only)
+FRAME_STORE_DIR = Path('/cluster/work/tmstorma/Football2025/frame_store')
+
+# Bump when the chunk layout changes so old stores are rebuilt
+STORE_VERSION = 1
+
+# 256 frames is ~1.6 GB per chunk at 1920x1080 (~0.7 GB at 1280x720)
+DEFAULT_CHUNK_FRAMES = 256
+
+# Frames decoded ahead of the consumer by prefetch_frames (~6 MB each at 1920x1080)
+DEFAULT_PREFETCH = 32
+
+
+def image_path(image_dir, frame_number):
+    """Source PNG of an image frame number"""
+    return Path(image_dir) / f'frame_{frame_number:06d}.png'
+
+
+class FrameStore:
+    """
+    Memory-mapped decoded frames of one match.
+    store[1623] returns frame_001623.png as a read-only (H, W, 3) uint8 view.
+    """
+
+    def __init__(self, store_dir):
+        store_dir = Path(store_dir)
+        with open(store_dir / 'meta.json') as f:
+            meta = json.load(f)
+
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(f"{store_dir}: store version {meta.get('version')}, expected {STORE_VERSION}")
+
+        self.store_dir = store_dir
+        self.meta = meta
+        self.frames = meta['frames']
+        self.shape = tuple(meta['shape'])
+        self.chunk_frames = meta['chunk_frames']
+        self.positions = {frame: i for i, frame in enumerate(self.frames)}
+        self.chunks = [
+            np.load(store_dir / name, mmap_mode='r')
+            for name in meta['chunks']
+        ]
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __contains__(self, frame_number):
+        return frame_number in self.positions
+
+    def __getitem__(self, frame_number):
+        """Decoded BGR frame as a zero-copy view (copy before drawing on it)"""
+        i = self.positions[frame_number]
+        return self.chunks[i // self.chunk_frames][i % self.chunk_frames]
+
+    def get(self, frame_number, default=None):
+        if frame_number not in self.positions:
+            return default
+        return self[frame_number]
+
+    @property
+    def width(self):
+        return self.shape[1]
+
+    @property
+    def height(self):
+        return self.shape[0]
+
+
+def build_store(store_dir, image_dir, frame_numbers, chunk_frames=DEFAULT_CHUNK_FRAMES, video_path=None):
+    """
+    Decode the frames of one match into a frame store.
+
+    Args:
+        store_dir: Output directory (one per match)
+        image_dir: Directory with frame_XXXXXX.png images
+        frame_numbers: Image frame numbers to store; missing frames are skipped
+        chunk_frames: Frames per chunk file (None for a single array)
+        video_path: Decode from this match video instead of the PNGs
+
+    Returns:
+        FrameStore over the new store
+    """
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    if video_path is not None:
+        video_index = load_video_index(video_path)
+        frames = sorted(n for n in frame_numbers if n in video_index)
+    else:
+        frames = sorted(n for n in frame_numbers if image_path(image_dir, n).exists())
+    if not frames:
+        raise FileNotFoundError(f"No frames found in {video_path or image_dir}")
+
+    chunk_frames = chunk_frames or len(frames)
+    source = iter_frames(frames, image_dir, video_path=video_path)
+    shape = None
+
+    # Chunks first, meta.json last: open_store() only opens a store with a meta.json.
+    # A rebuild removes the old meta before replacing any chunk, so an interrupted
+    # rebuild leaves no store instead of an old meta.json over new chunks.
+    (store_dir / 'meta.json').unlink(missing_ok=True)
+    pid = os.getpid()
+    chunk_names = []
+    for chunk_start in range(0, len(frames), chunk_frames):
+        chunk = frames[chunk_start:chunk_start + chunk_frames]
+        name = f'chunk_{len(chunk_names):05d}.npy'
+        tmp_path = store_dir / f'{name[:-4]}.{pid}.tmp.npy'
+
+        # Decode straight into the memory-mapped output, one frame at a time
+        array = None
+        for i, expected in enumerate(chunk):
+            frame_number, img = next(source, (None, None))
+            if frame_number != expected or img is None:
+                raise ValueError(f"Could not read frame {expected} from {video_path or image_dir}")
+            if shape is None:
+                shape = img.shape
+            if img.shape != shape:
+                raise ValueError(f"Frame {expected} is {img.shape}, expected {shape}")
+            if array is None:
+                array = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8,
+                                                  shape=(len(chunk),) + shape)
+            array[i] = img
+        array.flush()
+        del array
+
+        os.replace(tmp_path, store_dir / name)
+        chunk_names.append(name)
+
+    meta = {
+        'version': STORE_VERSION,
+        'image_dir': str(image_dir),
+        'video_path': str(video_path) if video_path is not None else None,
+        'frames': frames,
+        'shape': list(shape),
+        'chunk_frames': chunk_frames,
+        'chunks': chunk_names,
+    }
+    tmp_meta = store_dir / f'meta.{pid}.tmp.json'
+    with open(tmp_meta, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, store_dir / 'meta.json')
+
+    # Drop chunks left over from an earlier build with more frames
+    for stale in store_dir.glob('chunk_*.npy'):
+        if stale.name not in chunk_names:
+            stale.unlink()
+
+    return FrameStore(store_dir)
+
+
+def open_store(match_name, store_root=None):
+    """FrameStore of a match, or None if it has not been built"""
+    store_dir = Path(store_root or FRAME_STORE_DIR) / match_name
+    if not (store_dir / 'meta.json').exists():
+        return None
+    return FrameStore(store_dir)
+
+
+def read_frame(store, image_dir, frame_number):
+    """
+    Decoded BGR frame from the store, falling back to the PNG.
+    Returns None if neither has the frame.
+    """
+    if store is not None and frame_number in store:
+        return store[frame_number]
+    path = image_path(image_dir, frame_number)
+    if not path.exists():
+        return None
+    return cv2.imread(str(path))
+
+
+def prefetch_frames(frame_numbers, load, workers=4, prefetch=DEFAULT_PREFETCH):
+    """
+    Yield (frame_number, load(frame_number)) in order, decoded by a thread pool.
+
+    At most `prefetch` frames are in flight (decoded or decoding) ahead of the
+    consumer, so memory stays bounded however long the sequence is. cv2 releases
+    the GIL while decoding, so threads decode PNGs in parallel.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for frame_number in frame_numbers:
+            pending.append((frame_number, pool.submit(load, frame_number)))
+            if len(pending) >= prefetch:
+                frame_number, future = pending.popleft()
+                yield frame_number, future.result()
+        while pending:
+            frame_number, future = pending.popleft()
+            yield frame_number, future.result()
+
+
+def iter_frames(frame_numbers, image_dir, store=None, video_path=None, workers=None):
+    """
+    Yield (frame_number, BGR frame) in ascending frame order, skipping missing frames.
+
+    With a video, frames are decoded sequentially in a background thread from
+    the first to the last requested frame (frames in between are decoded and
+    dropped). Otherwise each frame comes from the store or its PNG, decoded by
+    `workers` threads ahead of the consumer when workers is set.
+    """
+    frame_numbers = sorted(frame_numbers)
+    if not frame_numbers:
+        return
+
+    if video_path is not None and not (store is not None and all(n in store for n in frame_numbers)):
+        wanted = set(frame_numbers)
+        with VideoReader(video_path, start=frame_numbers[0], end=frame_numbers[-1]) as reader:
+            for frame_number, frame in reader:
+                if frame_number in wanted:
+                    yield frame_number, frame
+        return
+
+    def load(frame_number):
+        return read_frame(store, image_dir, frame_number)
+
+    if workers:
+        frames = prefetch_frames(frame_numbers, load, workers=workers)
+    else:
+        frames = ((frame_number, load(frame_number)) for frame_number in frame_numbers)
+
+    for frame_number, img in frames:
+        if img is not None:
+            yield frame_number, img
@@ -0,0 +1,248 @@
+"""
+Video-native frame ingestion
+
+Reads frames straight from a match video (MP4/MKV) instead of one PNG per
+frame. Frames are numbered like the PNGs: the first decoded frame is frame 1
+(frame_000001.png), so XML frame N is video frame N + 1 in both sources.
+
+VideoReader decodes sequentially in a background thread into a bounded
+queue, so decoding overlaps with whatever consumes the frames (tracking,
+drawing, writing). VideoIndex maps frame numbers to presentation timestamps
+and back; it is built once per video with a grab-only pass and cached.
+"""
+
+import hashlib
+import os
+import queue
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Match videos are looked up next to the PNG frames of each match
+VIDEO_DIR = Path('/cluster/projects/vc/courses/TDT17/other/Football2025')
+
+# Timestamp indexes are cached next to the pipeline outputs (source data is read-only)
+VIDEO_INDEX_DIR = Path('/cluster/work/tmstorma/Football2025/video_index')
+
+VIDEO_EXTENSIONS = ('.mp4', '.mkv')
+
+# Decoded frames buffered ahead of the consumer (~6 MB each at 1920x1080)
+DEFAULT_QUEUE_SIZE = 32
+
+# A reader starting later than this seeks instead of grabbing from frame 1; it lands
+# SEEK_MARGIN frames before start and grabs the rest (containers seek to keyframes)
+SEEK_MIN_FRAMES = 50
+SEEK_MARGIN = 25
+
+
+def find_video(match_name, video_dir=None):
+    """Video file of a match (match dir, data/ or video/), or None if there is none"""
+    match_dir = Path(video_dir or VIDEO_DIR) / match_name
+    for folder in [match_dir, match_dir / 'data', match_dir / 'video']:
+        if not folder.is_dir():
+            continue
+        for path in sorted(folder.iterdir()):
+            if path.suffix.lower() in VIDEO_EXTENSIONS:
+                return path
+    return None
+
+
+class VideoIndex:
+    """
+    Frame number <-> timestamp lookup of one video.
+    Frame numbers are image frame numbers (1-based); XML frame = frame number - 1.
+    """
+
+    def __init__(self, timestamps_ms):
+        self.timestamps_ms = np.asarray(timestamps_ms, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.timestamps_ms)
+
+    def __contains__(self, frame_number):
+        return 1 <= frame_number <= len(self)
+
+    @property
+    def frame_numbers(self):
+        return range(1, len(self) + 1)
+
+    @property
+    def fps(self):
+        """Average frame rate (handles variable frame rate videos)"""
+        if len(self) < 2:
+            return 0.0
+        return 1000 * (len(self) - 1) / (self.timestamps_ms[-1] - self.timestamps_ms[0])
+
+    def timestamp(self, frame_number):
+        """Presentation time of a frame in milliseconds"""
+        if frame_number not in self:
+            raise IndexError(f"frame {frame_number} outside video (1-{len(self)})")
+        return float(self.timestamps_ms[frame_number - 1])
+
+    def nearest_frame(self, timestamp_ms):
+        """Frame number whose timestamp is closest to timestamp_ms (a decoder position)"""
+        return int(np.argmin(np.abs(self.timestamps_ms - timestamp_ms))) + 1
+
+    def frame_at(self, timestamp_ms):
+        """Frame number shown at a timestamp (the last frame starting at or before it)"""
+        i = int(np.searchsorted(self.timestamps_ms, timestamp_ms, side='right'))
+        return max(i, 1)
+
+    def xml_frame(self, frame_number):
+        """CVAT XML frame of a video frame number"""
+        return frame_number - 1
+
+    def image_frame(self, xml_frame):
+        """Video frame number (= PNG frame number) of a CVAT XML frame"""
+        return xml_frame + 1
+
+
+def _index_path(video_path, index_dir):
+    """Cache file of a video's index, keyed by path, size and mtime"""
+    stat = os.stat(video_path)
+    key = f'{Path(video_path).resolve()}:{stat.st_size}:{stat.st_mtime_ns}'
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return Path(index_dir) / f'{Path(video_path).stem}.{digest}.npy'
+
+
+def load_video_index(video_path, index_dir=None):
+    """
+    VideoIndex of a video, from the cache or built with one grab-only pass.
+    The cache is rebuilt automatically when the video's size or mtime changes.
+    """
+    index_dir = Path(index_dir or VIDEO_INDEX_DIR)
+    cache_path = _index_path(video_path, index_dir)
+    if cache_path.exists():
+        return VideoIndex(np.load(cache_path))
+
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise IOError(f"Could not open video {video_path}")
+
+    # grab() demuxes and decodes without the BGR conversion, much faster than read()
+    timestamps = []
+    while cap.grab():
+        timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+    cap.release()
+
+    index_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_dir / f'{cache_path.stem}.{os.getpid()}.tmp.npy'
+    np.save(tmp_path, np.asarray(timestamps, dtype=np.float64))
+    os.replace(tmp_path, cache_path)
+
+    return VideoIndex(timestamps)
+
+
+class VideoReader:
+    """
+    Sequential frames of a video, decoded in a background thread.
+
+        with VideoReader(path, start=1623, end=1802) as reader:
+            for frame_number, frame in reader:
+                ...
+
+    Frames are BGR uint8 arrays like cv2.imread returns. A late start seeks
+    close to it (CAP_PROP_POS_FRAMES; the position reached is read back through
+    the VideoIndex timestamps), the remaining frames before start are skipped
+    with grab() (no colour conversion); decoding stops after end.
+    """
+
+    _DONE = object()
+
+    def __init__(self, video_path, start=1, end=None, queue_size=DEFAULT_QUEUE_SIZE, index=None):
+        self.video_path = Path(video_path)
+        self.start = max(1, start)
+        self.end = end
+        if index is None and self.start > SEEK_MIN_FRAMES:
+            index = load_video_index(self.video_path)
+        self.index = index
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.error = None
+
+    def _put(self, item):
+        """Block until the consumer makes room, unless the reader is closed"""
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _seek(self, cap):
+        """
+        Move cap to SEEK_MARGIN frames before start. Returns the number of the last
+        frame consumed (0 when it stays at the beginning, e.g. after overshooting).
+        """
+        if self.start <= SEEK_MIN_FRAMES or self.index is None:
+            return 0
+        target = min(self.start, len(self.index) + 1) - SEEK_MARGIN
+        if target <= 1:
+            return 0
+
+        cap.set(cv2.CAP_PROP_POS_FRAMES, target - 1)
+        if cap.grab():
+            frame_number = self.index.nearest_frame(cap.get(cv2.CAP_PROP_POS_MSEC))
+            if frame_number < self.start:
+                return frame_number
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return 0
+
+    def _decode(self):
+        cap = cv2.VideoCapture(str(self.video_path))
+        try:
+            if not cap.isOpened():
+                raise IOError(f"Could not open video {self.video_path}")
+
+            frame_number = self._seek(cap)
+            while not self.stop_event.is_set():
+                frame_number += 1
+                if self.end is not None and frame_number > self.end:
+                    break
+                if frame_number < self.start:
+                    if not cap.grab():
+                        break
+                    continue
+
+                ok, frame = cap.read()
+                if not ok or not self._put((frame_number, frame)):
+                    break
+        except Exception as e:
+            self.error = e
+        finally:
+            cap.release()
+            self._put(self._DONE)
+
+    def __iter__(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._decode, daemon=True)
+            self.thread.start()
+
+        try:
+            while True:
+                item = self.queue.get()
+                if item is self._DONE:
+                    break
+                yield item
+        finally:
+            # Also reached when the consumer stops early (break / generator close)
+            self.close()
+
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        """Stop the decoder thread (safe to call before the video is exhausted)"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,72 @@
+"""
+Incremental export of label shards to per-frame YOLO .txt files
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from annotations.shard import BOX_DTYPE, LabelShard, export_yolo, write_shard
+
+
+def make_shard(shard_dir, frames):
+    """Shard of {name: [(class_id, x_c, y_c, w, h), ...]}"""
+    names = list(frames)
+    boxes = np.zeros(sum(len(rows) for rows in frames.values()), dtype=BOX_DTYPE)
+    rows = [row for name in names for row in frames[name]]
+    for field, column in zip(('class_id', 'x_center', 'y_center', 'width', 'height'), zip(*rows)):
+        boxes[field] = column
+    write_shard(shard_dir, names, boxes, [len(frames[name]) for name in names])
+    return LabelShard(shard_dir)
+
+
+def backdate(labels_dir):
+    """Set every label's mtime one hour back, so a rewrite is visible"""
+    mtimes = {}
+    for path in labels_dir.glob('*.txt'):
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 3600 * 10**9))
+        mtimes[path.name] = path.stat().st_mtime_ns
+    return mtimes
+
+
+def test_noop_rerun_leaves_labels_untouched(tmp_path):
+    frames = {
+        'M_frame_000001': [(0, 0.5, 0.5, 0.1, 0.2), (3, 0.25, 0.75, 0.01, 0.01)],
+        'M_frame_000002': [(1, 0.4, 0.6, 0.1, 0.2)],
+        'M_frame_000003': [],
+    }
+    shard = make_shard(tmp_path / 'shard', frames)
+    labels_dir = tmp_path / 'labels'
+
+    assert export_yolo(shard, labels_dir) == (3, 0)
+    assert all((labels_dir / f'{name}.txt').read_text() == shard.text(name) for name in frames)
+
+    mtimes = backdate(labels_dir)
+    assert export_yolo(shard, labels_dir) == (0, 0)
+    assert {path.name: path.stat().st_mtime_ns for path in labels_dir.glob('*.txt')} == mtimes
+
+
+def test_rerun_writes_changed_and_deletes_stale_labels(tmp_path):
+    frames = {
+        'M_frame_000001': [(0, 0.5, 0.5, 0.1, 0.2)],
+        'M_frame_000002': [(1, 0.4, 0.6, 0.1, 0.2)],
+        'M_frame_000003': [(2, 0.3, 0.3, 0.1, 0.2)],
+    }
+    labels_dir = tmp_path / 'labels'
+    export_yolo(make_shard(tmp_path / 'shard', frames), labels_dir)
+    mtimes = backdate(labels_dir)
+
+    frames['M_frame_000002'] = [(1, 0.45, 0.6, 0.1, 0.2)]
+    del frames['M_frame_000003']
+    shard = make_shard(tmp_path / 'shard', frames)
+    (labels_dir / 'M_frame_000001.txt').unlink()
+
+    assert export_yolo(shard, labels_dir) == (2, 1)
+    assert sorted(path.name for path in labels_dir.glob('*.txt')) == ['M_frame_000001.txt', 'M_frame_000002.txt']
+    assert (labels_dir / 'M_frame_000002.txt').read_text() == shard.text('M_frame_000002')
+    assert (labels_dir / 'M_frame_000002.txt').stat().st_mtime_ns != mtimes['M_frame_000002.txt']
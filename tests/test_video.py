@@ -0,0 +1,79 @@
+"""
+VideoReader seeking: a late start must not decode the video from frame 1
+"""
+
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from media import video
+from media.video import VideoReader, load_video_index
+
+NUM_FRAMES = 200
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    """Small test video; frame n is a flat image of value n (mod 256)"""
+    path = tmp_path / 'match.mp4'
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), 25, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("no mp4v encoder")
+    for frame_number in range(1, NUM_FRAMES + 1):
+        writer.write(np.full((48, 64, 3), frame_number % 256, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+class CountingCapture:
+    """cv2.VideoCapture that counts the frames it decodes"""
+    decoded = 0
+
+    def __init__(self, path):
+        self.cap = REAL_CAPTURE(path)
+
+    def grab(self):
+        CountingCapture.decoded += 1
+        return self.cap.grab()
+
+    def read(self):
+        CountingCapture.decoded += 1
+        return self.cap.read()
+
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
+
+
+REAL_CAPTURE = cv2.VideoCapture
+
+
+def test_late_start_seeks_instead_of_decoding_from_frame_1(video_path, tmp_path, monkeypatch):
+    index = load_video_index(video_path, index_dir=tmp_path / 'index')
+    assert len(index) == NUM_FRAMES
+
+    start, end = 170, 180
+    with VideoReader(video_path, end=end, index=index) as reader:
+        sequential = dict(reader)
+
+    monkeypatch.setattr(video.cv2, 'VideoCapture', CountingCapture)
+    CountingCapture.decoded = 0
+    with VideoReader(video_path, start=start, end=end, index=index) as reader:
+        frames = list(reader)
+
+    assert [frame_number for frame_number, _ in frames] == list(range(start, end + 1))
+    assert all(np.array_equal(frame, sequential[frame_number]) for frame_number, frame in frames)
+    assert CountingCapture.decoded < start - 1
+
+
+def test_early_start_matches_sequential_decode(video_path, tmp_path):
+    index = load_video_index(video_path, index_dir=tmp_path / 'index')
+    with VideoReader(video_path, start=1, end=40, index=index) as reader:
+        sequential = [frame for _, frame in reader][-10:]
+    with VideoReader(video_path, start=31, end=40, index=index) as reader:
+        skipped = [frame for _, frame in reader]
+    assert all(np.array_equal(a, b) for a, b in zip(sequential, skipped))
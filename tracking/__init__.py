@@ -0,0 +1,3 @@
+"""
+Tracking utilities shared by the tracking and evaluation scripts.
+"""
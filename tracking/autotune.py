@@ -0,0 +1,280 @@
+"""
+Batch size and thread autotuning for inference
+
+The best batch size and torch thread counts depend on the node (cores, memory
+bandwidth, GPU) and the model, so they are measured rather than hard-coded:
+a short calibration predicts a few frames at each broadcast resolution
+(1920x1080, 1280x720) with every candidate setting and keeps the fastest one
+whose peak memory stays under the cap.
+
+torch.set_num_interop_threads() only works before the first parallel op of a
+process, so each inter-op candidate is calibrated in its own spawned process
+(one at a time, so measurements do not compete for cores); intra-op threads
+and batch sizes are varied inside it. On a GPU only the batch size is tuned.
+ONNX Runtime / OpenVINO run their own thread pools, so for exported backends
+the thread settings only affect the torch parts (preprocessing, NMS).
+
+The choice is cached per host and model (weights hash, backend, CPUs of the
+allocation, candidate grid) under AUTOTUNE_DIR:
+
+    {'intra_op_threads': 16, 'inter_op_threads': 1,
+     'batch_size': {'1920x1080': 4, '1280x720': 8}, 'fps': {...}, 'measurements': [...]}
+"""
+
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from tracking.backend import load_model, backend_device
+from tracking.detection_cache import file_sha256
+from tracking.parallel import available_cpus
+
+AUTOTUNE_DIR = Path('/cluster/work/tmstorma/Football2025/tracking/autotune')
+
+# Broadcast resolutions calibrated (height, width)
+CALIBRATION_SHAPES = ((1080, 1920), (720, 1280))
+
+BATCH_SIZES = (1, 2, 4, 8, 16)
+INTER_OP_THREADS = (1, 2)
+
+# Frames timed per setting (after one warm-up batch)
+CALIBRATION_FRAMES = 16
+
+# Peak memory cap in GB; None = 80% of the SLURM allocation (or of the node / GPU)
+MEMORY_CAP_GB = None
+
+# Peak RSS sampling interval of CPU calibrations (seconds)
+MEMORY_SAMPLE_INTERVAL = 0.005
+
+
+def shape_key(shape):
+    """'1920x1080' of a (height, width, ...) shape"""
+    return f'{shape[1]}x{shape[0]}'
+
+
+def intra_op_candidates(cpus=None):
+    """Powers of two up to the allocation, plus the allocation itself"""
+    cpus = cpus or available_cpus()
+    return sorted({2 ** k for k in range(int(math.log2(cpus)) + 1)} | {cpus})
+
+
+def memory_cap_bytes(cap_gb=MEMORY_CAP_GB, gpu=False):
+    """Memory a calibration may peak at"""
+    if cap_gb is not None:
+        return int(cap_gb * 1024 ** 3)
+    if gpu:
+        import torch
+        return int(0.8 * torch.cuda.get_device_properties(0).total_memory)
+    slurm_mb = os.environ.get('SLURM_MEM_PER_NODE')
+    if slurm_mb:
+        return int(0.8 * int(slurm_mb) * 1024 ** 2)
+    return int(0.8 * os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES'))
+
+
+def rss_bytes():
+    """Resident memory of this process"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+class PeakRSS:
+    """Peak resident memory while the block runs, sampled by a background thread"""
+
+    def __enter__(self):
+        self.peak = rss_bytes()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def _sample(self):
+        while not self.stop_event.wait(MEMORY_SAMPLE_INTERVAL):
+            self.peak = max(self.peak, rss_bytes())
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join()
+        self.peak = max(self.peak, rss_bytes())
+        return False
+
+
+def calibration_frames(image_path=None, shapes=CALIBRATION_SHAPES):
+    """{shape_key: BGR frame} at every calibration resolution (a real frame resized, or noise)"""
+    image = cv2.imread(str(image_path)) if image_path is not None else None
+    frames = {}
+    for height, width in shapes:
+        if image is None:
+            frames[shape_key((height, width))] = np.random.default_rng(0).integers(
+                0, 256, (height, width, 3), dtype=np.uint8)
+        else:
+            frames[shape_key((height, width))] = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    return frames
+
+
+def measure(model, frame, batch_size, device, gpu, frames=CALIBRATION_FRAMES):
+    """(frames/s, peak memory bytes) of predicting frames frames in batches of batch_size"""
+    import torch
+
+    batch = [frame] * batch_size
+    model.predict(source=batch, conf=0.3, iou=0.7, device=device, verbose=False)  # warm-up
+    batches = max(1, math.ceil(frames / batch_size))
+
+    if gpu:
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+    with PeakRSS() as memory:
+        start = time.perf_counter()
+        for _ in range(batches):
+            model.predict(source=batch, conf=0.3, iou=0.7, device=device, verbose=False)
+        if gpu:
+            torch.cuda.synchronize()
+        elapsed = time.perf_counter() - start
+    peak = torch.cuda.max_memory_allocated() if gpu else memory.peak
+    return batches * batch_size / elapsed, peak
+
+
+def calibrate_worker(model_path, backend, inter_op_threads, intra_op_threads, batch_sizes, image_path, cap_bytes):
+    """
+    Spawned process: calibrate every intra-op thread count and batch size at one
+    inter-op thread count. Returns a list of measurement dicts.
+    """
+    import torch
+
+    try:
+        torch.set_num_interop_threads(inter_op_threads)
+    except RuntimeError:
+        pass
+    gpu = backend == 'pytorch' and torch.cuda.is_available()
+    device = backend_device(backend)
+    model = load_model(model_path, backend)
+    frames = calibration_frames(image_path)
+
+    rows = []
+    for threads in intra_op_threads:
+        torch.set_num_threads(threads)
+        cv2.setNumThreads(threads)
+        for key, frame in frames.items():
+            for batch_size in batch_sizes:
+                try:
+                    fps, peak = measure(model, frame, batch_size, device, gpu)
+                except RuntimeError as e:
+                    # CUDA out of memory: larger batches will not fit either
+                    if 'out of memory' not in str(e):
+                        raise
+                    if gpu:
+                        torch.cuda.empty_cache()
+                    break
+                rows.append({'resolution': key, 'batch_size': batch_size, 'intra_op_threads': threads,
+                             'inter_op_threads': inter_op_threads, 'fps': fps, 'peak_mb': peak / 1024 ** 2,
+                             'within_cap': peak <= cap_bytes})
+                print(f"  {key} batch {batch_size:>2} threads {threads:>2}/{inter_op_threads}: "
+                      f"{fps:6.1f} frames/s, peak {peak / 1024 ** 2:.0f} MB")
+                if peak > cap_bytes:
+                    break
+    return rows
+
+
+def select_settings(rows):
+    """
+    Thread setting with the lowest time per frame summed over the resolutions (each at its
+    fastest batch size within the memory cap), and that batch size per resolution
+    """
+    best = {}
+    for row in rows:
+        if not row['within_cap']:
+            continue
+        threads = (row['intra_op_threads'], row['inter_op_threads'])
+        current = best.setdefault(threads, {}).get(row['resolution'])
+        if current is None or row['fps'] > current['fps']:
+            best[threads][row['resolution']] = row
+
+    resolutions = {row['resolution'] for row in rows}
+    candidates = {threads: per_resolution for threads, per_resolution in best.items()
+                  if set(per_resolution) == resolutions}
+    if not candidates:
+        raise RuntimeError("No calibrated setting stays within the memory cap")
+
+    threads = min(candidates, key=lambda t: sum(1 / row['fps'] for row in candidates[t].values()))
+    return {
+        'intra_op_threads': threads[0],
+        'inter_op_threads': threads[1],
+        'batch_size': {key: row['batch_size'] for key, row in candidates[threads].items()},
+        'fps': {key: row['fps'] for key, row in candidates[threads].items()},
+    }
+
+
+def autotune_path(model_path, backend, settings, autotune_dir=AUTOTUNE_DIR):
+    """Cache file of a host, model and calibration grid"""
+    key = hashlib.sha256(json.dumps({'model_sha256': file_sha256(model_path), 'backend': backend,
+                                     **settings}, sort_keys=True).encode()).hexdigest()[:16]
+    return autotune_dir / f'{socket.gethostname()}-{key}.json'
+
+
+def autotune(model_path, backend, image_path=None, batch_sizes=BATCH_SIZES, memory_cap_gb=MEMORY_CAP_GB,
+             autotune_dir=AUTOTUNE_DIR):
+    """
+    Tuned settings of this host and model, calibrated on first use and cached.
+    image_path: a representative frame, resized to each calibration resolution.
+    """
+    import torch
+
+    gpu = backend == 'pytorch' and torch.cuda.is_available()
+    cap_bytes = memory_cap_bytes(memory_cap_gb, gpu=gpu)
+    cpus = available_cpus()
+    intra = [torch.get_num_threads()] if gpu else intra_op_candidates(cpus)
+    inter = [1] if gpu else list(INTER_OP_THREADS)
+    settings = {'cpus': cpus, 'gpu': torch.cuda.get_device_name(0) if gpu else None,
+                'shapes': [shape_key(s) for s in CALIBRATION_SHAPES], 'batch_sizes': list(batch_sizes),
+                'intra_op_threads': intra, 'inter_op_threads': inter, 'memory_cap_bytes': cap_bytes}
+
+    path = autotune_path(model_path, backend, settings, autotune_dir)
+    if path.exists():
+        with open(path) as f:
+            return json.load(f)
+
+    print(f"Autotuning batch size and threads ({len(inter)} x {len(intra)} thread settings, "
+          f"batch sizes {list(batch_sizes)}, cap {cap_bytes / 1024 ** 3:.1f} GB)...")
+    rows = []
+    context = multiprocessing.get_context('spawn')
+    for inter_op_threads in inter:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            rows += pool.submit(calibrate_worker, model_path, backend, inter_op_threads, intra,
+                                list(batch_sizes), image_path, cap_bytes).result()
+
+    choice = {**select_settings(rows), 'host': socket.gethostname(), 'settings': settings, 'measurements': rows}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(choice, f, indent=2)
+    os.replace(tmp_path, path)
+    return choice
+
+
+def apply_threads(choice):
+    """Use the tuned thread counts in this process (before the model runs)"""
+    import torch
+
+    torch.set_num_threads(choice['intra_op_threads'])
+    try:
+        torch.set_num_interop_threads(choice['inter_op_threads'])
+    except RuntimeError:
+        # Too late once a parallel op has run; intra-op threads still apply
+        print(f"  Warning: inter-op threads already fixed at {torch.get_num_interop_threads()}")
+    cv2.setNumThreads(choice['intra_op_threads'])
+
+
+def tuned_batch_size(choice, shape):
+    """Batch size of the calibrated resolution closest (in pixels) to a frame shape"""
+    pixels = shape[0] * shape[1]
+    key = min(choice['batch_size'], key=lambda k: abs(math.prod(map(int, k.split('x'))) - pixels))
+    return choice['batch_size'][key]
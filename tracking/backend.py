@@ -0,0 +1,82 @@
+"""
+Inference backends for the trained detector
+
+'pytorch' runs best.pt through PyTorch. 'onnx' (ONNX Runtime) and 'openvino'
+export best.pt once, next to the weights, and run the exported model on CPU
+through the same Ultralytics YOLO object, so predict()/track() calls, their
+thresholds and the ByteTrack config stay exactly the same for every backend.
+The export is redone automatically when best.pt is newer than it.
+'onnx-int8' runs the INT8 model written by quantize_int8.py (it needs
+calibration images, so it is never created implicitly).
+"""
+
+from pathlib import Path
+
+from ultralytics import YOLO
+
+BACKENDS = ('pytorch', 'onnx', 'openvino', 'onnx-int8')
+
+# Training resolution (train_yolov8.py); dynamic axes keep rectangular letterboxing
+EXPORT_IMGSZ = 1280
+
+
+def exported_path(weights, backend):
+    """Where Ultralytics writes the export of a .pt file for a backend"""
+    weights = Path(weights)
+    if backend == 'onnx':
+        return weights.with_suffix('.onnx')
+    if backend == 'openvino':
+        return weights.parent / f'{weights.stem}_openvino_model'
+    if backend == 'onnx-int8':
+        return weights.parent / f'{weights.stem}_int8.onnx'
+    raise ValueError(f"Unknown export backend '{backend}' (expected one of {BACKENDS[1:]})")
+
+
+def model_file(weights, backend):
+    """File (or OpenVINO directory) a backend's model is loaded from"""
+    return Path(weights) if backend == 'pytorch' else exported_path(weights, backend)
+
+
+def _export_mtime(path):
+    """Modification time of an export (the .xml inside an OpenVINO directory)"""
+    if path.is_dir():
+        files = list(path.glob('*.xml'))
+        return min(f.stat().st_mtime for f in files) if files else None
+    return path.stat().st_mtime if path.exists() else None
+
+
+def export_model(weights, backend, imgsz=EXPORT_IMGSZ):
+    """
+    Export weights for a CPU backend unless an up-to-date export exists.
+    Returns the path of the exported model.
+    """
+    weights = Path(weights)
+    path = exported_path(weights, backend)
+    export_mtime = _export_mtime(path)
+    if export_mtime is not None and export_mtime >= weights.stat().st_mtime:
+        return path
+
+    print(f"Exporting {weights.name} to {backend} (imgsz={imgsz})...")
+    kwargs = {'format': backend, 'imgsz': imgsz, 'dynamic': True, 'device': 'cpu'}
+    if backend == 'onnx':
+        kwargs['simplify'] = True
+    exported = YOLO(str(weights)).export(**kwargs)
+    print(f"Exported model: {exported}")
+    return Path(exported)
+
+
+def load_model(weights, backend='pytorch'):
+    """YOLO model for a backend; exported backends are exported on first use"""
+    if backend == 'pytorch':
+        return YOLO(str(weights))
+    if backend == 'onnx-int8':
+        path = exported_path(weights, backend)
+        if _export_mtime(path) is None or _export_mtime(path) < Path(weights).stat().st_mtime:
+            raise FileNotFoundError(f"No up-to-date INT8 model at {path} (run tracking/quantize_int8.py)")
+        return YOLO(str(path), task='detect')
+    return YOLO(str(export_model(weights, backend)), task='detect')
+
+
+def backend_device(backend):
+    """Device argument for predict()/track(): exported backends run on CPU"""
+    return None if backend == 'pytorch' else 'cpu'
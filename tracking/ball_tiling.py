@@ -0,0 +1,249 @@
+"""
+Two-stage detection: players at a lower resolution, the ball on full-resolution tiles
+
+The ball is ~110 px² at 1920x1080 (data_analysis Step 2a), a few pixels wide
+once a frame is scaled to imgsz 1280, which is why every frame is detected at
+1280. Players are ~16x larger and survive a lower resolution, so
+TwoStageDetector splits the work:
+
+    player pass  the whole frame at PLAYER_IMGSZ (all classes)
+    ball pass    TILE_SIZE crops at native resolution, ball class only, all crops
+                 of a frame in one batched predict()
+
+The ball pass is adaptive. BallPredictor follows the ball with a constant
+velocity model and the pass covers a single tile centred on the predicted
+position, the search radius growing while the ball is missed. When the ball
+has not been seen for LOST_FRAMES frames (or not yet), every tile of an
+overlapping grid over the frame is searched. Tile and player detections are
+merged with class-aware NMS; a ball cut by a tile edge is dropped when
+another searched tile holds it whole (tiles overlap by more than the largest
+ball, ~21 px).
+
+Input pixels per 1920x1080 frame: 1280x736 = 942k for the single-pass
+detector, 960x544 + 320x320 = 625k while the ball is followed, and 522k plus
+28 tiles (2.9M) while it is lost.
+"""
+
+import time
+from collections import Counter
+
+import numpy as np
+
+from tracking.backend import EXPORT_IMGSZ
+from tracking.batching import inference_shape
+from tracking.detection_cache import class_nms
+from tracking.profiling import StageProfiler
+
+BALL = 3
+
+# Player pass inference size (long side)
+PLAYER_IMGSZ = 960
+
+# Ball pass crops at native resolution (a multiple of the model stride) and their overlap
+TILE_SIZE = 320
+TILE_OVERLAP = 32
+
+# Search radius (px) around the predicted ball position, grown per missed frame
+SEARCH_RADIUS = 48
+SEARCH_GROWTH = 24
+
+# Frames without a ball after which the whole frame is searched
+LOST_FRAMES = 10
+
+# Ball detections followed by the predictor (the tracking threshold)
+BALL_TRACK_CONF = 0.3
+
+# A box within this many px of an inner tile edge is cut by it
+EDGE_MARGIN = 2
+
+
+def ball_tiling_settings():
+    """Everything the two-stage detections depend on (detection cache key)"""
+    return {'player_imgsz': PLAYER_IMGSZ, 'tile_size': TILE_SIZE, 'tile_overlap': TILE_OVERLAP,
+            'search_radius': SEARCH_RADIUS, 'search_growth': SEARCH_GROWTH, 'lost_frames': LOST_FRAMES,
+            'ball_track_conf': BALL_TRACK_CONF}
+
+
+def tile_starts(length, tile=TILE_SIZE, overlap=TILE_OVERLAP):
+    """Start offsets of tiles covering length, the last one flush with the end"""
+    if length <= tile:
+        return [0]
+    return list(range(0, length - tile, tile - overlap)) + [length - tile]
+
+
+def tile_grid(shape, tile=TILE_SIZE, overlap=TILE_OVERLAP):
+    """(K, 4) x1, y1, x2, y2 of overlapping tiles covering a frame"""
+    height, width = shape[:2]
+    return np.array([(x, y, min(x + tile, width), min(y + tile, height))
+                     for y in tile_starts(height, tile, overlap)
+                     for x in tile_starts(width, tile, overlap)], dtype=np.int64)
+
+
+def search_tiles(shape, center, radius, tile=TILE_SIZE, overlap=TILE_OVERLAP):
+    """
+    Tiles to search for a ball predicted at center (x, y) within radius px: one tile
+    centred on it when the search window fits, else the grid tiles the window touches
+    """
+    height, width = shape[:2]
+    if 2 * radius <= tile - overlap:
+        x1 = int(np.clip(round(center[0] - tile / 2), 0, max(width - tile, 0)))
+        y1 = int(np.clip(round(center[1] - tile / 2), 0, max(height - tile, 0)))
+        return np.array([(x1, y1, min(x1 + tile, width), min(y1 + tile, height))], dtype=np.int64)
+    grid = tile_grid(shape, tile, overlap)
+    touched = ((grid[:, 0] <= center[0] + radius) & (grid[:, 2] >= center[0] - radius) &
+               (grid[:, 1] <= center[1] + radius) & (grid[:, 3] >= center[1] - radius))
+    return grid[touched]
+
+
+def drop_cut_boxes(det, k, tiles, shape, margin=EDGE_MARGIN):
+    """Frame-coordinate detections of tile k without boxes cut by an inner edge that another tile holds whole"""
+    if len(det) == 0 or len(tiles) < 2:
+        return det
+    height, width = shape[:2]
+    x1, y1, x2, y2 = tiles[k]
+    cut = (((det[:, 0] <= x1 + margin) & (x1 > 0)) | ((det[:, 1] <= y1 + margin) & (y1 > 0)) |
+           ((det[:, 2] >= x2 - margin) & (x2 < width)) | ((det[:, 3] >= y2 - margin) & (y2 < height)))
+    inside = ((det[:, None, 0] >= tiles[None, :, 0]) & (det[:, None, 1] >= tiles[None, :, 1]) &
+              (det[:, None, 2] <= tiles[None, :, 2]) & (det[:, None, 3] <= tiles[None, :, 3]))
+    inside[:, k] = False
+    return det[~(cut & inside.any(axis=1))]
+
+
+class BallPredictor:
+    """Constant-velocity estimate of the ball centre from each frame's detections"""
+
+    def __init__(self, radius=SEARCH_RADIUS, growth=SEARCH_GROWTH, lost_frames=LOST_FRAMES,
+                 min_conf=BALL_TRACK_CONF):
+        self.radius = radius
+        self.growth = growth
+        self.lost_frames = lost_frames
+        self.min_conf = min_conf
+        self.position = None
+        self.velocity = np.zeros(2)
+        self.missed = 0
+
+    @property
+    def lost(self):
+        return self.position is None or self.missed >= self.lost_frames
+
+    def predict(self):
+        """(center, search radius) of the next frame, or None when the ball is lost"""
+        if self.lost:
+            return None
+        return self.position + self.velocity * (self.missed + 1), self.radius + self.growth * self.missed
+
+    def state_dict(self):
+        """Predictor state as plain Python values (float64, round-trips exactly through JSON)"""
+        return {
+            'position': None if self.position is None else self.position.tolist(),
+            'velocity': self.velocity.tolist(),
+            'missed': self.missed,
+        }
+
+    def load_state_dict(self, state):
+        """Continue from a state_dict(): later frames search the same tiles as an uninterrupted run"""
+        self.position = None if state['position'] is None else np.array(state['position'], dtype=np.float64)
+        self.velocity = np.array(state['velocity'], dtype=np.float64)
+        self.missed = state['missed']
+
+    def update(self, det):
+        """Follow the ball detection closest to the prediction (the most confident one when lost)"""
+        balls = det[(det[:, 5] == BALL) & (det[:, 4] >= self.min_conf)]
+        if len(balls) == 0:
+            self.missed += 1
+            return
+        centers = ((balls[:, :2] + balls[:, 2:4]) / 2).astype(np.float64)
+        prediction = self.predict()
+        if prediction is None:
+            center = centers[np.argmax(balls[:, 4])]
+            self.velocity = np.zeros(2)
+        else:
+            center = centers[np.argmin(np.linalg.norm(centers - prediction[0], axis=1))]
+            self.velocity = (center - self.position) / (self.missed + 1)
+        self.position = center
+        self.missed = 0
+
+
+class TwoStageDetector:
+    """
+    Players at PLAYER_IMGSZ, the ball on full-resolution tiles around its predicted
+    position; one instance per sequence (the predictor follows its ball).
+
+        detector = TwoStageDetector(model, conf=0.3, iou=0.7)
+        detections = detector.detect(frames)   # [((N, 6) x1, y1, x2, y2, conf, cls, orig_shape)]
+    """
+
+    def __init__(self, model, conf, iou, device=None, player_imgsz=PLAYER_IMGSZ, tile=TILE_SIZE,
+                 overlap=TILE_OVERLAP, profiler=None):
+        self.model = model
+        self.conf = conf
+        self.iou = iou
+        self.device = device
+        self.player_imgsz = player_imgsz
+        self.tile = tile
+        self.overlap = overlap
+        self.profiler = profiler or StageProfiler(enabled=False)
+        self.predictor = BallPredictor()
+        self.stats = Counter()
+
+    def ball_pass(self, frame):
+        """Ball detections (N, 6) of one frame's search tiles, in frame pixels"""
+        prediction = self.predictor.predict()
+        if prediction is None:
+            tiles = tile_grid(frame.shape, self.tile, self.overlap)
+            self.stats['lost_frames'] += 1
+        else:
+            tiles = search_tiles(frame.shape, *prediction, self.tile, self.overlap)
+            self.stats['followed_frames'] += 1
+        self.stats['tiles'] += len(tiles)
+        self.stats['input_pixels'] += sum(np.prod(inference_shape((y2 - y1, x2 - x1), self.tile))
+                                          for x1, y1, x2, y2 in tiles)
+
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+        results = self.model.predict(source=crops, conf=self.conf, iou=self.iou, imgsz=self.tile, classes=[BALL],
+                                     device=self.device, verbose=False)
+        # Tile offsets added to x1, y1, x2, y2
+        offsets = np.concatenate([tiles[:, :2], tiles[:, :2], np.zeros((len(tiles), 2))], axis=1).astype(np.float32)
+        det = [drop_cut_boxes(result.boxes.data.cpu().numpy() + offsets[k], k, tiles, frame.shape)
+               for k, result in enumerate(results)]
+        return np.concatenate(det) if det else np.empty((0, 6), dtype=np.float32)
+
+    def detect(self, frames):
+        """[((N, 6) detections, orig_shape)] of a batch of BGR frames"""
+        start = time.perf_counter()
+        results = self.model.predict(source=frames, conf=self.conf, iou=self.iou, imgsz=self.player_imgsz,
+                                     device=self.device, verbose=False)
+        self.profiler.add_results(results, 1000 * (time.perf_counter() - start), 'other')
+
+        detections = []
+        for frame, result in zip(frames, results):
+            with self.profiler.stage('ball_pass'):
+                det = np.concatenate([result.boxes.data.cpu().numpy(), self.ball_pass(frame)])
+                det = class_nms(det, self.iou)
+                self.predictor.update(det)
+            self.stats['frames'] += 1
+            self.stats['input_pixels'] += np.prod(inference_shape(frame.shape, self.player_imgsz))
+            self.stats['full_frame_pixels'] += np.prod(inference_shape(frame.shape, EXPORT_IMGSZ))
+            detections.append((det, result.orig_shape))
+        return detections
+
+    def state_dict(self):
+        """Ball predictor and pass statistics (JSON-serializable), saved with tracker checkpoints"""
+        return {'predictor': self.predictor.state_dict(),
+                'stats': {key: int(value) for key, value in self.stats.items()}}
+
+    def load_state_dict(self, state):
+        """Resume a sequence: the ball is followed from where the checkpointed run left it"""
+        self.predictor.load_state_dict(state['predictor'])
+        self.stats = Counter(state['stats'])
+
+    def summary(self):
+        """Ball pass activity and input pixels relative to single-pass detection at EXPORT_IMGSZ"""
+        stats = {key: int(value) for key, value in self.stats.items()}
+        frames = max(stats.get('frames', 0), 1)
+        return {
+            **stats,
+            'tiles_per_frame': stats.get('tiles', 0) / frames,
+            'input_pixels_per_frame': stats.get('input_pixels', 0) / frames,
+            'compute_share': stats.get('input_pixels', 0) / max(stats.get('full_frame_pixels', 0), 1),
+        }
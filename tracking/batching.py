@@ -0,0 +1,95 @@
+"""
+Resolution-aware batching
+
+Ultralytics letterboxes every batch to a single input shape. A batch of mixed
+resolutions (or any batch on a backend without rectangular inference) is
+padded to a square imgsz x imgsz input: a 16:9 frame then spends ~44% of the
+pixels the model processes on grey padding.
+
+predict_grouped() groups frames by native resolution into homogeneous
+batches and gives every group its own rectangular input shape: the frame
+scaled so its long side is imgsz (as Ultralytics scales it), padded only up
+to the next stride multiple (1920x1080 and 1280x720 both run at 1280x736
+instead of 1280x1280). Frames are resized before predict(), so the model sees
+exactly what a rectangular Ultralytics letterbox would give it, and the boxes
+of a whole group are mapped back to native pixels in one vectorized step.
+"""
+
+import math
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+from tracking.backend import EXPORT_IMGSZ
+from tracking.profiling import StageProfiler
+
+# Model stride: inputs are padded to a multiple of it
+STRIDE = 32
+
+
+def scaled_shape(shape, imgsz=EXPORT_IMGSZ):
+    """(height, width) of a frame scaled so its long side is imgsz (Ultralytics' resize)"""
+    height, width = shape[:2]
+    r = imgsz / max(height, width)
+    return int(round(height * r)), int(round(width * r))
+
+
+def inference_shape(shape, imgsz=EXPORT_IMGSZ, stride=STRIDE):
+    """Input (height, width) of a resolution: the scaled frame padded to a stride multiple"""
+    height, width = scaled_shape(shape, imgsz)
+    return math.ceil(height / stride) * stride, math.ceil(width / stride) * stride
+
+
+def square_shape(shape, imgsz=EXPORT_IMGSZ):
+    """Input (height, width) of a square letterbox (mixed batches, non-rectangular backends)"""
+    return imgsz, imgsz
+
+
+def group_by_resolution(shapes):
+    """{(height, width): [indices]} in first-seen order"""
+    groups = defaultdict(list)
+    for i, shape in enumerate(shapes):
+        groups[tuple(shape[:2])].append(i)
+    return dict(groups)
+
+
+def predict_grouped(model, frames, batch_size=8, imgsz=EXPORT_IMGSZ, profiler=None, **predict_kwargs):
+    """
+    Detections of BGR frames of any resolutions: a list of (N, 6) float32 arrays
+    x1, y1, x2, y2, conf, cls in native pixels, in input order.
+    predict_kwargs go to model.predict (conf, iou, device, ...). With a profiler
+    (tracking/profiling.py) the resize and the mapping back are stages of their own.
+    """
+    profiler = profiler or StageProfiler(enabled=False)
+    detections = [None] * len(frames)
+    for shape, indices in group_by_resolution([frame.shape for frame in frames]).items():
+        height, width = shape
+        resized_shape = scaled_shape(shape, imgsz)
+        input_shape = inference_shape(shape, imgsz)
+        # Native pixels per resized pixel (the inverse of the resize, per axis)
+        gain = np.array([width / resized_shape[1], height / resized_shape[0]] * 2, dtype=np.float32)
+        limits = np.array([width, height] * 2, dtype=np.float32)
+
+        for start in range(0, len(indices), batch_size):
+            batch = indices[start:start + batch_size]
+            with profiler.stage('resize', frames=len(batch)):
+                if resized_shape == shape:
+                    source = [frames[i] for i in batch]
+                else:
+                    source = [cv2.resize(frames[i], resized_shape[::-1], interpolation=cv2.INTER_LINEAR)
+                              for i in batch]
+
+            predict_start = time.perf_counter()
+            results = model.predict(source=source, imgsz=list(input_shape), verbose=False, **predict_kwargs)
+            profiler.add_results(results, 1000 * (time.perf_counter() - predict_start), 'other')
+
+            with profiler.stage('rescale', frames=len(batch)):
+                data = [result.boxes.data.cpu().numpy().astype(np.float32, copy=False) for result in results]
+                counts = [len(d) for d in data]
+                det = np.concatenate(data) if sum(counts) else np.empty((0, 6), dtype=np.float32)
+                det[:, :4] = np.clip(det[:, :4] * gain, 0, limits)
+                for i, rows in zip(batch, np.split(det, np.cumsum(counts)[:-1])):
+                    detections[i] = rows
+    return detections
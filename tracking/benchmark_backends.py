@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+CPU inference backends: speed and tracking parity
+
+Tracks the validation set with every backend in tracking/backend.py on CPU
+(same ByteTrack config, thresholds and batch size), then evaluates all runs
+together with TrackEval. A backend passes when its combined HOTA and IDF1 are
+within PARITY_TOLERANCE points of PyTorch on the same CPU.
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add repository root to path for the shared tracking package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tracking.backend import BACKENDS, load_model
+from tracking.run_tracking_validation import MODEL_PATH, VAL_DIR, track_validation_set
+from tracking.prepare_hota_data import prepare_hota_data
+from tracking.run_hota_evaluation import evaluate_hota
+
+OUTPUT_DIR = Path('/cluster/work/tmstorma/Football2025/tracking/runs/backend_benchmark')
+
+# Reference backend every other backend is compared against
+REFERENCE = 'pytorch'
+
+# Max allowed drop in combined HOTA / IDF1 (percentage points)
+PARITY_TOLERANCE = 1.0
+
+def benchmark_backend(backend, run_dir):
+    """Track the validation set with one backend on CPU; returns timing info"""
+    model = load_model(MODEL_PATH, backend)
+
+    # Warm-up outside the timed run (graph compilation, thread pools, first allocation)
+    warmup_image = next(VAL_DIR.glob('*.png'))
+    model.predict(str(warmup_image), conf=0.3, device='cpu', verbose=False)
+
+    start = time.perf_counter()
+    summary = track_validation_set(model, run_dir, device='cpu')
+    elapsed = time.perf_counter() - start
+
+    return {
+        'frames': summary['frames_processed'],
+        'seconds': elapsed,
+        'fps': summary['frames_processed'] / elapsed if elapsed > 0 else 0.0,
+        'ms_per_frame': 1000 * elapsed / max(summary['frames_processed'], 1),
+    }
+
+def main():
+    print("="*80)
+    print("CPU Backend Benchmark - Speed and Tracking Parity")
+    print("="*80)
+    print(f"  Model: {MODEL_PATH}")
+    print(f"  Backends: {', '.join(BACKENDS)}")
+    print(f"  Output: {OUTPUT_DIR}")
+
+    timings = {}
+    for backend in BACKENDS:
+        print(f"\n{'='*80}")
+        print(f"Backend: {backend}")
+        print(f"{'='*80}")
+        try:
+            timings[backend] = benchmark_backend(backend, OUTPUT_DIR / 'runs' / backend)
+        except (ImportError, FileNotFoundError) as e:
+            # Optional runtimes (onnxruntime, openvino) may not be installed,
+            # and the INT8 model only exists once quantize_int8.py has run
+            print(f"  Skipped: {e}")
+            continue
+        prepare_hota_data(OUTPUT_DIR / 'runs' / backend, OUTPUT_DIR / 'hota_data', tracker_name=backend)
+
+    if REFERENCE not in timings:
+        raise RuntimeError(f"Reference backend '{REFERENCE}' did not run")
+
+    metrics = evaluate_hota(OUTPUT_DIR / 'hota_data' / 'gt', OUTPUT_DIR / 'hota_data' / 'trackers',
+                            OUTPUT_DIR / 'hota_results', trackers=list(timings))
+
+    reference = metrics[REFERENCE]['COMBINED_SEQ']
+    results = {}
+    for backend, timing in timings.items():
+        combined = metrics[backend]['COMBINED_SEQ']
+        hota_diff = combined['HOTA'] - reference['HOTA']
+        idf1_diff = combined['IDF1'] - reference['IDF1']
+        results[backend] = {
+            **timing,
+            'speedup': timing['fps'] / timings[REFERENCE]['fps'],
+            'metrics': metrics[backend],
+            'hota_diff': hota_diff,
+            'idf1_diff': idf1_diff,
+            'parity': hota_diff >= -PARITY_TOLERANCE and idf1_diff >= -PARITY_TOLERANCE,
+        }
+
+    print("\n" + "="*80)
+    print(f"Results (CPU, {timings[REFERENCE]['frames']} validation frames)")
+    print("="*80)
+    print(f"{'Backend':<10} {'FPS':>7} {'ms/frame':>9} {'Speedup':>8} {'HOTA':>7} {'dHOTA':>7} "
+          f"{'IDF1':>7} {'dIDF1':>7} {'IDSW':>5}  Parity")
+    for backend, r in results.items():
+        combined = r['metrics']['COMBINED_SEQ']
+        print(f"{backend:<10} {r['fps']:>7.1f} {r['ms_per_frame']:>9.1f} {r['speedup']:>7.2f}x "
+              f"{combined['HOTA']:>7.2f} {r['hota_diff']:>+7.2f} {combined['IDF1']:>7.2f} "
+              f"{r['idf1_diff']:>+7.2f} {combined['IDSW']:>5}  {'✓' if r['parity'] else '✗'}")
+
+    results_path = OUTPUT_DIR / 'backend_benchmark.json'
+    with open(results_path, 'w') as f:
+        json.dump({'model': str(MODEL_PATH), 'reference': REFERENCE,
+                   'parity_tolerance': PARITY_TOLERANCE, 'backends': results}, f, indent=2)
+    print(f"\nResults saved to: {results_path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Two-stage ball tiling benchmark
+
+Tracks the validation set twice with the same model and tracker config:
+
+    single_pass  every frame detected once at imgsz 1280 (the default pipeline)
+    ball_tiling  players at PLAYER_IMGSZ, the ball on full-resolution tiles around
+                 its predicted position, all tiles while it is lost
+                 (tracking/ball_tiling.py)
+
+Both runs go through prepare_hota_data and run_hota_evaluation. Reports ball
+recall (IoU >= 0.5), HOTA/IDF1, frames/s and the input pixels the model
+processes per frame, plus how often the ball pass searched the whole frame.
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add repository root to path for the shared media and tracking packages
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tracking.backend import load_model, backend_device
+from tracking.ball_tiling import PLAYER_IMGSZ, TILE_SIZE, TILE_OVERLAP, ball_tiling_settings
+from tracking.prepare_hota_data import prepare_hota_data
+from tracking.quantize_int8 import ball_recall
+from tracking.run_hota_evaluation import evaluate_hota
+from tracking.run_tracking_validation import BACKEND, MODEL_PATH, VAL_DIR, VALIDATION_SEQUENCES, track_validation_set
+
+OUTPUT_DIR = Path('/cluster/work/tmstorma/Football2025/tracking/runs/ball_tiling_benchmark')
+
+# Run name -> two-stage ball tiling on/off
+MODES = {'single_pass': False, 'ball_tiling': True}
+
+def tiling_summary(run_dir):
+    """Ball pass activity of a tiled run, summed over the sequences' ball_tiling.json"""
+    totals = {}
+    for dataset_name, _ in VALIDATION_SEQUENCES:
+        path = run_dir / dataset_name / 'ball_tiling.json'
+        if not path.exists():
+            continue
+        with open(path) as f:
+            sequence = json.load(f)
+        for key in ('frames', 'followed_frames', 'lost_frames', 'tiles', 'input_pixels', 'full_frame_pixels'):
+            totals[key] = totals.get(key, 0) + sequence.get(key, 0)
+    return totals
+
+def main():
+    print("="*80)
+    print("Two-stage Ball Tiling Benchmark")
+    print("="*80)
+    print(f"  Model: {MODEL_PATH}")
+    print(f"  Backend: {BACKEND}")
+    print(f"  Ball tiling: players at imgsz {PLAYER_IMGSZ}, {TILE_SIZE}px tiles ({TILE_OVERLAP}px overlap)")
+    print(f"  Output: {OUTPUT_DIR}")
+
+    device = backend_device(BACKEND)
+    model = load_model(MODEL_PATH, BACKEND)
+    # Warm-up outside the timed runs (graph compilation, thread pools, first allocation)
+    warmup_image = next(VAL_DIR.glob('*.png'))
+    model.predict(str(warmup_image), conf=0.3, device=device, verbose=False)
+
+    hota_dir = OUTPUT_DIR / 'hota_data'
+    timings = {}
+    for mode, ball_tiling in MODES.items():
+        print(f"\n{'='*80}")
+        print(f"Tracking validation set: {mode}")
+        print(f"{'='*80}")
+        run_dir = OUTPUT_DIR / 'runs' / mode
+        start = time.perf_counter()
+        summary = track_validation_set(model, run_dir, device=device, ball_tiling=ball_tiling)
+        elapsed = time.perf_counter() - start
+        timings[mode] = {
+            'frames': summary['frames_processed'],
+            'seconds': elapsed,
+            'fps': summary['frames_processed'] / elapsed if elapsed > 0 else 0.0,
+        }
+        prepare_hota_data(run_dir, hota_dir, tracker_name=mode)
+
+    metrics = evaluate_hota(hota_dir / 'gt', hota_dir / 'trackers', OUTPUT_DIR / 'hota_results',
+                            trackers=list(MODES))
+
+    results = {}
+    for mode, timing in timings.items():
+        results[mode] = {
+            **timing,
+            'metrics': metrics[mode],
+            'ball_recall': ball_recall(hota_dir, mode),
+        }
+    tiling = tiling_summary(OUTPUT_DIR / 'runs' / 'ball_tiling')
+    frames = max(tiling.get('frames', 0), 1)
+    compute_share = tiling.get('input_pixels', 0) / max(tiling.get('full_frame_pixels', 0), 1)
+
+    single, tiled = results['single_pass'], results['ball_tiling']
+    comparison = {
+        'speedup': tiled['fps'] / single['fps'] if single['fps'] > 0 else 0.0,
+        'compute_share': compute_share,
+        'ball_recall_diff': tiled['ball_recall'] - single['ball_recall'],
+        'hota_diff': tiled['metrics']['COMBINED_SEQ']['HOTA'] - single['metrics']['COMBINED_SEQ']['HOTA'],
+        'idf1_diff': tiled['metrics']['COMBINED_SEQ']['IDF1'] - single['metrics']['COMBINED_SEQ']['IDF1'],
+        'lost_frame_share': tiling.get('lost_frames', 0) / frames,
+        'tiles_per_frame': tiling.get('tiles', 0) / frames,
+    }
+
+    print("\n" + "="*80)
+    print(f"Results ({single['frames']} validation frames)")
+    print("="*80)
+    print(f"{'Mode':<12} {'FPS':>7} {'HOTA':>7} {'IDF1':>7} {'Ball rec.':>10}")
+    for mode, r in results.items():
+        combined = r['metrics']['COMBINED_SEQ']
+        print(f"{mode:<12} {r['fps']:>7.1f} {combined['HOTA']:>7.2f} {combined['IDF1']:>7.2f} "
+              f"{r['ball_recall']:>9.2f}%")
+    print(f"\nBall tiling vs single pass: {comparison['speedup']:.2f}x frames/s, "
+          f"{100 * compute_share:.0f}% of the input pixels, ball recall {comparison['ball_recall_diff']:+.2f} points, "
+          f"HOTA {comparison['hota_diff']:+.2f}")
+    print(f"Ball pass: {comparison['tiles_per_frame']:.1f} tiles/frame, whole frame searched on "
+          f"{100 * comparison['lost_frame_share']:.1f}% of frames")
+
+    results_path = OUTPUT_DIR / 'ball_tiling_benchmark.json'
+    with open(results_path, 'w') as f:
+        json.dump({'model': str(MODEL_PATH), 'backend': BACKEND, 'ball_tiling': ball_tiling_settings(),
+                   'results': results, 'ball_pass': tiling, 'ball_tiling_vs_single_pass': comparison}, f, indent=2)
+    print(f"\nResults saved to: {results_path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Resolution-aware batching benchmark
+
+Interleaves frames of the validation sequences (1920x1080 and the 1280x720
+RBK-FREDRIKSTAD) into one stream, as when several feeds share a detector, and
+detects it two ways with the same batch size:
+
+    mixed    model.predict on the batches as they come; Ultralytics letterboxes
+             a batch of mixed resolutions (and any batch on an exported backend)
+             to a square imgsz x imgsz input
+    grouped  tracking/batching.py: homogeneous batches per resolution, each at its
+             own rectangular input shape, boxes mapped back in one step
+
+Reports the input pixels the model processes per frame (from Ultralytics 8.3's
+letterbox rules), the share of them that is padding, frames/s, and how many of
+the mixed run's detections the grouped run reproduces (IoU >= 0.5, same class).
+"""
+
+import json
+import sys
+import time
+from itertools import zip_longest
+from pathlib import Path
+
+import numpy as np
+
+# Add repository root to path for the shared media and tracking packages
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tracking.backend import EXPORT_IMGSZ, load_model, backend_device
+from tracking.batching import predict_grouped, inference_shape, scaled_shape, square_shape
+from tracking.benchmark_tracker import sequence_frames
+from tracking.bytetrack import iou_matrix
+from tracking.run_tracking_chunked import available_frames
+from tracking.run_tracking_validation import BACKEND, MODEL_PATH, DETECT_CONF, DETECT_IOU, VALIDATION_SEQUENCES
+
+OUTPUT_DIR = Path('/cluster/work/tmstorma/Football2025/tracking/runs/batching_benchmark')
+
+# Frames taken from each sequence (all are held in memory)
+FRAMES_PER_SEQUENCE = 96
+
+BATCH_SIZE = 8
+
+# Timing repeats (best run is reported)
+REPEATS = 3
+
+def load_stream():
+    """[(sequence, frame_number, BGR frame)] of all sequences, interleaved round-robin"""
+    per_sequence = []
+    for dataset_name, frame_indices in VALIDATION_SEQUENCES:
+        frame_numbers = available_frames(dataset_name, frame_indices)[:FRAMES_PER_SEQUENCE]
+        frames = [(dataset_name, i, frame) for i, frame in sequence_frames(dataset_name, frame_numbers)]
+        print(f"  {dataset_name}: {len(frames)} frames at {frames[0][2].shape[1]}x{frames[0][2].shape[0]}")
+        per_sequence.append(frames)
+    return [item for group in zip_longest(*per_sequence) for item in group if item is not None]
+
+def mixed_input_shape(batch_shapes):
+    """Input shape Ultralytics letterboxes a batch to: rectangular only for same-shape PyTorch batches"""
+    if BACKEND == 'pytorch' and len(set(batch_shapes)) == 1:
+        return inference_shape(batch_shapes[0])
+    return square_shape(batch_shapes[0])
+
+def detect_mixed(model, frames, device):
+    """(N, 6) detections per frame with batches taken in stream order"""
+    detections = []
+    for start in range(0, len(frames), BATCH_SIZE):
+        results = model.predict(source=frames[start:start + BATCH_SIZE], conf=DETECT_CONF, iou=DETECT_IOU,
+                                imgsz=EXPORT_IMGSZ, device=device, verbose=False)
+        detections += [result.boxes.data.cpu().numpy() for result in results]
+    return detections
+
+def detect_grouped(model, frames, device):
+    return predict_grouped(model, frames, batch_size=BATCH_SIZE, conf=DETECT_CONF, iou=DETECT_IOU, device=device)
+
+def pixel_stats(frames, mode):
+    """Input pixels per frame and the share of them that is padding"""
+    shapes = [frame.shape[:2] for frame in frames]
+    if mode == 'grouped':
+        inputs = [inference_shape(shape) for shape in shapes]
+    else:
+        inputs = []
+        for start in range(0, len(shapes), BATCH_SIZE):
+            batch = shapes[start:start + BATCH_SIZE]
+            inputs += [mixed_input_shape(batch)] * len(batch)
+    input_pixels = np.array([h * w for h, w in inputs], dtype=np.float64)
+    content_pixels = np.array([h * w for h, w in map(scaled_shape, shapes)], dtype=np.float64)
+    return {
+        'input_pixels_per_frame': float(input_pixels.mean()),
+        'padding_share': float(1 - content_pixels.sum() / input_pixels.sum()),
+    }
+
+def matched_detections(detections, reference, iou_threshold=0.5):
+    """(reference detections with a same-class match at IoU >= threshold, total, mean matched IoU)"""
+    matched, total, ious = 0, 0, []
+    for det, ref in zip(detections, reference):
+        total += len(ref)
+        if len(det) == 0 or len(ref) == 0:
+            continue
+        iou = iou_matrix(ref[:, :4], det[:, :4]) * (ref[:, 5:6] == det[:, 5][None, :])
+        best = iou.max(axis=1)
+        matched += int((best >= iou_threshold).sum())
+        ious += best[best >= iou_threshold].tolist()
+    return matched, total, float(np.mean(ious)) if ious else 0.0
+
+def main():
+    print("="*80)
+    print("Resolution-aware Batching Benchmark")
+    print("="*80)
+    print(f"  Model: {MODEL_PATH}")
+    print(f"  Backend: {BACKEND}")
+    print(f"  imgsz: {EXPORT_IMGSZ}, batch size {BATCH_SIZE}")
+    print(f"  Output: {OUTPUT_DIR}")
+
+    print("\nLoading frames...")
+    stream = load_stream()
+    frames = [frame for _, _, frame in stream]
+
+    model = load_model(MODEL_PATH, BACKEND)
+    device = backend_device(BACKEND)
+    modes = {'mixed': detect_mixed, 'grouped': detect_grouped}
+
+    print("\n" + "="*80)
+    print(f"Detecting {len(frames)} frames ({REPEATS} repeats)")
+    print("="*80)
+    report, detections = {}, {}
+    for mode, detect in modes.items():
+        detect(model, frames[:BATCH_SIZE], device)  # warm-up (per input shape graphs, allocations)
+        best = None
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            detections[mode] = detect(model, frames, device)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        report[mode] = {**pixel_stats(frames, mode), 'seconds': best, 'fps': len(frames) / best}
+        print(f"  {mode:<8} {report[mode]['fps']:7.2f} frames/s")
+
+    matched, total, mean_iou = matched_detections(detections['grouped'], detections['mixed'])
+    mixed, grouped = report['mixed'], report['grouped']
+    summary = {
+        'frames': len(frames),
+        'batch_size': BATCH_SIZE,
+        'backend': BACKEND,
+        'modes': report,
+        'pixels_saved_per_frame': mixed['input_pixels_per_frame'] - grouped['input_pixels_per_frame'],
+        'pixels_saved_share': 1 - grouped['input_pixels_per_frame'] / mixed['input_pixels_per_frame'],
+        'speedup': grouped['fps'] / mixed['fps'],
+        'detections_matched': matched,
+        'detections_reference': total,
+        'mean_matched_iou': mean_iou,
+    }
+
+    print("\n" + "="*80)
+    print("Results")
+    print("="*80)
+    print(f"{'Mode':<10} {'Input px/frame':>15} {'Padding':>8} {'Frames/s':>9}")
+    for mode, r in report.items():
+        print(f"{mode:<10} {r['input_pixels_per_frame']:>15,.0f} {100 * r['padding_share']:>7.1f}% {r['fps']:>9.2f}")
+    print(f"\nPixels saved per frame: {summary['pixels_saved_per_frame']:,.0f} "
+          f"({100 * summary['pixels_saved_share']:.1f}%)")
+    print(f"Throughput: {summary['speedup']:.2f}x")
+    print(f"Mixed-run detections reproduced: {matched}/{total} (mean IoU {mean_iou:.3f})")
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    results_path = OUTPUT_DIR / 'batching_benchmark.json'
+    with open(results_path, 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"\nResults saved to: {results_path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+In-repo ByteTrack vs Ultralytics BYTETracker
+
+Detects the validation sequences once, then feeds the same detections to
+Ultralytics' BYTETracker and to the vectorized ByteTrack (tracking/bytetrack.py)
+with every assignment solver. Reports the per-frame tracker update time, the
+frames whose tracks are identical to Ultralytics, and HOTA from TrackEval.
+Only the tracker is timed (detection is shared by all runs).
+"""
+
+import json
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Add repository root to path for the shared media and tracking packages
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from media.framestore import iter_frames
+from media.video import find_video
+from tracking.backend import load_model, backend_device
+from tracking.bytetrack import ByteTrack, SOLVERS
+from tracking.prepare_hota_data import prepare_hota_data
+from tracking.run_hota_evaluation import evaluate_hota
+from tracking.run_tracking_chunked import available_frames
+from tracking.run_tracking_validation import BACKEND, MODEL_PATH, VAL_DIR, TRACKER_CONFIG, VALIDATION_SEQUENCES
+from tracking.stitching import write_mot
+
+OUTPUT_DIR = Path('/cluster/work/tmstorma/Football2025/tracking/runs/tracker_benchmark')
+
+# Timing repeats over all sequences (best run is reported)
+REPEATS = 5
+
+def sequence_frames(dataset_name, frame_numbers):
+    """(frame_number, BGR frame) of a sequence, from the match video or the validation PNGs"""
+    video_path = find_video(dataset_name)
+    if video_path is not None:
+        return iter_frames(frame_numbers, None, video_path=video_path)
+    return ((i, cv2.imread(str(VAL_DIR / f"{dataset_name}_frame_{i:06d}.png"))) for i in frame_numbers)
+
+def detect_sequences(model, device, batch_size=8):
+    """
+    Detections of every validation sequence with the tracking thresholds:
+    {sequence: [(frame_number, (N, 6) x1, y1, x2, y2, conf, cls, orig_shape)]}
+    """
+    detections = {}
+    for dataset_name, frame_indices in VALIDATION_SEQUENCES:
+        frames = sequence_frames(dataset_name, available_frames(dataset_name, frame_indices))
+        detections[dataset_name] = []
+        while True:
+            batch = list(islice(frames, batch_size))
+            if not batch:
+                break
+            results = model.predict(source=[frame for _, frame in batch], conf=0.3, iou=0.7,
+                                    device=device, verbose=False)
+            for (frame_number, _), result in zip(batch, results):
+                detections[dataset_name].append(
+                    (frame_number, result.boxes.data.cpu().numpy(), result.boxes.orig_shape))
+        print(f"  {dataset_name}: {len(detections[dataset_name])} frames")
+    return detections
+
+def ultralytics_tracker():
+    """Ultralytics BYTETracker configured like model.track(tracker=TRACKER_CONFIG)"""
+    from ultralytics.trackers.byte_tracker import BYTETracker
+    from ultralytics.utils import IterableSimpleNamespace, yaml_load
+
+    return BYTETracker(args=IterableSimpleNamespace(**yaml_load(TRACKER_CONFIG)), frame_rate=30)
+
+def run_tracker(make_tracker, frames, wrap_boxes):
+    """
+    Track one sequence; returns (tracks per frame, seconds spent in update()).
+    Frames without detections do not advance the tracker, as in model.track.
+    """
+    tracker = make_tracker()
+    tracks, seconds = [], 0.0
+    for _, det, orig_shape in frames:
+        if len(det) == 0:
+            tracks.append(np.empty((0, 8), dtype=np.float32))
+            continue
+        boxes = wrap_boxes(det, orig_shape)
+        start = time.perf_counter()
+        out = tracker.update(boxes)
+        seconds += time.perf_counter() - start
+        tracks.append(np.asarray(out, dtype=np.float32).reshape(-1, 8))
+    return tracks, seconds
+
+def mot_rows(frames, tracks):
+    """MOT rows (frame, id, x, y, w, h, conf, class, visibility) of tracker outputs"""
+    rows = [np.column_stack([np.full(len(t), frame_number), t[:, 4], t[:, 0], t[:, 1],
+                             t[:, 2] - t[:, 0], t[:, 3] - t[:, 1], t[:, 5], t[:, 6], np.ones(len(t))])
+            for (frame_number, _, _), t in zip(frames, tracks)]
+    return np.concatenate(rows) if rows else np.empty((0, 9))
+
+def identical_frames(tracks, reference):
+    """Frames with the same IDs, classes and detection indices and boxes within 0.01 px"""
+    return sum(a.shape == b.shape and np.array_equal(a[:, 4:], b[:, 4:]) and np.allclose(a[:, :4], b[:, :4], atol=1e-2)
+               for a, b in zip(tracks, reference))
+
+def main():
+    from ultralytics.engine.results import Boxes
+
+    print("="*80)
+    print("Tracker Benchmark - Vectorized ByteTrack vs Ultralytics")
+    print("="*80)
+    print(f"  Model: {MODEL_PATH}")
+    print(f"  Tracker config: {TRACKER_CONFIG}")
+    print(f"  Solvers: {', '.join(SOLVERS)}")
+    print(f"  Output: {OUTPUT_DIR}")
+
+    print("\nDetecting validation sequences...")
+    model = load_model(MODEL_PATH, BACKEND)
+    detections = detect_sequences(model, backend_device(BACKEND))
+    num_frames = sum(len(frames) for frames in detections.values())
+
+    implementations = {'ultralytics': (ultralytics_tracker, Boxes)}
+    for solver in SOLVERS:
+        try:
+            SOLVERS[solver](np.zeros((1, 1)), 1.0)
+        except ImportError as e:
+            print(f"  Skipping solver '{solver}': {e}")
+            continue
+        implementations[f'vectorized-{solver}'] = (
+            lambda solver=solver: ByteTrack.from_config(TRACKER_CONFIG, solver=solver),
+            lambda det, orig_shape: det)
+
+    print("\n" + "="*80)
+    print(f"Tracking {num_frames} frames ({REPEATS} repeats)")
+    print("="*80)
+    tracks, timings = {}, {}
+    for name, (make_tracker, wrap_boxes) in implementations.items():
+        best = None
+        for _ in range(REPEATS):
+            runs = {seq: run_tracker(make_tracker, frames, wrap_boxes) for seq, frames in detections.items()}
+            seconds = sum(s for _, s in runs.values())
+            best = seconds if best is None else min(best, seconds)
+        tracks[name] = {seq: t for seq, (t, _) in runs.items()}
+        timings[name] = best
+        print(f"  {name:<20} {1000 * best / num_frames:8.3f} ms/frame")
+
+    hota_dir = OUTPUT_DIR / 'hota_data'
+    for name in implementations:
+        for seq, frames in detections.items():
+            seq_dir = OUTPUT_DIR / 'runs' / name / seq
+            seq_dir.mkdir(parents=True, exist_ok=True)
+            write_mot(mot_rows(frames, tracks[name][seq]), seq_dir / 'mot.txt')
+        prepare_hota_data(OUTPUT_DIR / 'runs' / name, hota_dir, tracker_name=name)
+    metrics = evaluate_hota(hota_dir / 'gt', hota_dir / 'trackers', OUTPUT_DIR / 'hota_results',
+                            trackers=list(implementations))
+
+    print("\n" + "="*80)
+    print("Results (combined over the validation sequences)")
+    print("="*80)
+    print(f"{'Tracker':<20} {'ms/frame':>9} {'Speedup':>8} {'Identical':>10} {'HOTA':>7} {'IDF1':>7} {'IDSW':>6}")
+    report = {}
+    for name in implementations:
+        combined = metrics[name]['COMBINED_SEQ']
+        identical = sum(identical_frames(tracks[name][seq], tracks['ultralytics'][seq]) for seq in detections)
+        report[name] = {
+            'ms_per_frame': 1000 * timings[name] / num_frames,
+            'speedup': timings['ultralytics'] / timings[name] if timings[name] > 0 else 0.0,
+            'identical_frames': identical,
+            'frames': num_frames,
+            'metrics': combined,
+        }
+        r = report[name]
+        print(f"{name:<20} {r['ms_per_frame']:>9.3f} {r['speedup']:>7.1f}x {identical:>5}/{num_frames:<4} "
+              f"{combined['HOTA']:>7.2f} {combined['IDF1']:>7.2f} {combined['IDSW']:>6}")
+
+    results_path = OUTPUT_DIR / 'tracker_benchmark.json'
+    with open(results_path, 'w') as f:
+        json.dump({'tracker_config': str(TRACKER_CONFIG), 'repeats': REPEATS, 'trackers': report}, f, indent=2)
+    print(f"\nResults saved to: {results_path}")
+
+if __name__ == '__main__':
+    main()
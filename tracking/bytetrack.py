@@ -0,0 +1,397 @@
+"""
+Vectorized ByteTrack
+
+Same algorithm, thresholds and outputs as Ultralytics' BYTETracker (configured
+by the same bytetrack_custom.yaml), but all tracks live in flat arrays: the
+Kalman states are one (N, 8) mean and one (N, 8, 8) covariance array, every
+frame runs one batched predict and one batched update, and IoU cost matrices
+are built with broadcasting. No per-track Python objects.
+
+The assignment solver is pluggable:
+  'lapjv'  - lap.lapjv with a cost limit (what Ultralytics uses, the default)
+  'scipy'  - scipy.optimize.linear_sum_assignment, pairs above the threshold dropped
+  'greedy' - lowest cost first, one-to-one (no dependency, not optimal)
+
+Output rows match BYTETracker.update(): x1, y1, x2, y2, track_id, score, cls, idx
+(idx = row of the detection in the input), float32. List-order details that
+affect IDs (pool order, duplicate removal, the one-frame grace of removed lost
+tracks) follow Ultralytics so both trackers give the same IDs.
+"""
+
+import numpy as np
+import yaml
+
+TRACKED, LOST, REMOVED = 1, 2, 3
+
+# Kalman filter on (cx, cy, aspect, h) + velocities, constant velocity model
+_STD_POSITION = 1.0 / 20
+_STD_VELOCITY = 1.0 / 160
+_DIAG8 = np.arange(8), np.arange(8)
+_DIAG4 = np.arange(4), np.arange(4)
+
+# Process noise std = h * scale + constant (the aspect ratio noise does not scale with h)
+_PREDICT_STD_SCALE = np.array([_STD_POSITION, _STD_POSITION, 0, _STD_POSITION,
+                               _STD_VELOCITY, _STD_VELOCITY, 0, _STD_VELOCITY])
+_PREDICT_STD_CONST = np.array([0, 0, 1e-2, 0, 0, 0, 1e-5, 0])
+_UPDATE_STD_SCALE = np.array([_STD_POSITION, _STD_POSITION, 0, _STD_POSITION])
+_UPDATE_STD_CONST = np.array([0, 0, 1e-1, 0])
+
+
+def kalman_initiate(measurements):
+    """Mean (N, 8) and covariance (N, 8, 8) of new tracks from (N, 4) xyah measurements"""
+    n = len(measurements)
+    mean = np.concatenate([measurements, np.zeros((n, 4))], axis=1)
+    h = measurements[:, 3]
+    std = np.stack([2 * _STD_POSITION * h, 2 * _STD_POSITION * h, np.full(n, 1e-2), 2 * _STD_POSITION * h,
+                    10 * _STD_VELOCITY * h, 10 * _STD_VELOCITY * h, np.full(n, 1e-5), 10 * _STD_VELOCITY * h], axis=1)
+    cov = np.zeros((n, 8, 8))
+    cov[:, _DIAG8[0], _DIAG8[1]] = np.square(std)
+    return mean, cov
+
+
+def kalman_predict(mean, cov):
+    """
+    One constant-velocity step for all tracks. F = [[I, I], [0, I]], so F x and
+    F P F^T are sums of blocks (the same sums the matrix products compute).
+    """
+    std = mean[:, 3:4] * _PREDICT_STD_SCALE + _PREDICT_STD_CONST
+    mean = mean.copy()
+    mean[:, :4] += mean[:, 4:]
+    cov = cov.copy()
+    cov[:, :4] += cov[:, 4:]
+    cov[:, :, :4] += cov[:, :, 4:]
+    cov[:, _DIAG8[0], _DIAG8[1]] += np.square(std)
+    return mean, cov
+
+
+def kalman_update(mean, cov, measurements):
+    """Correct all tracks with their (N, 4) xyah measurements"""
+    std = mean[:, 3:4] * _UPDATE_STD_SCALE + _UPDATE_STD_CONST
+    projected_mean = mean[:, :4]
+    projected_cov = cov[:, :4, :4].copy()
+    projected_cov[:, _DIAG4[0], _DIAG4[1]] += np.square(std)
+
+    # K = P H^T S^-1, solved for all tracks at once (S is symmetric positive definite)
+    gain = np.linalg.solve(projected_cov, cov[:, :4, :]).transpose(0, 2, 1)
+    innovation = measurements - projected_mean
+    mean = mean + (gain @ innovation[:, :, None])[:, :, 0]
+    cov = cov - gain @ projected_cov @ gain.transpose(0, 2, 1)
+    return mean, cov
+
+
+def iou_matrix(a, b, eps=1e-7):
+    """IoU of (N, 4) and (M, 4) xyxy boxes, computed in float32 like Ultralytics"""
+    a = a.astype(np.float32, copy=False)
+    b = b.astype(np.float32, copy=False)
+    wh = np.maximum(np.minimum(a[:, None, 2:], b[:, 2:]) - np.maximum(a[:, None, :2], b[:, :2]), 0)
+    inter = wh[..., 0] * wh[..., 1]
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b - inter + eps)
+
+
+def _unmatched(matches, n_a, n_b):
+    """Unmatched rows and columns of an assignment, ascending"""
+    return (np.setdiff1d(np.arange(n_a), matches[:, 0]),
+            np.setdiff1d(np.arange(n_b), matches[:, 1]))
+
+
+def assign_lapjv(cost, thresh):
+    import lap
+
+    _, x, y = lap.lapjv(cost, extend_cost=True, cost_limit=thresh)
+    rows = np.where(x >= 0)[0]
+    return np.stack([rows, x[rows]], axis=1), np.where(x < 0)[0], np.where(y < 0)[0]
+
+
+def assign_scipy(cost, thresh):
+    from scipy.optimize import linear_sum_assignment
+
+    rows, cols = linear_sum_assignment(cost)
+    keep = cost[rows, cols] <= thresh
+    matches = np.stack([rows[keep], cols[keep]], axis=1)
+    return (matches, *_unmatched(matches, *cost.shape))
+
+
+def assign_greedy(cost, thresh):
+    order = np.argsort(cost, axis=None, kind='stable')
+    used_rows = np.zeros(cost.shape[0], dtype=bool)
+    used_cols = np.zeros(cost.shape[1], dtype=bool)
+    matches = []
+    for i, j in zip(*np.unravel_index(order, cost.shape)):
+        if cost[i, j] > thresh:
+            break
+        if not used_rows[i] and not used_cols[j]:
+            matches.append((i, j))
+            used_rows[i] = used_cols[j] = True
+    matches = np.array(matches, dtype=int).reshape(-1, 2)
+    return (matches, *_unmatched(matches, *cost.shape))
+
+
+SOLVERS = {'lapjv': assign_lapjv, 'scipy': assign_scipy, 'greedy': assign_greedy}
+
+
+def default_solver():
+    """'lapjv' when the lap package is installed (as for Ultralytics), else 'scipy'"""
+    try:
+        import lap  # noqa: F401
+        return 'lapjv'
+    except ImportError:
+        return 'scipy'
+
+
+def linear_assignment(cost, thresh, solver):
+    """(matches (K, 2), unmatched rows, unmatched columns) of a cost matrix"""
+    if cost.size == 0:
+        return np.empty((0, 2), dtype=int), np.arange(cost.shape[0]), np.arange(cost.shape[1])
+    return SOLVERS[solver](cost, thresh)
+
+
+def xyah(tlwh):
+    """Kalman measurement (cx, cy, w/h, h) of tlwh boxes"""
+    ret = tlwh.copy()
+    ret[:, :2] += ret[:, 2:] / 2
+    ret[:, 2] /= ret[:, 3]
+    return ret
+
+
+def mean_xyxy(mean):
+    """xyxy boxes of Kalman means"""
+    tlwh = mean[:, :4].copy()
+    tlwh[:, 2] *= tlwh[:, 3]
+    tlwh[:, :2] -= tlwh[:, 2:] / 2
+    return np.concatenate([tlwh[:, :2], tlwh[:, :2] + tlwh[:, 2:]], axis=1)
+
+
+class ByteTrack:
+    """
+    ByteTrack over flat track arrays.
+
+        tracker = ByteTrack.from_config(TRACKER_CONFIG)
+        for det in detections:                # (N, 6): x1, y1, x2, y2, conf, cls
+            tracks = tracker.update(det)      # (M, 8): x1, y1, x2, y2, id, score, cls, idx
+
+    Track IDs start at 1 per tracker (reset() starts a new sequence).
+    """
+
+    FIELDS = {'mean': (8,), 'cov': (8, 8), 'track_id': (), 'state': (), 'activated': (),
+              'score': (), 'cls': (), 'idx': (), 'frame': (), 'start': (), 'tracklet_len': (),
+              'removed_at': ()}
+    DTYPES = {'mean': np.float64, 'cov': np.float64, 'track_id': np.int64, 'state': np.int8,
+              'activated': bool, 'score': np.float32, 'cls': np.float32, 'idx': np.float32,
+              'frame': np.int64, 'start': np.int64, 'tracklet_len': np.int64,
+              'removed_at': np.int64}
+
+    def __init__(self, track_high_thresh=0.25, track_low_thresh=0.1, new_track_thresh=0.25,
+                 track_buffer=30, match_thresh=0.8, fuse_score=True, frame_rate=30, solver=None):
+        self.track_high_thresh = track_high_thresh
+        self.track_low_thresh = track_low_thresh
+        self.new_track_thresh = new_track_thresh
+        self.match_thresh = match_thresh
+        self.fuse_score = fuse_score
+        self.max_time_lost = int(frame_rate / 30.0 * track_buffer)
+        self.solver = solver or default_solver()
+        if self.solver not in SOLVERS:
+            raise ValueError(f"Unknown solver '{self.solver}' (expected one of {tuple(SOLVERS)})")
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config_path, frame_rate=30, solver=None):
+        """Tracker with the thresholds of an Ultralytics tracker YAML (tracker_type: bytetrack)"""
+        with open(config_path) as f:
+            cfg = yaml.safe_load(f)
+        if cfg.get('tracker_type', 'bytetrack') != 'bytetrack':
+            raise ValueError(f"{config_path} is a '{cfg['tracker_type']}' config, not bytetrack")
+        keys = ('track_high_thresh', 'track_low_thresh', 'new_track_thresh', 'track_buffer',
+                'match_thresh', 'fuse_score')
+        return cls(**{k: cfg[k] for k in keys if k in cfg}, frame_rate=frame_rate, solver=solver)
+
+    def reset(self):
+        """Drop all tracks and restart frame and ID counters"""
+        self.frame_id = 0
+        self.last_id = 0
+        # Ultralytics keeps the IDs of the last <= 1000 removals and drops lost tracks with
+        # those IDs; here each track stores the position of its last removal instead
+        self.n_removed = 0
+        self.n_removed_kept = 0
+        self.tracks = {name: np.empty((0, *shape), dtype=self.DTYPES[name]) for name, shape in self.FIELDS.items()}
+        # Rows [0, n_tracked) are the tracked list, the rest the lost list (order matters for IDs)
+        self.n_tracked = 0
+
+    def __len__(self):
+        return len(self.tracks['track_id'])
+
+    def state_dict(self):
+        """
+        Complete tracker state as plain Python values (JSON-serializable, floats round-trip
+        exactly): tracked and lost tracks with their Kalman states, frame, ID and removal counters.
+        """
+        return {
+            'frame_id': self.frame_id,
+            'last_id': self.last_id,
+            'n_tracked': self.n_tracked,
+            'n_removed': self.n_removed,
+            'n_removed_kept': self.n_removed_kept,
+            'tracks': {name: values.tolist() for name, values in self.tracks.items()},
+        }
+
+    def load_state_dict(self, state):
+        """Continue from a state_dict(): later updates give the same IDs as an uninterrupted run"""
+        self.frame_id = state['frame_id']
+        self.last_id = state['last_id']
+        self.n_tracked = state['n_tracked']
+        self.n_removed = state['n_removed']
+        self.n_removed_kept = state['n_removed_kept']
+        self.tracks = {name: np.array(state['tracks'][name], dtype=self.DTYPES[name]).reshape(-1, *shape)
+                       for name, shape in self.FIELDS.items()}
+
+    def _take(self, rows):
+        self.tracks = {name: values[rows] for name, values in self.tracks.items()}
+
+    def update(self, det):
+        """
+        Track one frame of detections, (N, 6) array of x1, y1, x2, y2, conf, cls.
+        Returns the active tracks as an (M, 8) float32 array.
+        """
+        self.frame_id += 1
+        det = np.asarray(det, dtype=np.float32).reshape(-1, 6)
+        conf, det_cls = det[:, 4], det[:, 5]
+
+        # Detection boxes as float32 tlwh/xyxy, rounded like Ultralytics Boxes.xywh -> STrack
+        wh = det[:, 2:4] - det[:, :2]
+        center = (det[:, :2] + det[:, 2:4]) / 2
+        tlwh = np.concatenate([center.astype(np.float64) - wh.astype(np.float64) / 2, wh], axis=1).astype(np.float32)
+        det_xyxy = np.concatenate([tlwh[:, :2], tlwh[:, :2] + tlwh[:, 2:]], axis=1)
+
+        high = np.where(conf >= self.track_high_thresh)[0]
+        second = np.where((conf > self.track_low_thresh) & (conf < self.track_high_thresh))[0]
+
+        t = self.tracks
+        n = len(self)
+        in_tracked = np.arange(n) < self.n_tracked
+        pool = np.concatenate([np.where(in_tracked & t['activated'])[0], np.where(~in_tracked)[0]])
+        unconfirmed = np.where(in_tracked & ~t['activated'])[0]
+        old_lost = np.arange(self.n_tracked, n)
+
+        # Predict every pooled track in one step (velocity of h frozen for lost tracks)
+        if len(pool):
+            mean = t['mean'][pool].copy()
+            mean[t['state'][pool] != TRACKED, 7] = 0
+            t['mean'][pool], t['cov'][pool] = kalman_predict(mean, t['cov'][pool])
+        track_xyxy = mean_xyxy(t['mean'])
+
+        # 1. High-score detections vs tracked + lost tracks
+        cost = 1 - iou_matrix(track_xyxy[pool], det_xyxy[high])
+        if self.fuse_score and cost.size:
+            cost = 1 - (1 - cost) * conf[high][None]
+        matches, u_pool, u_high = linear_assignment(cost, self.match_thresh, self.solver)
+        matched_rows = [pool[matches[:, 0]]]
+        matched_dets = [high[matches[:, 1]]]
+        refound = pool[matches[:, 0]][t['state'][pool[matches[:, 0]]] != TRACKED]
+
+        # 2. Low-score detections vs remaining tracked tracks
+        remaining = pool[u_pool][t['state'][pool[u_pool]] == TRACKED]
+        cost = 1 - iou_matrix(track_xyxy[remaining], det_xyxy[second])
+        matches, u_remaining, _ = linear_assignment(cost, 0.5, self.solver)
+        matched_rows.append(remaining[matches[:, 0]])
+        matched_dets.append(second[matches[:, 1]])
+        newly_lost = remaining[u_remaining]
+
+        # 3. Unconfirmed tracks (seen once) vs leftover high-score detections
+        leftover = high[u_high]
+        cost = 1 - iou_matrix(track_xyxy[unconfirmed], det_xyxy[leftover])
+        if self.fuse_score and cost.size:
+            cost = 1 - (1 - cost) * conf[leftover][None]
+        matches, u_unconfirmed, u_leftover = linear_assignment(cost, 0.7, self.solver)
+        matched_rows.append(unconfirmed[matches[:, 0]])
+        matched_dets.append(leftover[matches[:, 1]])
+        removed = [unconfirmed[u_unconfirmed]]
+
+        # One Kalman update for every matched track
+        rows = np.concatenate(matched_rows)
+        dets = np.concatenate(matched_dets)
+        if len(rows):
+            t['mean'][rows], t['cov'][rows] = kalman_update(t['mean'][rows], t['cov'][rows], xyah(tlwh[dets]))
+            t['tracklet_len'][rows] = np.where(t['state'][rows] == TRACKED, t['tracklet_len'][rows] + 1, 0)
+            t['state'][rows] = TRACKED
+            t['activated'][rows] = True
+            t['frame'][rows] = self.frame_id
+            t['score'][rows] = conf[dets]
+            t['cls'][rows] = det_cls[dets]
+            t['idx'][rows] = dets
+        t['state'][newly_lost] = LOST
+        t['state'][removed[0]] = REMOVED
+
+        # 4. New tracks from confident unmatched detections
+        new = leftover[u_leftover]
+        new = new[conf[new] >= self.new_track_thresh]
+        if len(new):
+            mean, cov = kalman_initiate(xyah(tlwh[new]))
+            k = len(new)
+            added = {
+                'mean': mean, 'cov': cov,
+                'track_id': np.arange(self.last_id + 1, self.last_id + 1 + k),
+                'state': np.full(k, TRACKED), 'activated': np.full(k, self.frame_id == 1),
+                'score': conf[new], 'cls': det_cls[new], 'idx': new.astype(np.float32),
+                'frame': np.full(k, self.frame_id), 'start': np.full(k, self.frame_id),
+                'tracklet_len': np.zeros(k), 'removed_at': np.full(k, -1),
+            }
+            self.last_id += k
+            for name in self.FIELDS:
+                t[name] = np.concatenate([t[name], added[name].astype(self.DTYPES[name])])
+        new_rows = np.arange(n, n + len(new))
+
+        # 5. Lost tracks past the buffer are removed (they stay in the pool for one more frame)
+        timed_out = old_lost[self.frame_id - t['frame'][old_lost] > self.max_time_lost]
+        t['state'][timed_out] = REMOVED
+        removed.append(timed_out)
+
+        # Tracked list: surviving tracked tracks, new tracks, re-found tracks;
+        # lost list: old lost tracks that were not re-found, newly lost tracks
+        tracked = np.concatenate([np.where(in_tracked & (t['state'][:n] == TRACKED))[0], new_rows, refound])
+        lost = np.concatenate([old_lost[t['state'][old_lost] != TRACKED], newly_lost])
+        lost = lost[t['removed_at'][lost] < self.n_removed - self.n_removed_kept]
+
+        # Drop duplicates between tracked and lost tracks, keeping the older track
+        xyxy = mean_xyxy(t['mean'])
+        p, q = np.nonzero(1 - iou_matrix(xyxy[tracked], xyxy[lost]) < 0.15)
+        age = t['frame'] - t['start']
+        lost_newer = age[tracked[p]] > age[lost[q]]
+        tracked = np.delete(tracked, p[~lost_newer])
+        lost = np.delete(lost, q[lost_newer])
+
+        removed = np.concatenate(removed)
+        t['removed_at'][removed] = self.n_removed + np.arange(len(removed))
+        self.n_removed += len(removed)
+        self.n_removed_kept += len(removed)
+        if self.n_removed_kept > 1000:
+            self.n_removed_kept = 999
+
+        self._take(np.concatenate([tracked, lost]).astype(int))
+        self.n_tracked = len(tracked)
+
+        active = tracked[t['activated'][tracked]]
+        return np.concatenate([
+            xyxy[active],
+            t['track_id'][active, None], t['score'][active, None],
+            t['cls'][active, None], t['idx'][active, None],
+        ], axis=1).astype(np.float32)
+
+
+def track_results(tracker, results):
+    """
+    Attach track IDs to Ultralytics predict() results, like model.track() does:
+    each result keeps its tracked boxes only, with Kalman-filtered coordinates and IDs
+    (boxes.data = x1, y1, x2, y2, id, conf, cls). Frames without detections do not
+    advance the tracker, as in Ultralytics. Yields results in order.
+    """
+    import torch
+
+    for result in results:
+        det = result.boxes.data.cpu().numpy()
+        if len(det):
+            tracks = tracker.update(det)
+            if len(tracks):
+                result = result[tracks[:, -1].astype(int)]
+                result.update(boxes=torch.as_tensor(tracks[:, :-1]))
+        yield result
@@ -0,0 +1,77 @@
+"""
+Tracking checkpoints for preemptible jobs
+
+A checkpoint is one JSON file per sequence (<output>/<match>/checkpoint.json):
+the last processed frame, the tracker state (ByteTrack.state_dict(): tracked
+and lost tracks with Kalman means/covariances, frame/ID/removal counters), the
+sequence's running statistics, and whether the sequence is done. It is written
+atomically after the writer thread has caught up, so every label file and MOT
+row up to that frame is on disk. A resumed run restores the tracker, keeps the
+MOT rows up to the checkpoint frame and continues with the next frame; track
+IDs are identical to an uninterrupted run.
+
+Every checkpoint carries the key of its run (checkpoint_key(): model weights
+hash, tracker config hash, detection settings, first/last/count of the
+frames). A checkpoint with another key is deleted and the sequence starts
+over, so new weights or a new config never resume into, or skip to, stale
+outputs. Checkpoints are only for recovering a preempted run: the run removes
+them once its outputs are final (remove_checkpoint()).
+"""
+
+import json
+import os
+from pathlib import Path
+
+from tracking.detection_cache import file_sha256
+
+
+def save_checkpoint(path, checkpoint):
+    """Write a checkpoint dict atomically (a preempted write leaves the previous one)"""
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def checkpoint_key(model_file, tracker_config, frame_numbers, **settings):
+    """
+    Everything a sequence's outputs depend on. model_file is the file the model was
+    loaded from (best.pt, or the export of the backend); settings are detection settings.
+    """
+    return {
+        'model': str(model_file),
+        'model_sha256': file_sha256(model_file),
+        'tracker_config_sha256': file_sha256(tracker_config),
+        'frames': {'first': frame_numbers[0], 'last': frame_numbers[-1], 'count': len(frame_numbers)},
+        **settings,
+    }
+
+
+def load_checkpoint(path, key=None):
+    """
+    Checkpoint dict, or None when there is none. With a key, a checkpoint of another
+    key (other weights, tracker config, settings or frames) is deleted and None returned.
+    """
+    if not path.exists():
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if key is not None and checkpoint.get('key') != key:
+        print(f"  Checkpoint {path} is from another model, config or frame range, starting over")
+        path.unlink()
+        return None
+    return checkpoint
+
+
+def remove_checkpoint(path):
+    """Delete a checkpoint once the outputs it recovers are final"""
+    Path(path).unlink(missing_ok=True)
+
+
+def resumed_mot_text(mot_file, last_frame):
+    """MOT rows of a previous run up to last_frame (rows after it are redone)"""
+    if not mot_file.exists():
+        return ''
+    with open(mot_file) as f:
+        # A row cut off by the preemption has no newline (and is after the checkpoint anyway)
+        return ''.join(line for line in f if line.endswith('\n') and int(line.split(',', 1)[0]) <= last_frame)
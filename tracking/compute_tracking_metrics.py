@@ -104,6 +104,25 @@ def match_tracks(gt_tracks, pred_tracks, iou_threshold=0.5):
 
     return matches, false_positives, false_negatives
 
+def class_recall(gt_file, pred_file, class_id, iou_threshold=0.5):
+    """
+    Detection recall of one class (e.g. 3 = ball), matching only boxes of that class
+    Returns: (matched GT boxes, total GT boxes)
+    """
+    gt_tracks = parse_mot_file(gt_file)
+    pred_tracks = parse_mot_file(pred_file)
+
+    total_gt = 0
+    total_matches = 0
+    for frame, gt_frame in gt_tracks.items():
+        gt_frame = [t for t in gt_frame if t['class_id'] == class_id]
+        pred_frame = [t for t in pred_tracks.get(frame, []) if t['class_id'] == class_id]
+        matches, _, _ = match_tracks(gt_frame, pred_frame, iou_threshold)
+        total_gt += len(gt_frame)
+        total_matches += len(matches)
+
+    return total_matches, total_gt
+
 def compute_metrics(gt_file, pred_file, dataset_name):
     """Compute tracking metrics for one dataset"""
     print(f"\n{'='*80}")
@@ -5,13 +5,20 @@ Create tracking visualizations and highlight videos
 
 import cv2
 import numpy as np
-import xml.etree.ElementTree as ET
+import sys
 from pathlib import Path
 from collections import defaultdict
 import json
 
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from annotations.cvat import CLASS_NAMES
+from annotations.cache import load_annotations
+from media.framestore import open_store, iter_frames
+from media.video import find_video
+
 # Class configuration
-CLASS_NAMES = {0: 'home', 1: 'away', 2: 'referee', 3: 'ball'}
 CLASS_COLORS = {
     0: (0, 255, 0),      # home - green
     1: (255, 0, 0),      # away - blue
@@ -21,43 +28,18 @@ CLASS_COLORS = {
 
 def parse_xml_annotations(xml_path, start_frame, end_frame):
     """Parse ground truth annotations from XML"""
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
+    table = load_annotations(xml_path)
+    frames = table['frame']
+    mask = (table['class_id'] >= 0) & (frames >= start_frame) & (frames <= end_frame)
 
     annotations = defaultdict(list)
 
-    for track in root.findall('.//track'):
-        label = track.get('label')
-        track_id = int(track.get('id'))
-
-        # Map label to class_id
-        if label == 'ball':
-            class_id = 3
-        else:
-            team = next((attr.get('value') for attr in track.findall('attribute')
-                        if attr.get('name') == 'team'), None)
-            if team == 'home':
-                class_id = 0
-            elif team == 'away':
-                class_id = 1
-            elif team == 'referee':
-                class_id = 2
-            else:
-                continue
-
-        for box in track.findall('box'):
-            frame_num = int(box.get('frame'))
-            if start_frame <= frame_num <= end_frame:
-                xtl = float(box.get('xtl'))
-                ytl = float(box.get('ytl'))
-                xbr = float(box.get('xbr'))
-                ybr = float(box.get('ybr'))
-
-                annotations[frame_num].append({
-                    'track_id': track_id,
-                    'class_id': class_id,
-                    'bbox': [xtl, ytl, xbr, ybr]
-                })
+    for box in table.iter_boxes(mask):
+        annotations[box.frame].append({
+            'track_id': box.track_id,
+            'class_id': box.class_id,
+            'bbox': [box.xtl, box.ytl, box.xbr, box.ybr]
+        })
 
     return annotations
 
@@ -150,17 +132,12 @@ def create_side_by_side_comparison(dataset_config):
     fourcc = cv2.VideoWriter_fourcc(*'mp4v')
     out = cv2.VideoWriter(output_path, fourcc, 25.0, (img_width * 2, img_height))
 
-    frames_written = 0
-    for frame_num in range(start_frame, end_frame + 1):
-        img_path = Path(img_dir) / f'frame_{frame_num:06d}.png'
-
-        if not img_path.exists():
-            continue
-
-        img = cv2.imread(str(img_path))
-        if img is None:
-            continue
+    # Frames come from the match video or frame store when present, else the PNGs
+    frames = iter_frames(range(start_frame, end_frame + 1), img_dir,
+                         store=open_store(dataset_name), video_path=find_video(dataset_name))
 
+    frames_written = 0
+    for frame_num, img in frames:
         # Draw GT and predictions
         gt_img = draw_boxes(img, gt_annotations.get(frame_num, []), mode='gt')
         pred_img = draw_boxes(img, pred_annotations.get(frame_num, []), mode='pred')
@@ -208,8 +185,8 @@ def create_trajectory_visualization(dataset_config, max_frames=150):
 
     # Create base image
     first_frame = start_frame
-    img_path = Path(img_dir) / f'frame_{first_frame:06d}.png'
-    base_img = cv2.imread(str(img_path))
+    _, base_img = next(iter_frames([first_frame], img_dir, store=open_store(dataset_name),
+                                   video_path=find_video(dataset_name)), (None, None))
 
     # Draw trajectories
     overlay = base_img.copy()
@@ -269,17 +246,10 @@ def create_highlights_video(dataset_configs, output_path, frames_per_dataset=50)
         all_frames = sorted(pred_annotations.keys())
         step = max(1, len(all_frames) // frames_per_dataset)
         sampled_frames = all_frames[::step][:frames_per_dataset]
+        frames = iter_frames(sampled_frames, img_dir, store=open_store(dataset_name),
+                             video_path=find_video(dataset_name))
 
-        for frame_num in sampled_frames:
-            img_path = Path(img_dir) / f'frame_{frame_num:06d}.png'
-
-            if not img_path.exists():
-                continue
-
-            img = cv2.imread(str(img_path))
-            if img is None:
-                continue
-
+        for frame_num, img in frames:
             # Initialize writer with first frame dimensions
             if out is None:
                 out = cv2.VideoWriter(output_path, fourcc, 25.0, (img_width, img_height))
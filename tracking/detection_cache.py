@@ -0,0 +1,230 @@
+"""
+Detection cache for tracker-only runs
+
+The detector is almost all of the cost of a tracking run, but its output does
+not depend on the tracker settings. run_tracking_validation.py can store the
+raw per-frame detections (boxes, scores, classes, NMS'd at the low CACHE_CONF
+threshold) before tracking, and later runs replay them through the tracker
+without decoding a frame or loading the model.
+
+Caches are keyed by the SHA-256 of the model weights, the backend and the
+inference settings: one directory per key under CACHE_DIR,
+
+    <key>/settings.json       what the key was computed from
+    <key>/<sequence>.npz      frames (F,), counts (F,), shapes (F, 2), det (N, 6)
+    <key>/<sequence>.parts/   per-batch files of a sequence still being tracked
+
+with det rows x1, y1, x2, y2, conf, cls (float32, Boxes.data layout) of all
+frames concatenated. Detections at a higher threshold are the cached rows
+with conf >= threshold: NMS only lets a box suppress lower-scoring boxes, so
+low-scoring candidates never change which higher-scoring boxes survive.
+
+While tracking, DetectionCacheWriter writes each batch to its own part file,
+so memory does not grow with the sequence, and joins the parts into
+<sequence>.npz at the end. A run resumed from a checkpoint keeps the parts up
+to the checkpointed frame.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from tracking.backend import EXPORT_IMGSZ, exported_path
+from tracking.bytetrack import iou_matrix
+
+CACHE_DIR = Path('/cluster/work/tmstorma/Football2025/tracking/detection_cache')
+
+# Cached detections go down to this confidence (below track_low_thresh), so tracker
+# experiments can lower the detection threshold without rerunning the detector
+CACHE_CONF = 0.1
+
+# Class offset of class-aware NMS (Ultralytics' max_wh)
+NMS_CLASS_OFFSET = 7680
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """
+    SHA-256 of a file (or of all files of a directory, e.g. an OpenVINO export).
+    Remembered per process while the files' sizes and mtimes stay the same.
+    """
+    path = Path(path)
+    files = [file for file in (sorted(path.rglob('*')) if path.is_dir() else [path]) if file.is_file()]
+    return _files_sha256(tuple((str(file), file.stat().st_size, file.stat().st_mtime_ns) for file in files),
+                         chunk_size)
+
+
+@lru_cache(maxsize=None)
+def _files_sha256(files, chunk_size):
+    """SHA-256 of the contents of (path, size, mtime) files, in order"""
+    digest = hashlib.sha256()
+    for file, _, _ in files:
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(chunk_size), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_settings(model_path, backend, conf=CACHE_CONF, iou=0.7, imgsz=EXPORT_IMGSZ):
+    """Everything the cached detections depend on"""
+    model_path = Path(model_path)
+    # The INT8 model is not derived from best.pt deterministically, so it is hashed itself
+    model_file = exported_path(model_path, backend) if backend == 'onnx-int8' else model_path
+    return {
+        'model': str(model_path),
+        'model_sha256': file_sha256(model_file),
+        'backend': backend,
+        'conf': conf,
+        'iou': iou,
+        'imgsz': imgsz,
+    }
+
+
+def cache_dir(settings, root=CACHE_DIR):
+    """Cache directory of a settings dict (created, with settings.json)"""
+    key = hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:16]
+    path = root / key
+    path.mkdir(parents=True, exist_ok=True)
+    settings_path = path / 'settings.json'
+    if not settings_path.exists():
+        with open(settings_path, 'w') as f:
+            json.dump(settings, f, indent=2)
+    return path
+
+
+def sequence_path(directory, dataset_name):
+    """Cache file of one sequence"""
+    return directory / f'{dataset_name}.npz'
+
+
+def write_cache_file(path, frame_numbers, counts, shapes, det):
+    """Write one cache file; to a temporary file first, so an interrupted run never leaves a partial cache"""
+    tmp_path = path.with_name(f'{path.stem}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, frames=frame_numbers, counts=counts, shapes=shapes, det=det)
+    os.replace(tmp_path, path)
+
+
+def save_detections(path, frames):
+    """Write [(frame_number, (N, 6) det, orig_shape)] to one .npz file"""
+    frame_numbers = np.array([frame_number for frame_number, _, _ in frames], dtype=np.int32)
+    counts = np.array([len(det) for _, det, _ in frames], dtype=np.int32)
+    shapes = np.array([orig_shape[:2] for _, _, orig_shape in frames], dtype=np.int32).reshape(-1, 2)
+    det = np.concatenate([np.asarray(det, dtype=np.float32).reshape(-1, 6) for _, det, _ in frames]) \
+        if frames else np.empty((0, 6), dtype=np.float32)
+    write_cache_file(path, frame_numbers, counts, shapes, det)
+
+
+class DetectionCacheWriter:
+    """
+    Sequence cache written batch by batch while tracking:
+
+        writer = DetectionCacheWriter(sequence_path(cache, dataset_name))
+        writer.append(detections)   # per batch, [(frame_number, (N, 6) det, orig_shape)]
+        writer.finalize()           # <sequence>.npz, parts removed
+
+    Each batch is one part file (<sequence>.parts/<first frame>.npz). resume_after
+    keeps the parts of frames up to a checkpointed frame (later rows are trimmed,
+    those batches are tracked again); otherwise parts of an earlier run are deleted.
+    """
+
+    def __init__(self, path, resume_after=None):
+        self.path = Path(path)
+        self.parts_dir = self.path.with_suffix('.parts')
+        if resume_after is None:
+            shutil.rmtree(self.parts_dir, ignore_errors=True)
+        self.parts_dir.mkdir(parents=True, exist_ok=True)
+        for tmp_path in self.parts_dir.glob('*.tmp'):
+            tmp_path.unlink()
+
+        self.num_frames = 0
+        for part in self.parts():
+            frames = load_detections(part)
+            kept = [frame for frame in frames if frame[0] <= resume_after]
+            if not kept:
+                part.unlink()
+            elif len(kept) < len(frames):
+                save_detections(part, kept)
+            self.num_frames += len(kept)
+
+    def parts(self):
+        """Part files in frame order"""
+        return sorted(self.parts_dir.glob('*.npz'))
+
+    def append(self, frames):
+        """Write one batch [(frame_number, (N, 6) det, orig_shape)] as a part file"""
+        if frames:
+            save_detections(self.parts_dir / f'{frames[0][0]:08d}.npz', frames)
+            self.num_frames += len(frames)
+
+    def finalize(self):
+        """
+        Join the parts into the sequence cache file and remove them. Detection rows are
+        copied part by part through a memory-mapped array. Returns the number of detections.
+        """
+        parts = self.parts()
+        columns = {'frames': [], 'counts': [], 'shapes': []}
+        for part in parts:
+            with np.load(part) as data:
+                for name, values in columns.items():
+                    values.append(data[name])
+        frame_numbers = np.concatenate(columns['frames']) if parts else np.zeros(0, dtype=np.int32)
+        counts = np.concatenate(columns['counts']) if parts else np.zeros(0, dtype=np.int32)
+        shapes = np.concatenate(columns['shapes']) if parts else np.zeros((0, 2), dtype=np.int32)
+
+        num_det = int(counts.sum())
+        det = np.empty((0, 6), dtype=np.float32)
+        if num_det:
+            det = np.lib.format.open_memmap(self.parts_dir / f'det.{os.getpid()}.tmp', mode='w+',
+                                            dtype=np.float32, shape=(num_det, 6))
+            row = 0
+            for part in parts:
+                with np.load(part) as data:
+                    rows = data['det']
+                det[row:row + len(rows)] = rows
+                row += len(rows)
+        write_cache_file(self.path, frame_numbers, counts, shapes, det)
+        del det
+        shutil.rmtree(self.parts_dir)
+        return num_det
+
+
+def load_detections(path, min_conf=None):
+    """
+    [(frame_number, (N, 6) det, orig_shape)] of a cache file, in frame order.
+    min_conf drops lower-scoring rows (detections at a higher threshold).
+    """
+    with np.load(path) as data:
+        frame_numbers, counts, shapes, det = data['frames'], data['counts'], data['shapes'], data['det']
+
+    frames = []
+    for frame_number, rows, shape in zip(frame_numbers.tolist(), np.split(det, np.cumsum(counts)[:-1]),
+                                         shapes.tolist()):
+        if min_conf is not None:
+            rows = rows[rows[:, 4] >= min_conf]
+        frames.append((frame_number, rows, tuple(shape)))
+    return frames
+
+
+def class_nms(det, iou_threshold):
+    """
+    Class-aware greedy NMS of (N, 6) rows, highest score first (like the detector's NMS).
+    Cached detections were NMS'd at the cache IoU; a lower threshold here approximates a
+    run at that threshold (a box the detector suppressed cannot come back).
+    """
+    if len(det) < 2:
+        return det
+    det = det[np.argsort(-det[:, 4], kind='stable')]
+    boxes = det[:, :4] + det[:, 5:6] * NMS_CLASS_OFFSET
+    iou = iou_matrix(boxes, boxes)
+    suppressed = np.zeros(len(det), dtype=bool)
+    keep = []
+    for i in range(len(det)):
+        if not suppressed[i]:
+            keep.append(i)
+            suppressed |= iou[i] > iou_threshold
+    return det[keep]
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+ID switches added by chunked tracking + stitching
+
+Tracks the validation sequences serially (one tracker per sequence) and in
+short overlapping chunks stitched into one ID space (run_tracking_chunked.py),
+evaluates both with TrackEval and reports the ID switches, HOTA and IDF1
+that stitching adds per sequence. The 150-180 frame validation sequences are
+cut into VAL_CHUNK_FRAMES-frame chunks so every sequence has several boundaries.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add repository root to path for the shared tracking package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tracking.backend import backend_device
+from tracking.prepare_hota_data import prepare_hota_data
+from tracking.run_hota_evaluation import evaluate_hota
+from tracking.run_tracking_chunked import chunk_jobs, track_chunks, stitch_match, available_frames
+from tracking.run_tracking_validation import (BACKEND, MODEL_PATH, VALIDATION_SEQUENCES,
+                                              track_validation_set_parallel)
+
+OUTPUT_DIR = Path('/cluster/work/tmstorma/Football2025/tracking/runs/stitching_eval')
+
+# Chunking of the validation sequences (3-4 chunks, 2-3 boundaries per sequence)
+VAL_CHUNK_FRAMES = 60
+VAL_OVERLAP_FRAMES = 20
+
+def main():
+    print("="*80)
+    print("Chunked Tracking - ID Switches Added by Stitching")
+    print("="*80)
+    print(f"  Model: {MODEL_PATH}")
+    print(f"  Chunks: {VAL_CHUNK_FRAMES} frames, {VAL_OVERLAP_FRAMES} frames overlap")
+    print(f"  Output: {OUTPUT_DIR}")
+
+    device = backend_device(BACKEND)
+
+    print("\n" + "="*80)
+    print("Serial tracking (one tracker per sequence)")
+    print("="*80)
+    track_validation_set_parallel(MODEL_PATH, BACKEND, OUTPUT_DIR / 'serial', device=device)
+
+    print("\n" + "="*80)
+    print("Chunked tracking")
+    print("="*80)
+    jobs = {}
+    for dataset_name, frame_indices in VALIDATION_SEQUENCES:
+        frame_numbers = available_frames(dataset_name, frame_indices)
+        jobs[dataset_name] = chunk_jobs(dataset_name, frame_numbers, OUTPUT_DIR / 'chunked',
+                                        VAL_CHUNK_FRAMES, VAL_OVERLAP_FRAMES)
+    track_chunks([job for match_jobs in jobs.values() for job in match_jobs], device=device)
+
+    stitching = {}
+    for dataset_name, match_jobs in jobs.items():
+        stitching[dataset_name] = stitch_match(dataset_name, match_jobs, OUTPUT_DIR / 'chunked')
+
+    hota_dir = OUTPUT_DIR / 'hota_data'
+    for tracker_name in ('serial', 'chunked'):
+        prepare_hota_data(OUTPUT_DIR / tracker_name, hota_dir, tracker_name=tracker_name)
+    metrics = evaluate_hota(hota_dir / 'gt', hota_dir / 'trackers', OUTPUT_DIR / 'hota_results',
+                            trackers=['serial', 'chunked'])
+
+    print("\n" + "="*80)
+    print("Results: chunked + stitched vs serial")
+    print("="*80)
+    print(f"{'Sequence':<18} {'Bounds':>6} {'Cont.':>6} {'IDSW ser':>9} {'IDSW chk':>9} {'Added':>6} "
+          f"{'dHOTA':>7} {'dIDF1':>7}")
+    report = {}
+    for seq in [name for name, _ in VALIDATION_SEQUENCES] + ['COMBINED_SEQ']:
+        serial, chunked = metrics['serial'][seq], metrics['chunked'][seq]
+        boundaries = stitching.get(seq, [b for r in stitching.values() for b in r])
+        report[seq] = {
+            'boundaries': len(boundaries),
+            'tracks_continued': sum(b['continued'] for b in boundaries),
+            'idsw_serial': serial['IDSW'],
+            'idsw_chunked': chunked['IDSW'],
+            'idsw_added': chunked['IDSW'] - serial['IDSW'],
+            'hota_diff': chunked['HOTA'] - serial['HOTA'],
+            'idf1_diff': chunked['IDF1'] - serial['IDF1'],
+            'serial': serial,
+            'chunked': chunked,
+        }
+        r = report[seq]
+        print(f"{seq:<18} {r['boundaries']:>6} {r['tracks_continued']:>6} {r['idsw_serial']:>9} "
+              f"{r['idsw_chunked']:>9} {r['idsw_added']:>+6} {r['hota_diff']:>+7.2f} {r['idf1_diff']:>+7.2f}")
+
+    results_path = OUTPUT_DIR / 'stitching_eval.json'
+    with open(results_path, 'w') as f:
+        json.dump({'chunk_frames': VAL_CHUNK_FRAMES, 'overlap_frames': VAL_OVERLAP_FRAMES,
+                   'sequences': report, 'stitching': stitching}, f, indent=2)
+    print(f"\nResults saved to: {results_path}")
+
+if __name__ == '__main__':
+    main()
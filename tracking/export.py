@@ -0,0 +1,83 @@
+"""
+Vectorized export of Ultralytics results
+
+Each frame's boxes are moved to the host in one transfer (Boxes.data) and all
+rows are formatted with one %-format call, instead of converting cls, xywhn
+and id box by box. Tracking results are written in two formats side by side:
+    labels/<frame>.txt  YOLO with track ID: class x_center y_center width height [track_id]
+    mot.txt             MOT rows: frame,id,bb_left,bb_top,bb_width,bb_height,conf,class,visibility
+MOT frame numbers are image frame numbers (XML frame + 1), as in gt.txt.
+"""
+
+import numpy as np
+
+# Columns of frame_detections()
+CLS, CONF, TRACK_ID, X1, Y1, X2, Y2, XN, YN, WN, HN = range(11)
+
+YOLO_LINE = "%d %.6f %.6f %.6f %.6f\n"
+YOLO_TRACK_LINE = "%d %.6f %.6f %.6f %.6f %d\n"
+MOT_LINE = "%d,%d,%.2f,%.2f,%.2f,%.2f,%.2f,%d,%.2f\n"
+
+
+def frame_detections(result):
+    """
+    All boxes of one Results as an (N, 11) float32 array, copied to the host once.
+    Columns: CLS, CONF, TRACK_ID (-1 when not tracked), X1, Y1, X2, Y2 (pixels),
+    XN, YN, WN, HN (normalized center/size, same float32 math as Boxes.xywhn).
+    """
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return np.empty((0, 11), dtype=np.float32)
+    return box_detections(boxes.data.cpu().numpy(), boxes.orig_shape)
+
+
+def box_detections(data, orig_shape):
+    """
+    frame_detections() of a host array in Boxes.data layout,
+    [x1, y1, x2, y2, (track_id,) conf, cls] (e.g. replayed detections and tracker output).
+    """
+    data = np.asarray(data).astype(np.float32, copy=False)
+    height, width = orig_shape[:2]
+
+    det = np.empty((len(data), 11), dtype=np.float32)
+    det[:, CLS] = data[:, -1]
+    det[:, CONF] = data[:, -2]
+    det[:, TRACK_ID] = data[:, 4] if data.shape[1] == 7 else -1
+    det[:, X1:Y2 + 1] = data[:, :4]
+
+    x1, y1, x2, y2 = data[:, 0], data[:, 1], data[:, 2], data[:, 3]
+    det[:, XN] = (x1 + x2) / 2 / np.float32(width)
+    det[:, YN] = (y1 + y2) / 2 / np.float32(height)
+    det[:, WN] = (x2 - x1) / np.float32(width)
+    det[:, HN] = (y2 - y1) / np.float32(height)
+    return det
+
+
+def yolo_text(det):
+    """YOLO label text of one frame, with the track ID column when the frame is tracked"""
+    if len(det) == 0:
+        return ''
+    if (det[:, TRACK_ID] >= 0).all():
+        values = det[:, [CLS, XN, YN, WN, HN, TRACK_ID]].astype(np.float64)
+        return (YOLO_TRACK_LINE * len(det)) % tuple(values.ravel().tolist())
+    values = det[:, [CLS, XN, YN, WN, HN]].astype(np.float64)
+    return (YOLO_LINE * len(det)) % tuple(values.ravel().tolist())
+
+
+def mot_text(det, frame_number):
+    """MOT rows of one frame (boxes without a track ID are skipped, as TrackEval needs IDs)"""
+    det = det[det[:, TRACK_ID] >= 0]
+    if len(det) == 0:
+        return ''
+
+    values = np.empty((len(det), 9), dtype=np.float64)
+    values[:, 0] = frame_number
+    values[:, 1] = det[:, TRACK_ID]
+    values[:, 2] = det[:, X1]
+    values[:, 3] = det[:, Y1]
+    values[:, 4] = det[:, X2] - det[:, X1]
+    values[:, 5] = det[:, Y2] - det[:, Y1]
+    values[:, 6] = det[:, CONF]
+    values[:, 7] = det[:, CLS]
+    values[:, 8] = 1.0
+    return (MOT_LINE * len(det)) % tuple(values.ravel().tolist())
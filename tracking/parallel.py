@@ -0,0 +1,71 @@
+"""
+Process-per-sequence tracking
+
+Each sequence is tracked in its own spawned process with its own model and
+ByteTrack instance, so sequences run concurrently without sharing tracker
+state. Torch threads are split evenly over the workers (e.g. 32 cores and 3
+sequences: 10 threads each), so the processes do not oversubscribe the CPU.
+Serial runs call reset_tracker() between sequences, so track IDs restart at
+1 per sequence in both modes and both produce the same outputs.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def available_cpus():
+    """CPUs this process may run on (the SLURM allocation, not the whole node)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def worker_threads(workers):
+    """Intra-op threads per worker process"""
+    return max(1, available_cpus() // max(1, workers))
+
+
+def init_worker(threads):
+    """Process initializer: limit torch (and OpenCV) to this worker's share of the CPUs"""
+    import cv2
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only allowed before the first parallel op; a fresh spawned process has not run one
+        pass
+    cv2.setNumThreads(threads)
+
+
+def run_in_processes(fn, jobs, workers=None):
+    """
+    Call fn(*args) for every args tuple in jobs, one process per job
+    (at most workers at a time). Returns the results in job order.
+    fn must be a module-level function; 'spawn' gives every worker a fresh
+    interpreter (no CUDA or tracker state inherited from the parent).
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    workers = min(workers or len(jobs), len(jobs))
+    threads = worker_threads(workers)
+    print(f"  {len(jobs)} jobs on {workers} worker processes, {threads} threads each")
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=init_worker, initargs=(threads,)) as pool:
+        futures = [pool.submit(fn, *args) for args in jobs]
+        return [future.result() for future in futures]
+
+
+def reset_tracker(model):
+    """
+    Start a new sequence with fresh tracker state when a model is reused
+    with persist=True. Track IDs restart at 1, as in a new worker process.
+    """
+    predictor = getattr(model, 'predictor', None)
+    for tracker in getattr(predictor, 'trackers', None) or []:
+        tracker.reset()
@@ -7,85 +7,61 @@ Prepare data for HOTA evaluation by converting:
 MOT format: <frame>, <id>, <bb_left>, <bb_top>, <bb_width>, <bb_height>, <conf>, <class>, <visibility>
 """
 
-import xml.etree.ElementTree as ET
+import sys
+import shutil
 from pathlib import Path
 import json
 from collections import defaultdict
 
+# Add repository root to path for the shared annotations package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from annotations.cache import load_annotations
+
+# Paths
+XML_BASE = Path('/cluster/projects/vc/courses/TDT17/other/Football2025')
+TRACKING_BASE = Path('/cluster/work/tmstorma/Football2025/tracking/runs/val_tracking')
+HOTA_DATA_DIR = Path('/cluster/work/tmstorma/Football2025/tracking/hota_data')
+
+# Datasets with their validation frame ranges and resolutions
+DATASETS = [
+    ('RBK-AALESUND', 1622, 1802, 1920, 1080),     # frames 1622-1801 (180 frames, 0-indexed in XML)
+    ('RBK-FREDRIKSTAD', 1635, 1816, 1280, 720),   # frames 1635-1815 (181 frames, 1280x720 resolution)
+    ('RBK-HamKam', 1371, 1523, 1920, 1080)        # frames 1371-1522 (152 frames)
+]
+
 def parse_xml_ground_truth(xml_path, dataset_name):
     """
     Parse XML annotations and extract ground truth tracks
     Returns: dict of frame_idx -> list of tracks
     """
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
+    table = load_annotations(xml_path)
 
     # Ground truth tracks per frame
     gt_tracks = defaultdict(list)
 
-    # Class mapping
-    class_map = {
-        'home': 0,
-        'away': 1,
-        'referee': 2,
-        'ball': 3
-    }
-
-    for track in root.findall('.//track'):
-        label = track.get('label')
-
-        # Determine class
-        if label == 'ball':
-            class_id = 3
-        else:
-            # Player or referee - check team attribute
-            team = None
-            for attr in track.findall('.//attribute'):
-                if attr.get('name') == 'team':
-                    team = attr.text.strip().lower()
-                    break
-
-            if team in class_map:
-                class_id = class_map[team]
-            else:
-                # Skip tracks without valid team
-                continue
-
-        track_id = int(track.get('id'))
-
-        # Process all boxes in this track
-        for box in track.findall('.//box'):
-            frame_xml = int(box.get('frame'))  # XML frame (0-indexed)
-            frame_mot = frame_xml + 1  # Convert to MOT format (1-indexed)
-
-            xtl = float(box.get('xtl'))
-            ytl = float(box.get('ytl'))
-            xbr = float(box.get('xbr'))
-            ybr = float(box.get('ybr'))
-
-            # Convert to MOT format (top-left width height)
-            bb_left = xtl
-            bb_top = ytl
-            bb_width = xbr - xtl
-            bb_height = ybr - ytl
-
-            gt_tracks[frame_mot].append({
-                'frame': frame_mot,
-                'track_id': track_id,
-                'bb_left': bb_left,
-                'bb_top': bb_top,
-                'bb_width': bb_width,
-                'bb_height': bb_height,
-                'class_id': class_id,
-                'conf': 1.0,  # Ground truth has confidence 1.0
-                'visibility': 1.0
-            })
+    # Skip tracks without valid team (and non-object labels)
+    for box in table.iter_boxes(table['class_id'] >= 0):
+        frame_mot = box.frame + 1  # Convert XML frame (0-indexed) to MOT format (1-indexed)
+
+        # Convert to MOT format (top-left width height)
+        gt_tracks[frame_mot].append({
+            'frame': frame_mot,
+            'track_id': box.track_id,
+            'bb_left': box.xtl,
+            'bb_top': box.ytl,
+            'bb_width': box.xbr - box.xtl,
+            'bb_height': box.ybr - box.ytl,
+            'class_id': box.class_id,
+            'conf': 1.0,  # Ground truth has confidence 1.0
+            'visibility': 1.0
+        })
 
     return gt_tracks
 
 def parse_tracking_predictions(label_dir, dataset_name, frame_offset, img_width=1920, img_height=1080):
     """
-    Parse tracking predictions from YOLO format
+    Parse tracking predictions from YOLO format (runs without mot.txt only)
     Returns: dict of frame_idx -> list of tracks
     """
     pred_tracks = defaultdict(list)
@@ -160,23 +136,12 @@ def write_mot_format(tracks_dict, output_path):
                        f"{track['bb_width']:.2f},{track['bb_height']:.2f},"
                        f"{track['conf']:.2f},{track['class_id']},{track['visibility']:.2f}\n")
 
-def main():
-    print("="*80)
-    print("Preparing Data for HOTA Evaluation")
-    print("="*80)
-
-    # Paths
-    xml_base = Path('/cluster/projects/vc/courses/TDT17/other/Football2025')
-    tracking_base = Path('/cluster/work/tmstorma/Football2025/tracking/runs/val_tracking')
-    output_base = Path('/cluster/work/tmstorma/Football2025/tracking/hota_data')
-
-    # Datasets with their validation frame ranges and resolutions
-    datasets = [
-        ('RBK-AALESUND', 1622, 1802, 1920, 1080),     # frames 1622-1801 (180 frames, 0-indexed in XML)
-        ('RBK-FREDRIKSTAD', 1635, 1816, 1280, 720),   # frames 1635-1815 (181 frames, 1280x720 resolution)
-        ('RBK-HamKam', 1371, 1523, 1920, 1080)        # frames 1371-1522 (152 frames)
-    ]
-
+def prepare_hota_data(tracking_base=TRACKING_BASE, output_base=HOTA_DATA_DIR, tracker_name='ByteTrack',
+                      xml_base=XML_BASE, datasets=DATASETS):
+    """
+    Write gt/<seq>/gt.txt and trackers/<tracker_name>/<seq>/data.txt for one tracking run.
+    Several runs can share output_base under different tracker names and be evaluated together.
+    """
     for dataset_name, start_frame, end_frame, img_width, img_height in datasets:
         print(f"\n{'='*80}")
         print(f"Processing {dataset_name}")
@@ -189,7 +154,7 @@ def main():
 
         # Output directories
         gt_dir = output_base / 'gt' / dataset_name
-        pred_dir = output_base / 'trackers' / 'ByteTrack' / dataset_name
+        pred_dir = output_base / 'trackers' / tracker_name / dataset_name
 
         gt_dir.mkdir(parents=True, exist_ok=True)
         pred_dir.mkdir(parents=True, exist_ok=True)
@@ -213,12 +178,6 @@ def main():
 
         print(f"    Found {len(gt_tracks_filtered)} frames with annotations")
 
-        # Parse predictions
-        print(f"  Parsing predictions...")
-        pred_tracks = parse_tracking_predictions(label_dir, dataset_name, start_frame, img_width, img_height)
-
-        print(f"    Found {len(pred_tracks)} frames with predictions")
-
         # Write MOT format files
         gt_file = gt_dir / 'gt.txt'
         pred_file = pred_dir / 'data.txt'
@@ -226,8 +185,22 @@ def main():
         print(f"  Writing ground truth to: {gt_file}")
         write_mot_format(gt_tracks_filtered, gt_file)
 
-        print(f"  Writing predictions to: {pred_file}")
-        write_mot_format(pred_tracks, pred_file)
+        # run_tracking_validation.py writes MOT rows directly (mot.txt);
+        # label parsing is only needed for runs from before it did
+        mot_file = label_dir.parent / 'mot.txt'
+        if mot_file.exists():
+            print(f"  Copying MOT predictions from: {mot_file}")
+            shutil.copyfile(mot_file, pred_file)
+            with open(pred_file) as f:
+                pred_frames = {line.split(',', 1)[0] for line in f}
+            print(f"    Found {len(pred_frames)} frames with predictions")
+        else:
+            print(f"  Parsing predictions...")
+            pred_tracks = parse_tracking_predictions(label_dir, dataset_name, start_frame, img_width, img_height)
+            print(f"    Found {len(pred_tracks)} frames with predictions")
+
+            print(f"  Writing predictions to: {pred_file}")
+            write_mot_format(pred_tracks, pred_file)
 
         # Write seqinfo
         seqinfo_path = gt_dir.parent / 'seqinfo.ini'
@@ -243,6 +216,14 @@ def main():
 
         print(f"  Completed {dataset_name}")
 
+def main():
+    print("="*80)
+    print("Preparing Data for HOTA Evaluation")
+    print("="*80)
+
+    output_base = HOTA_DATA_DIR
+    prepare_hota_data(TRACKING_BASE, output_base)
+
     print("\n" + "="*80)
     print("Data Preparation Complete!")
     print("="*80)
@@ -0,0 +1,207 @@
+"""
+Per-stage latency instrumentation
+
+A StageProfiler records, for one sequence, the time every frame spends in
+each pipeline stage:
+
+    decode      waiting for decoded frames (what prefetching does not hide)
+    resize      resizing to the group's input size (tracking/batching.py)
+    preprocess  letterbox + tensor conversion    (Ultralytics Results.speed)
+    forward     model forward pass               (Results.speed 'inference')
+    nms         NMS + box scaling                (Results.speed 'postprocess')
+    rescale     mapping grouped boxes back to native pixels (tracking/batching.py)
+    ball_pass   tiled full-resolution ball detection + merge (tracking/ball_tiling.py)
+    track       ByteTrack association
+    write       formatting and queueing label/MOT output
+    other       time not attributed to a stage (where a loop cannot split it)
+
+Scripts can add stages of their own (evaluate_generalization_metrics.py: 'evaluate').
+
+Stages that run per batch are split evenly over the batch's frames, as
+Ultralytics does for Results.speed. A disabled profiler returns a shared
+no-op timer, so instrumented code costs nothing when profiling is off.
+
+Each sequence's per-frame timings are saved as <sequence>/stage_timings.json;
+write_stage_report() turns them into stage_timings.json / .csv with mean,
+percentiles and a histogram per stage, per sequence and aggregated.
+"""
+
+import csv
+import json
+import time
+
+import numpy as np
+
+STAGES = ('decode', 'resize', 'preprocess', 'forward', 'nms', 'rescale', 'ball_pass', 'track', 'write', 'other')
+
+# Ultralytics Results.speed keys -> stages
+SPEED_STAGES = {'preprocess': 'preprocess', 'inference': 'forward', 'postprocess': 'nms'}
+
+# Histogram bin edges in milliseconds (shared by all stages and sequences)
+HISTOGRAM_EDGES_MS = (0, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, float('inf'))
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    def __init__(self, profiler, stage, frames):
+        self.profiler = profiler
+        self.stage = stage
+        self.frames = frames
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.stage, 1000 * (time.perf_counter() - self.start), self.frames)
+        return False
+
+
+class StageProfiler:
+    """
+    Per-frame stage timings of one sequence.
+
+        profiler = StageProfiler(enabled=PROFILE_STAGES)
+        with profiler.stage('decode', frames=len(batch)):
+            ...
+        profiler.add_speed(result.speed)
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.timings = {}
+
+    def stage(self, stage, frames=1):
+        """Context manager timing a stage (split over frames)"""
+        return _StageTimer(self, stage, frames) if self.enabled else _NULL_TIMER
+
+    def add(self, stage, ms, frames=1):
+        """Record ms spent in a stage by frames frames"""
+        if self.enabled and frames > 0:
+            self.timings.setdefault(stage, []).extend([ms / frames] * frames)
+
+    def add_speed(self, speed):
+        """Record one frame's Ultralytics Results.speed (ms per image); returns their sum"""
+        if not self.enabled:
+            return 0.0
+        for key, stage in SPEED_STAGES.items():
+            self.timings.setdefault(stage, []).append(speed.get(key) or 0.0)
+        return sum(speed.get(key) or 0.0 for key in SPEED_STAGES)
+
+    def add_results(self, results, elapsed_ms, stage):
+        """
+        Record the Results.speed of a batch, and the rest of elapsed_ms (the call that
+        produced the results) as stage
+        """
+        if self.enabled and len(results):
+            speed_ms = sum(self.add_speed(result.speed) for result in results)
+            self.add(stage, max(elapsed_ms - speed_ms, 0.0), len(results))
+
+    def save(self, path):
+        """Write the per-frame timings (ms) and their summary"""
+        if not self.enabled:
+            return
+        timings = {stage: np.asarray(values) for stage, values in self.timings.items()}
+        with open(path, 'w') as f:
+            json.dump({'summary': stage_summary(timings), 'frames_ms': self.timings}, f)
+
+
+def profiled_results(results, profiler, stage='other'):
+    """
+    Pass through an Ultralytics results stream that yields one frame per step (image
+    folders, file lists), recording each frame's Results.speed and the rest of the time
+    it took to produce (image loading, tracking or saving inside Ultralytics) as stage
+    """
+    if not profiler.enabled:
+        yield from results
+        return
+    results = iter(results)
+    while True:
+        start = time.perf_counter()
+        try:
+            result = next(results)
+        except StopIteration:
+            return
+        profiler.add_results([result], 1000 * (time.perf_counter() - start), stage)
+        yield result
+
+
+def load_timings(path):
+    """{stage: per-frame ms array} saved by StageProfiler.save()"""
+    with open(path) as f:
+        return {stage: np.asarray(values) for stage, values in json.load(f)['frames_ms'].items()}
+
+
+def stage_order(stages):
+    """Known stages in pipeline order, then any others"""
+    return [s for s in STAGES if s in stages] + sorted(s for s in stages if s not in STAGES)
+
+
+def stage_summary(timings):
+    """Mean, percentiles, total, share of the total and histogram of every stage"""
+    total_ms = sum(float(values.sum()) for values in timings.values())
+    edges = np.asarray(HISTOGRAM_EDGES_MS)
+    summary = {}
+    for stage in stage_order(timings):
+        values = timings[stage]
+        if len(values) == 0:
+            continue
+        p50, p95, p99 = np.percentile(values, [50, 95, 99]).tolist()
+        summary[stage] = {
+            'frames': len(values),
+            'mean_ms': float(values.mean()),
+            'p50_ms': p50,
+            'p95_ms': p95,
+            'p99_ms': p99,
+            'max_ms': float(values.max()),
+            'total_s': float(values.sum()) / 1000,
+            'share': float(values.sum()) / total_ms if total_ms > 0 else 0.0,
+            'histogram': {'edges_ms': list(HISTOGRAM_EDGES_MS),
+                          'counts': np.histogram(values, bins=edges)[0].tolist()},
+        }
+    return summary
+
+
+def write_stage_report(sequence_timings, output_dir, name='stage_timings'):
+    """
+    Report of {sequence: {stage: per-frame ms}}: per-sequence and aggregate summaries,
+    saved as output_dir/<name>.json (with histograms) and <name>.csv. Returns the report.
+    """
+    stages = stage_order({stage for timings in sequence_timings.values() for stage in timings})
+    aggregate = {stage: np.concatenate([timings[stage] for timings in sequence_timings.values() if stage in timings])
+                 for stage in stages}
+    report = {
+        'sequences': {sequence: stage_summary(timings) for sequence, timings in sequence_timings.items()},
+        'aggregate': stage_summary(aggregate),
+    }
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_dir / f'{name}.json', 'w') as f:
+        json.dump(report, f, indent=2)
+
+    columns = ['frames', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'total_s', 'share']
+    with open(output_dir / f'{name}.csv', 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['sequence', 'stage'] + columns)
+        for sequence, summary in [*report['sequences'].items(), ('aggregate', report['aggregate'])]:
+            for stage, row in summary.items():
+                writer.writerow([sequence, stage] + [row[c] for c in columns])
+    return report
+
+
+def print_stage_summary(summary):
+    """Table of a stage_summary()"""
+    print(f"{'Stage':<12} {'Frames':>7} {'Mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'Total s':>9} {'Share':>7}")
+    for stage, row in summary.items():
+        print(f"{stage:<12} {row['frames']:>7} {row['mean_ms']:>8.2f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+              f"{row['p99_ms']:>8.2f} {row['total_s']:>9.2f} {100 * row['share']:>6.1f}%")
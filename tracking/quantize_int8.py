@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+INT8 post-training quantization of the detector for CPU tracking
+
+Exports best.pt to FP32 ONNX (tracking/backend.py), calibrates activation
+ranges on a random sample of dataset/images/train and writes best_int8.onnx
+(static QDQ quantization with ONNX Runtime, per-channel INT8 weights). The
+Detect head's box decoding (DFL, concat, sigmoid) and its final convolutions
+stay FP32: their outputs are pixel coordinates and class scores, where INT8
+rounding costs the most on small boxes like the ball.
+
+The validation set is then tracked with the FP32 ONNX model and the INT8
+model on the same CPU, and both runs go through prepare_hota_data and
+run_hota_evaluation, so the speedup is reported next to its HOTA/IDF1 cost.
+Ball recall is reported separately.
+"""
+
+import json
+import random
+import re
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Add repository root to path for the shared tracking package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tracking.backend import EXPORT_IMGSZ, export_model, exported_path
+from tracking.benchmark_backends import benchmark_backend
+from tracking.compute_tracking_metrics import class_recall
+from tracking.prepare_hota_data import DATASETS, prepare_hota_data
+from tracking.run_hota_evaluation import evaluate_hota
+from tracking.run_tracking_validation import MODEL_PATH
+
+TRAIN_DIR = Path('/cluster/work/tmstorma/Football2025/dataset/images/train')
+OUTPUT_DIR = Path('/cluster/work/tmstorma/Football2025/tracking/runs/int8_benchmark')
+
+# Calibration sample (drawn from all training matches, fixed seed for reproducible models)
+CALIBRATION_IMAGES = 128
+CALIBRATION_SEED = 0
+
+# Activations kept in memory before ONNX Runtime folds them into the ranges
+# (each 1280px image produces a few hundred MB of intermediate outputs)
+CALIBRATION_BATCH = 16
+
+BALL_CLASS = 3
+
+# FP32 ONNX on the same runtime isolates the cost of quantization
+REFERENCE = 'onnx'
+QUANTIZED = 'onnx-int8'
+
+
+def letterbox(image, imgsz=EXPORT_IMGSZ, stride=32):
+    """
+    Network input of a BGR frame, preprocessed like Ultralytics predict() does
+    for a dynamic-shape model: long side resized to imgsz, padded to a multiple
+    of stride with grey (114), RGB, CHW, float32 in [0, 1].
+    """
+    h, w = image.shape[:2]
+    r = min(imgsz / h, imgsz / w)
+    new_w, new_h = round(w * r), round(h * r)
+    pad_w = (imgsz - new_w) % stride / 2
+    pad_h = (imgsz - new_h) % stride / 2
+
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = round(pad_h - 0.1), round(pad_h + 0.1)
+    left, right = round(pad_w - 0.1), round(pad_w + 0.1)
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+
+    image = image[:, :, ::-1].transpose(2, 0, 1)
+    return np.ascontiguousarray(image, dtype=np.float32)[None] / 255.0
+
+
+def calibration_images(train_dir=TRAIN_DIR, count=CALIBRATION_IMAGES, seed=CALIBRATION_SEED):
+    """Random sample of training frames (sorted so the sample only depends on the seed)"""
+    images = sorted(train_dir.glob('*.png'))
+    if not images:
+        raise FileNotFoundError(f"No training images in {train_dir}")
+    return random.Random(seed).sample(images, min(count, len(images)))
+
+
+def head_nodes_to_exclude(model):
+    """
+    Nodes of the Detect head (the last /model.N/ module) that stay FP32:
+    everything except its convolutions, plus the last convolution of each
+    box (cv2) and class (cv3) branch.
+    """
+    indices = [int(m.group(1)) for node in model.graph.node
+               if (m := re.match(r'/model\.(\d+)/', node.name))]
+    head = f'/model.{max(indices)}/'
+    last_conv = re.compile(rf'{re.escape(head)}cv[23]\.\d+/cv[23]\.\d+\.2/')
+
+    return [node.name for node in model.graph.node
+            if node.name.startswith(head) and (node.op_type != 'Conv' or last_conv.match(node.name))]
+
+
+def quantize_model(weights=MODEL_PATH, images=None):
+    """
+    Write the INT8 model next to weights (exported_path(weights, 'onnx-int8')).
+    Reuses an existing INT8 model unless weights are newer.
+    """
+    import onnx
+    from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat,
+                                          QuantType, quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    class FrameReader(CalibrationDataReader):
+        """Feeds letterboxed calibration frames to the ONNX Runtime calibrator"""
+
+        def __init__(self, input_name, paths):
+            self.input_name = input_name
+            self.paths = iter(paths)
+
+        def get_next(self):
+            for path in self.paths:
+                image = cv2.imread(str(path))
+                if image is not None:
+                    return {self.input_name: letterbox(image)}
+            return None
+
+    int8_path = exported_path(weights, QUANTIZED)
+    if int8_path.exists() and int8_path.stat().st_mtime >= Path(weights).stat().st_mtime:
+        print(f"INT8 model up to date: {int8_path}")
+        return int8_path
+
+    fp32_path = export_model(weights, 'onnx')
+    images = images if images is not None else calibration_images()
+
+    # Shape inference + graph optimization first, as recommended for static quantization
+    prepared_path = fp32_path.with_name(f'{fp32_path.stem}_prepared.onnx')
+    quant_pre_process(str(fp32_path), str(prepared_path))
+
+    fp32_model = onnx.load(str(fp32_path))
+    input_name = fp32_model.graph.input[0].name
+    exclude = head_nodes_to_exclude(onnx.load(str(prepared_path)))
+
+    print(f"Calibrating on {len(images)} images from {TRAIN_DIR}")
+    print(f"Keeping {len(exclude)} Detect head nodes in FP32")
+    tmp_path = int8_path.with_name(f'{int8_path.stem}.tmp.onnx')
+    quantize_static(
+        str(prepared_path), str(tmp_path), FrameReader(input_name, images),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        weight_type=QuantType.QInt8,
+        activation_type=QuantType.QUInt8,
+        calibrate_method=CalibrationMethod.MinMax,
+        nodes_to_exclude=exclude,
+        extra_options={'CalibMaxIntermediateOutputs': CALIBRATION_BATCH},
+    )
+
+    # Ultralytics reads class names, stride and imgsz from the export metadata
+    int8_model = onnx.load(str(tmp_path))
+    del int8_model.metadata_props[:]
+    int8_model.metadata_props.extend(fp32_model.metadata_props)
+    onnx.save(int8_model, str(int8_path))
+    tmp_path.unlink()
+    prepared_path.unlink()
+
+    print(f"INT8 model: {int8_path} ({int8_path.stat().st_size / 1e6:.1f} MB, "
+          f"FP32 {fp32_path.stat().st_size / 1e6:.1f} MB)")
+    return int8_path
+
+
+def ball_recall(hota_dir, tracker_name):
+    """Ball detection recall over all validation sequences (IoU >= 0.5)"""
+    matched, total = 0, 0
+    for dataset_name, *_ in DATASETS:
+        m, t = class_recall(hota_dir / 'gt' / dataset_name / 'gt.txt',
+                            hota_dir / 'trackers' / tracker_name / dataset_name / 'data.txt', BALL_CLASS)
+        matched += m
+        total += t
+    return 100 * matched / total if total else 0.0
+
+
+def main():
+    print("="*80)
+    print("INT8 Post-Training Quantization - YOLOv8s Detector")
+    print("="*80)
+    print(f"  Model: {MODEL_PATH}")
+    print(f"  Calibration: {CALIBRATION_IMAGES} images from {TRAIN_DIR} (seed {CALIBRATION_SEED})")
+    print(f"  Output: {OUTPUT_DIR}")
+
+    print("\n" + "="*80)
+    print("Quantizing")
+    print("="*80)
+    quantize_model(MODEL_PATH)
+
+    hota_dir = OUTPUT_DIR / 'hota_data'
+    timings = {}
+    for backend in (REFERENCE, QUANTIZED):
+        print(f"\n{'='*80}")
+        print(f"Tracking validation set: {backend}")
+        print(f"{'='*80}")
+        timings[backend] = benchmark_backend(backend, OUTPUT_DIR / 'runs' / backend)
+        prepare_hota_data(OUTPUT_DIR / 'runs' / backend, hota_dir, tracker_name=backend)
+
+    metrics = evaluate_hota(hota_dir / 'gt', hota_dir / 'trackers', OUTPUT_DIR / 'hota_results',
+                            trackers=list(timings))
+
+    results = {}
+    for backend, timing in timings.items():
+        results[backend] = {
+            **timing,
+            'metrics': metrics[backend],
+            'ball_recall': ball_recall(hota_dir, backend),
+        }
+
+    reference, quantized = results[REFERENCE], results[QUANTIZED]
+    ref_combined = reference['metrics']['COMBINED_SEQ']
+    int8_combined = quantized['metrics']['COMBINED_SEQ']
+    cost = {
+        'speedup': quantized['fps'] / reference['fps'],
+        'hota_diff': int8_combined['HOTA'] - ref_combined['HOTA'],
+        'idf1_diff': int8_combined['IDF1'] - ref_combined['IDF1'],
+        'idsw_diff': int8_combined['IDSW'] - ref_combined['IDSW'],
+        'ball_recall_diff': quantized['ball_recall'] - reference['ball_recall'],
+    }
+
+    print("\n" + "="*80)
+    print(f"Results (CPU, {reference['frames']} validation frames)")
+    print("="*80)
+    print(f"{'Model':<10} {'FPS':>7} {'ms/frame':>9} {'HOTA':>7} {'IDF1':>7} {'MOTA':>7} {'IDSW':>5} {'Ball rec.':>10}")
+    for backend, r in results.items():
+        combined = r['metrics']['COMBINED_SEQ']
+        print(f"{backend:<10} {r['fps']:>7.1f} {r['ms_per_frame']:>9.1f} {combined['HOTA']:>7.2f} "
+              f"{combined['IDF1']:>7.2f} {combined['MOTA']:>7.2f} {combined['IDSW']:>5} {r['ball_recall']:>9.2f}%")
+    print(f"\nINT8 vs FP32: {cost['speedup']:.2f}x faster, HOTA {cost['hota_diff']:+.2f}, "
+          f"IDF1 {cost['idf1_diff']:+.2f}, ID switches {cost['idsw_diff']:+d}, "
+          f"ball recall {cost['ball_recall_diff']:+.2f} points")
+
+    results_path = OUTPUT_DIR / 'int8_benchmark.json'
+    with open(results_path, 'w') as f:
+        json.dump({'model': str(MODEL_PATH), 'int8_model': str(exported_path(MODEL_PATH, QUANTIZED)),
+                   'calibration_images': CALIBRATION_IMAGES, 'calibration_seed': CALIBRATION_SEED,
+                   'results': results, 'int8_vs_fp32': cost}, f, indent=2)
+    print(f"\nResults saved to: {results_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Chunked tracking of full matches
+
+Each match is split into CHUNK_FRAMES-frame chunks overlapping by
+OVERLAP_FRAMES (tracking/stitching.py). Chunks are tracked in parallel worker
+processes and their track IDs are stitched into one ID space per match:
+runs/chunked_tracking/<match>/mot.txt.
+
+Across nodes: submit as a SLURM array with one task per chunk
+(sbatch --array=0-<jobs-1>); each task tracks only its chunk. A final run
+without SLURM_ARRAY_TASK_ID reuses the finished chunks and stitches them.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add repository root to path for the shared media and tracking packages
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from media.framestore import open_store
+from media.video import find_video, load_video_index
+from tracking.backend import backend_device, model_file
+from tracking.checkpoint import remove_checkpoint
+from tracking.parallel import run_in_processes
+from tracking.run_tracking_validation import (BACKEND, MODEL_PATH, VAL_DIR, TRACKER_CONFIG, USE_VIDEO,
+                                              USE_FRAME_STORE, sequence_key, track_sequence_worker)
+from tracking.stitching import plan_chunks, load_mot, write_mot, stitch_tracks
+
+OUTPUT_DIR = Path('/cluster/work/tmstorma/Football2025/tracking/runs/chunked_tracking')
+
+# Full matches: every frame of the match video, or of its frame store when there is no video
+MATCHES = ['RBK-AALESUND', 'RBK-FREDRIKSTAD', 'RBK-HamKam']
+
+# 1 minute per chunk at 25 fps
+CHUNK_FRAMES = 1500
+
+# Frames tracked by both neighbouring chunks: longer than track_buffer (30) so
+# both trackers have settled at the middle of the overlap, where the cut is made
+OVERLAP_FRAMES = 80
+
+# Boxes of two chunks are the same object when IoU >= threshold in >= STITCH_MIN_FRAMES shared frames
+STITCH_IOU = 0.5
+STITCH_MIN_FRAMES = 5
+
+def chunk_dir(output_dir, dataset_name, k):
+    """Output directory of chunk k (track_sequence writes <dir>/<match>/{labels/, mot.txt})"""
+    return output_dir / dataset_name / 'chunks' / f'{k:03d}'
+
+def chunk_jobs(dataset_name, frame_numbers, output_dir, chunk_frames=CHUNK_FRAMES, overlap=OVERLAP_FRAMES):
+    """(dataset_name, k, frame numbers, chunk output dir) of every chunk of a match"""
+    return [(dataset_name, k, frame_numbers[start:end], chunk_dir(output_dir, dataset_name, k))
+            for k, (start, end) in enumerate(plan_chunks(len(frame_numbers), chunk_frames, overlap))]
+
+def chunk_key(frame_numbers, model_path=MODEL_PATH, backend=BACKEND, tracker_config=TRACKER_CONFIG):
+    """Settings a chunk's output depends on: the sequence key of its checkpoints (weights of the backend)"""
+    return sequence_key(model_file(model_path, backend), tracker_config, frame_numbers)
+
+def chunk_done(job, model_path=MODEL_PATH, backend=BACKEND, tracker_config=TRACKER_CONFIG):
+    """True if a chunk was tracked with the same frames, model, tracker config and detection settings"""
+    dataset_name, _, frame_numbers, out_dir = job
+    info_path = out_dir / dataset_name / 'chunk.json'
+    if not info_path.exists():
+        return False
+    with open(info_path) as f:
+        info = json.load(f)
+    return info.get('key') == chunk_key(frame_numbers, model_path, backend, tracker_config)
+
+def track_chunk_worker(model_path, backend, dataset_name, frame_numbers, out_dir,
+                       val_dir=VAL_DIR, tracker_config=TRACKER_CONFIG, device=None):
+    """Worker process: track one chunk from an empty tracker, then mark it done (chunk.json replaces its checkpoint)"""
+    stats = track_sequence_worker(model_path, backend, dataset_name, frame_numbers, out_dir,
+                                  val_dir=val_dir, tracker_config=tracker_config, device=device)
+    with open(out_dir / dataset_name / 'chunk.json', 'w') as f:
+        json.dump({'key': chunk_key(frame_numbers, model_path, backend, tracker_config)}, f, indent=2)
+    remove_checkpoint(out_dir / dataset_name / 'checkpoint.json')
+    return stats
+
+def track_chunks(jobs, model_path=MODEL_PATH, backend=BACKEND, val_dir=VAL_DIR,
+                 tracker_config=TRACKER_CONFIG, device=None, workers=None):
+    """Track every chunk that is not done yet, one worker process per chunk"""
+    pending = [job for job in jobs if not chunk_done(job, model_path, backend, tracker_config)]
+    print(f"  {len(jobs) - len(pending)}/{len(jobs)} chunks already tracked")
+    run_in_processes(track_chunk_worker,
+                     [(model_path, backend, dataset_name, frame_numbers, out_dir, val_dir, tracker_config, device)
+                      for dataset_name, _, frame_numbers, out_dir in pending], workers)
+
+def stitch_match(dataset_name, jobs, output_dir, iou_threshold=STITCH_IOU, min_frames=STITCH_MIN_FRAMES):
+    """
+    Stitch the tracked chunks of one match into output_dir/<match>/mot.txt.
+    Returns the per-boundary stitching report.
+    """
+    chunk_rows = [load_mot(out_dir / dataset_name / 'mot.txt') for _, _, _, out_dir in jobs]
+    chunk_frames = [frame_numbers for _, _, frame_numbers, _ in jobs]
+    rows, report = stitch_tracks(chunk_rows, chunk_frames, iou_threshold, min_frames)
+
+    write_mot(rows, output_dir / dataset_name / 'mot.txt')
+    with open(output_dir / dataset_name / 'stitching.json', 'w') as f:
+        json.dump({'chunks': len(jobs), 'tracks': len(set(rows[:, 1].astype(int).tolist())),
+                   'boundaries': report}, f, indent=2)
+    return report
+
+def available_frames(dataset_name, frame_numbers, val_dir=VAL_DIR):
+    """Frames of a validation clip that can be read (video frames, or existing validation PNGs)"""
+    video_path = find_video(dataset_name)
+    if video_path is not None:
+        video_index = load_video_index(video_path)
+        return [i for i in frame_numbers if i in video_index]
+    return [i for i in frame_numbers if (val_dir / f"{dataset_name}_frame_{i:06d}.png").exists()]
+
+def match_frames(dataset_name):
+    """
+    Image frame numbers of a whole match: every indexed video frame, else every frame
+    of its frame store (media/build_frame_stores.py decodes the full match PNGs).
+    Raises FileNotFoundError when there is neither; VAL_DIR only holds the validation clip.
+    """
+    video_path = find_video(dataset_name) if USE_VIDEO else None
+    if video_path is not None:
+        return list(load_video_index(video_path).frame_numbers)
+    store = open_store(dataset_name) if USE_FRAME_STORE else None
+    if store is not None:
+        return list(store.frames)
+    raise FileNotFoundError(f"No video or frame store for {dataset_name}: the full match cannot be read "
+                            f"(run media/build_frame_stores.py)")
+
+def main():
+    print("="*60)
+    print("Chunked Tracking - Full Matches")
+    print("="*60)
+    print(f"  Model: {MODEL_PATH}")
+    print(f"  Backend: {BACKEND}")
+    print(f"  Chunks: {CHUNK_FRAMES} frames, {OVERLAP_FRAMES} frames overlap")
+    print(f"  Output: {OUTPUT_DIR}")
+
+    jobs = {}
+    for dataset_name in MATCHES:
+        frame_numbers = match_frames(dataset_name)
+        jobs[dataset_name] = chunk_jobs(dataset_name, frame_numbers, OUTPUT_DIR)
+        print(f"  {dataset_name}: {len(frame_numbers)} frames, {len(jobs[dataset_name])} chunks")
+
+    all_jobs = [job for match_jobs in jobs.values() for job in match_jobs]
+    device = backend_device(BACKEND)
+
+    # SLURM array task: track a single chunk (stitching happens in a final run)
+    task_id = os.environ.get('SLURM_ARRAY_TASK_ID')
+    if task_id is not None:
+        dataset_name, k, frame_numbers, out_dir = all_jobs[int(task_id)]
+        print(f"\nArray task {task_id}: {dataset_name} chunk {k} ({frame_numbers[0]}-{frame_numbers[-1]})")
+        track_chunk_worker(MODEL_PATH, BACKEND, dataset_name, frame_numbers, out_dir, device=device)
+        return
+
+    print("\n" + "="*60)
+    print(f"Tracking {len(all_jobs)} chunks")
+    print("="*60)
+    track_chunks(all_jobs, device=device)
+
+    print("\n" + "="*60)
+    print("Stitching track IDs")
+    print("="*60)
+    for dataset_name, match_jobs in jobs.items():
+        report = stitch_match(dataset_name, match_jobs, OUTPUT_DIR)
+        continued = sum(b['continued'] for b in report)
+        new = sum(b['new_in_overlap'] for b in report)
+        ended = sum(b['ended_in_overlap'] for b in report)
+        print(f"  {dataset_name}: {len(report)} boundaries, {continued} tracks continued, "
+              f"{new} started and {ended} ended in overlaps")
+        print(f"    -> {OUTPUT_DIR / dataset_name / 'mot.txt'}")
+
+    print("\nChunked tracking complete!")
+
+if __name__ == '__main__':
+    main()
@@ -4,37 +4,166 @@ Object Tracking on Generalization Datasets
 Step 3.4: Test tracking on RBK-VIKING and RBK-BODO-part3
 """
 
-from ultralytics import YOLO
 from pathlib import Path
+from itertools import islice
 import json
+import sys
+import time
 
-def track_dataset(model, dataset_name, images_dir, tracker_config, output_base):
-    """Track a single dataset"""
-    print("\n" + "="*60)
-    print(f"Tracking {dataset_name}")
-    print("="*60)
+# Add repository root to path for the shared media and tracking packages
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-    # Count images
-    images = sorted(images_dir.glob('*.png'))
-    print(f"Found {len(images)} images")
+from media.video import VideoReader, find_video, load_video_index
+from tracking.backend import load_model, backend_device
+from tracking.bytetrack import ByteTrack, track_results
+from tracking.parallel import run_in_processes, reset_tracker
+from tracking.profiling import (StageProfiler, profiled_results, load_timings, write_stage_report,
+                                print_stage_summary)
 
-    # Run tracking
-    output_dir = output_base / dataset_name
-    results = model.track(
+# Inference backend: 'pytorch', or 'onnx' / 'openvino' on CPU nodes (tracking/backend.py)
+BACKEND = 'pytorch'
+
+# Tracker: 'ultralytics' (model.track) or 'vectorized' (tracking/bytetrack.py, same config and IDs)
+TRACKER = 'ultralytics'
+
+# Track straight from the match video (media/video.py) when one exists
+USE_VIDEO = True
+
+# Record per-frame stage timings (tracking/profiling.py): <dataset>/stage_timings.json
+# and an aggregate stage_timings.json/.csv
+PROFILE_STAGES = False
+
+# Track every dataset in its own process (own model and tracker, torch threads split
+# over the CPUs, tracking/parallel.py); False tracks them one after another
+PARALLEL = False
+
+def track_video(model, video_path, tracker_config, output_dir, batch_size=8, profiler=None):
+    """
+    Track a match video frame by frame without extracting PNGs.
+    Yields results in frame order and writes labels/frame_XXXXXX.txt like save_txt does
+    for image folders (frame 1 = first video frame = XML frame 0).
+    """
+    profiler = profiler or StageProfiler(enabled=False)
+    labels_dir = output_dir / 'labels'
+    labels_dir.mkdir(parents=True, exist_ok=True)
+
+    # Each video starts with an empty tracker (IDs from 1), as in its own worker process
+    reset_tracker(model)
+    tracker = ByteTrack.from_config(tracker_config) if TRACKER == 'vectorized' else None
+
+    with VideoReader(video_path) as reader:
+        frames = iter(reader)
+        while True:
+            start = time.perf_counter()
+            batch = list(islice(frames, batch_size))
+            if not batch:
+                break
+            profiler.add('decode', 1000 * (time.perf_counter() - start), len(batch))
+
+            start = time.perf_counter()
+            if tracker is not None:
+                results = model.predict(
+                    source=[frame for _, frame in batch],
+                    conf=0.3,
+                    iou=0.7,
+                    device=backend_device(BACKEND),
+                    verbose=False
+                )
+                profiler.add_results(results, 1000 * (time.perf_counter() - start), 'other')
+                with profiler.stage('track', frames=len(batch)):
+                    results = list(track_results(tracker, results))
+            else:
+                # Ultralytics tracks inside the call: the time besides Results.speed is the tracker
+                results = model.track(
+                    source=[frame for _, frame in batch],
+                    tracker=str(tracker_config),
+                    conf=0.3,
+                    iou=0.7,
+                    persist=True,  # keep tracker state across batches
+                    device=backend_device(BACKEND),
+                    verbose=False
+                )
+                profiler.add_results(results, 1000 * (time.perf_counter() - start), 'track')
+
+            for (frame_number, _), result in zip(batch, results):
+                with profiler.stage('write'):
+                    label_file = labels_dir / f'frame_{frame_number:06d}.txt'
+                    label_file.unlink(missing_ok=True)  # save_txt appends
+                    result.save_txt(str(label_file))
+                yield result
+
+def track_images_vectorized(model, images_dir, tracker_config, output_dir, profiler=None):
+    """
+    Image-folder tracking with the in-repo ByteTrack: same outputs as model.track with
+    save=True, save_txt=True (annotated images and labels/<image>.txt), yields results in order.
+    """
+    profiler = profiler or StageProfiler(enabled=False)
+    labels_dir = output_dir / 'labels'
+    labels_dir.mkdir(parents=True, exist_ok=True)
+
+    tracker = ByteTrack.from_config(tracker_config)
+    results = model.predict(
         source=str(images_dir),
-        tracker=str(tracker_config),
-        save=True,
         conf=0.3,
         iou=0.7,
-        show_labels=True,
-        show_conf=True,
-        save_txt=True,
-        project=str(output_dir.parent),
-        name=output_dir.name,
-        exist_ok=True,
+        device=backend_device(BACKEND),
         stream=True,
-        verbose=False  # Less verbose for long sequences
+        verbose=False
     )
+    # Images are read inside the predict stream: the time besides Results.speed is decoding
+    for result in profiled_results(results, profiler, 'decode'):
+        with profiler.stage('track'):
+            result = next(track_results(tracker, [result]))
+        with profiler.stage('write'):
+            image_path = Path(result.path)
+            label_file = labels_dir / f'{image_path.stem}.txt'
+            label_file.unlink(missing_ok=True)  # save_txt appends
+            result.save_txt(str(label_file))
+            result.save(filename=str(output_dir / image_path.name))
+        yield result
+
+def track_dataset(model, dataset_name, images_dir, tracker_config, output_base, video_path=None):
+    """Track a single dataset"""
+    print("\n" + "="*60)
+    print(f"Tracking {dataset_name}")
+    print("="*60)
+
+    output_dir = output_base / dataset_name
+    profiler = StageProfiler(PROFILE_STAGES)
+
+    if video_path is not None:
+        # Annotated frames are not saved for videos (use create_visualizations.py)
+        num_frames = len(load_video_index(video_path))
+        print(f"Found video {video_path} ({num_frames} frames)")
+        images = range(num_frames)
+        results = track_video(model, video_path, tracker_config, output_dir, profiler=profiler)
+    else:
+        # Count images
+        images = sorted(images_dir.glob('*.png'))
+        print(f"Found {len(images)} images")
+
+        # Run tracking
+        if TRACKER == 'vectorized':
+            results = track_images_vectorized(model, images_dir, tracker_config, output_dir, profiler=profiler)
+        else:
+            results = model.track(
+                source=str(images_dir),
+                tracker=str(tracker_config),
+                save=True,
+                conf=0.3,
+                iou=0.7,
+                device=backend_device(BACKEND),
+                show_labels=True,
+                show_conf=True,
+                save_txt=True,
+                project=str(output_dir.parent),
+                name=output_dir.name,
+                exist_ok=True,
+                stream=True,
+                verbose=False  # Less verbose for long sequences
+            )
+            # Decoding, tracking and saving all happen inside the stream (recorded as 'other')
+            results = profiled_results(results, profiler, 'other')
 
     # Collect statistics
     track_ids_per_class = {0: set(), 1: set(), 2: set(), 3: set()}
@@ -71,6 +200,7 @@ def track_dataset(model, dataset_name, images_dir, tracker_config, output_base):
     }
 
     # Save summary
+    profiler.save(output_dir / 'stage_timings.json')
     summary_path = output_dir / 'tracking_summary.json'
     with open(summary_path, 'w') as f:
         json.dump(summary, f, indent=2)
@@ -85,6 +215,11 @@ def track_dataset(model, dataset_name, images_dir, tracker_config, output_base):
 
     return summary
 
+def track_dataset_worker(model_path, dataset_name, images_dir, tracker_config, output_base, video_path=None):
+    """Worker process: track one dataset with its own model and tracker"""
+    model = load_model(model_path, BACKEND)
+    return track_dataset(model, dataset_name, images_dir, tracker_config, output_base, video_path=video_path)
+
 def main():
     print("="*60)
     print("Generalization Testing - Object Tracking")
@@ -98,13 +233,19 @@ def main():
 
     print(f"\nConfiguration:")
     print(f"  Model: {model_path}")
+    print(f"  Backend: {BACKEND}")
+    print(f"  Tracker: {TRACKER}")
+    print(f"  Mode: {'one process per dataset' if PARALLEL else 'sequential'}")
+    if PROFILE_STAGES:
+        print(f"  Stage timings: on")
     print(f"  Tracker: {tracker_config}")
     print(f"  Output: {output_base}")
 
-    # Load model
-    print("\nLoading model...")
-    model = YOLO(str(model_path))
-    print("Model loaded successfully")
+    # Load model (worker processes load their own)
+    if not PARALLEL:
+        print("\nLoading model...")
+        model = load_model(model_path, BACKEND)
+        print("Model loaded successfully")
 
     # Datasets to test
     datasets = [
@@ -112,15 +253,18 @@ def main():
         ('RBK-BODO-part3', base_images_dir / 'RBK-BODO-part3' / 'img1')
     ]
 
-    results_all = []
-
+    jobs = []
     for dataset_name, images_dir in datasets:
-        if not images_dir.exists():
+        video_path = find_video(dataset_name) if USE_VIDEO else None
+        if video_path is None and not images_dir.exists():
             print(f"\nWARNING: {dataset_name} not found at {images_dir}")
             continue
+        jobs.append((dataset_name, images_dir, tracker_config, output_base, video_path))
 
-        summary = track_dataset(model, dataset_name, images_dir, tracker_config, output_base)
-        results_all.append(summary)
+    if PARALLEL:
+        results_all = run_in_processes(track_dataset_worker, [(model_path, *job) for job in jobs])
+    else:
+        results_all = [track_dataset(model, *job[:-1], video_path=job[-1]) for job in jobs]
 
     # Overall summary
     print("\n" + "="*60)
@@ -134,6 +278,14 @@ def main():
         print(f"  Avg detections/frame: {summary['avg_detections_per_frame']:.1f}")
         print(f"  Unique tracks: {sum(summary['unique_tracks_per_class'].values())}")
 
+    if PROFILE_STAGES:
+        sequence_timings = {summary['dataset']: load_timings(output_base / summary['dataset'] / 'stage_timings.json')
+                            for summary in results_all}
+        report = write_stage_report(sequence_timings, output_base)
+        print("\nStage timings (ms per frame, all datasets):")
+        print_stage_summary(report['aggregate'])
+        print(f"Stage timings saved to: {output_base / 'stage_timings.json'} (.csv)")
+
     print(f"\nOutputs saved to: {output_base}")
     print("\nNote: These datasets lack proper team labels (Step 1b finding)")
     print("Evaluation is qualitative only - inspect tracked videos manually")
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Real-time streaming tracking
+
+Replays a match video at 25 fps as a stand-in for a live broadcast feed
+(tracking/streaming.py) and tracks each frame as it arrives: detection at
+the player resolution, an optional full-resolution ball-only pass, then the
+in-repo ByteTrack. Tracks of each frame go to a bounded output queue read by
+a downstream consumer (here: a MOT file writer). When tracking falls behind
+the latency budget, POLICY drops frames, lowers the resolution or skips the
+ball pass. Reports the per-frame latency distribution (arrival to tracks
+emitted): runs/realtime/<match>_<policy>.json, with every per-frame record
+streamed to runs/realtime/<match>/frames.jsonl.
+"""
+
+import json
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+# Add repository root to path for the shared media and tracking packages
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from media.video import find_video
+from tracking.backend import load_model, backend_device
+from tracking.bytetrack import ByteTrack
+from tracking.export import box_detections, mot_text
+from tracking.run_tracking_validation import BACKEND, MODEL_PATH, TRACKER_CONFIG, DETECT_CONF, DETECT_IOU
+from tracking.streaming import LiveSource, LatencyController, FrameLog, put_latest, latency_summary, SOURCE_BUFFER
+
+OUTPUT_DIR = Path('/cluster/work/tmstorma/Football2025/tracking/runs/realtime')
+
+# Feed: a match video replayed from START_FRAME to END_FRAME (None = end of video)
+MATCH = 'RBK-AALESUND'
+START_FRAME = 1
+END_FRAME = None
+FPS = 25.0
+
+# Arrival of a frame to its tracks being emitted
+LATENCY_BUDGET_MS = 100
+
+# 'drop', 'resolution' or 'skip-ball' (tracking/streaming.py)
+POLICY = 'drop'
+
+# Inference sizes of the player pass, full quality first ('resolution' steps down through them)
+IMGSZ_STEPS = (1280, 960, 640)
+
+# Ball-only pass at full broadcast resolution (the ball is a few pixels wide at 1280)
+BALL_PASS = True
+BALL_IMGSZ = 1920
+BALL = 3
+
+# Tracked frames buffered for downstream consumers (the oldest is discarded when full)
+OUTPUT_QUEUE_SIZE = 64
+
+def detect_frame(model, frame, imgsz, ball_pass, device=None):
+    """
+    Detections (N, 6) x1, y1, x2, y2, conf, cls of one frame and its shape.
+    The ball-only pass replaces the ball detections of the player pass.
+    """
+    result = model.predict(source=frame, conf=DETECT_CONF, iou=DETECT_IOU, imgsz=imgsz,
+                           device=device, verbose=False)[0]
+    det = result.boxes.data.cpu().numpy()
+    if ball_pass:
+        ball = model.predict(source=frame, conf=DETECT_CONF, iou=DETECT_IOU, imgsz=BALL_IMGSZ, classes=[BALL],
+                             device=device, verbose=False)[0]
+        det = np.concatenate([det[det[:, 5] != BALL], ball.boxes.data.cpu().numpy()])
+    return det, result.orig_shape
+
+def warm_up(model, device=None):
+    """Run every inference size once, so the first frames are not slowed by initialization"""
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    for imgsz in IMGSZ_STEPS:
+        detect_frame(model, frame, imgsz, ball_pass=False, device=device)
+    if BALL_PASS:
+        detect_frame(model, frame, IMGSZ_STEPS[0], ball_pass=True, device=device)
+
+def mot_consumer(output_queue, mot_path):
+    """Downstream consumer: MOT rows of every emitted frame, until None arrives"""
+    with open(mot_path, 'w') as f:
+        while True:
+            item = output_queue.get()
+            if item is None:
+                break
+            frame_number, det, _ = item
+            f.write(mot_text(det, frame_number))
+
+def stream_match(model, video_path, output_queue, frame_log, device=None):
+    """
+    Track a replayed video frame by frame as it arrives, logging each frame to frame_log.
+    Returns the counters of dropped / overwritten / discarded frames.
+    """
+    tracker = ByteTrack.from_config(TRACKER_CONFIG)
+    controller = LatencyController(POLICY, LATENCY_BUDGET_MS, IMGSZ_STEPS)
+    counters = Counter()
+
+    with LiveSource(video_path, fps=FPS, start=START_FRAME, end=END_FRAME, buffer_size=SOURCE_BUFFER) as source:
+        while True:
+            item = source.get(max_age=controller.max_age)
+            if item is None:
+                break
+            (frame_number, frame, arrival), dropped = item
+            counters['dropped'] += dropped
+
+            processing_start = time.perf_counter()
+            imgsz, ball_pass = controller.imgsz, BALL_PASS and controller.ball_pass
+            det, orig_shape = detect_frame(model, frame, imgsz, ball_pass, device=device)
+            # Frames without detections do not advance the tracker, as in model.track
+            tracks = tracker.update(det) if len(det) else np.empty((0, 8), dtype=np.float32)
+            out = box_detections(tracks[:, :7], orig_shape)
+
+            now = time.perf_counter()
+            latency_ms = 1000 * (now - arrival)
+            counters['output_discarded'] += put_latest(output_queue, (frame_number, out, latency_ms))
+            controller.update(latency_ms, 1000 * (now - processing_start), source.pending())
+
+            frame_log.append(frame_number, latency_ms, imgsz, ball_pass, len(out))
+            if len(frame_log) % 250 == 0:
+                print(f"  Frame {frame_number}: {latency_ms:.1f} ms (imgsz {imgsz}, "
+                      f"ball pass {'on' if ball_pass else 'off'}, {counters['dropped']} dropped)")
+
+        counters['overruns'] = source.overruns
+    return counters
+
+def main():
+    print("="*60)
+    print("Real-time Streaming Tracking")
+    print("="*60)
+    print(f"  Model: {MODEL_PATH}")
+    print(f"  Backend: {BACKEND}")
+    print(f"  Match: {MATCH} (frames {START_FRAME}-{END_FRAME or 'end'}, replayed at {FPS:g} fps)")
+    print(f"  Latency budget: {LATENCY_BUDGET_MS} ms")
+    print(f"  Policy: {POLICY}")
+    print(f"  Player pass: imgsz {IMGSZ_STEPS[0]}" + (f" (steps {IMGSZ_STEPS})" if POLICY == 'resolution' else ''))
+    print(f"  Ball pass: {f'imgsz {BALL_IMGSZ}' if BALL_PASS else 'off'}")
+    print(f"  Output: {OUTPUT_DIR}")
+
+    video_path = find_video(MATCH)
+    if video_path is None:
+        raise FileNotFoundError(f"No video found for {MATCH}")
+
+    print("\nLoading trained model...")
+    device = backend_device(BACKEND)
+    model = load_model(MODEL_PATH, BACKEND)
+    warm_up(model, device=device)
+    print("Model loaded and warmed up")
+
+    match_dir = OUTPUT_DIR / MATCH
+    match_dir.mkdir(parents=True, exist_ok=True)
+    output_queue = queue.Queue(maxsize=OUTPUT_QUEUE_SIZE)
+    consumer = threading.Thread(target=mot_consumer, args=(output_queue, match_dir / 'mot.txt'), daemon=True)
+    consumer.start()
+
+    print(f"\nStreaming {video_path}...")
+    start = time.perf_counter()
+    try:
+        with FrameLog(match_dir / 'frames.jsonl') as frame_log:
+            counters = stream_match(model, video_path, output_queue, frame_log, device=device)
+    finally:
+        output_queue.put(None)
+        consumer.join()
+    elapsed = time.perf_counter() - start
+
+    tracked = len(frame_log)
+    summary = latency_summary(frame_log.latencies_ms, LATENCY_BUDGET_MS)
+    received = tracked + counters['dropped'] + counters['overruns']
+    report = {
+        'match': MATCH,
+        'policy': POLICY,
+        'latency_budget_ms': LATENCY_BUDGET_MS,
+        'fps': FPS,
+        'frames_received': received,
+        'frames_tracked': tracked,
+        'frames_dropped': counters['dropped'],
+        'source_overruns': counters['overruns'],
+        'output_discarded': counters['output_discarded'],
+        'tracked_fps': tracked / elapsed if elapsed > 0 else 0.0,
+        'latency': summary,
+        'imgsz_frames': {str(k): v for k, v in sorted(frame_log.imgsz_frames.items())},
+        'ball_pass_frames': frame_log.ball_pass_frames,
+        'frames_path': str(frame_log.path),
+        'recent_frames': list(frame_log.recent),
+    }
+
+    print("\n" + "="*60)
+    print("Latency (frame arrival to tracks emitted)")
+    print("="*60)
+    if tracked:
+        print(f"  p50: {summary['p50_ms']:.1f} ms")
+        print(f"  p95: {summary['p95_ms']:.1f} ms")
+        print(f"  p99: {summary['p99_ms']:.1f} ms")
+        print(f"  max: {summary['max_ms']:.1f} ms")
+        print(f"  Over budget: {100 * summary['over_budget']:.1f}% of tracked frames")
+    print(f"\n  Frames received: {received}")
+    print(f"  Frames tracked: {tracked} ({report['tracked_fps']:.1f} fps)")
+    print(f"  Dropped by policy: {counters['dropped']}")
+    print(f"  Overwritten in capture buffer: {counters['overruns']}")
+    print(f"  Discarded from output queue: {counters['output_discarded']}")
+    print(f"  Frames per player imgsz: {report['imgsz_frames']}")
+    if BALL_PASS:
+        print(f"  Ball pass: {report['ball_pass_frames']}/{tracked} frames")
+
+    report_path = OUTPUT_DIR / f'{MATCH}_{POLICY}.json'
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to: {report_path}")
+    print(f"Per-frame records: {frame_log.path}")
+    print(f"Tracks (MOT): {match_dir / 'mot.txt'}")
+
+if __name__ == '__main__':
+    main()
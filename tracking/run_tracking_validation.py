@@ -2,11 +2,601 @@
 """
 Object Tracking on Validation Set
 Step 3.3: Apply ByteTrack to validation frames
+
+Streaming pipeline: frames are decoded ahead of inference into a bounded
+buffer, label files and MOT rows are written by a background thread and statistics are
+accumulated per frame, so memory stays flat for any sequence length.
 """
 
-from ultralytics import YOLO
 from pathlib import Path
+import cv2
 import json
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from itertools import chain, islice
+
+# Add repository root to path for the shared media and tracking packages
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from media.framestore import open_store, iter_frames, prefetch_frames
+from media.video import find_video, load_video_index
+from tracking.export import CLS, TRACK_ID, frame_detections, box_detections, yolo_text, mot_text
+from tracking.autotune import autotune, apply_threads, tuned_batch_size
+from tracking.backend import load_model, backend_device
+from tracking.ball_tiling import PLAYER_IMGSZ, TILE_SIZE, TwoStageDetector, ball_tiling_settings
+from tracking.batching import STRIDE, predict_grouped
+from tracking.bytetrack import ByteTrack
+from tracking.detection_cache import (CACHE_DIR, CACHE_CONF, cache_settings, cache_dir, sequence_path,
+                                      DetectionCacheWriter, load_detections)
+from tracking.checkpoint import (save_checkpoint, load_checkpoint, checkpoint_key, remove_checkpoint,
+                                 resumed_mot_text)
+from tracking.parallel import run_in_processes, reset_tracker
+from tracking.profiling import StageProfiler, load_timings, write_stage_report, print_stage_summary
+
+# Inference backend: 'pytorch', or 'onnx' / 'openvino' on CPU nodes (tracking/backend.py)
+BACKEND = 'pytorch'
+
+# Tracker: 'ultralytics' (model.track) or 'vectorized' (tracking/bytetrack.py, same
+# config and IDs; model.predict detects, the in-repo ByteTrack assigns IDs)
+TRACKER = 'ultralytics'
+
+# Detection thresholds of the tracking runs
+DETECT_CONF = 0.3
+DETECT_IOU = 0.7
+
+# Store the raw detections down to CACHE_CONF (tracking/detection_cache.py) while tracking;
+# tracking then uses the in-repo ByteTrack, which gives the same IDs as model.track
+CACHE_DETECTIONS = False
+
+# Tracker-only run: replay the cached detections of MODEL_PATH/BACKEND (no frames, no model)
+REPLAY_DETECTIONS = False
+
+# Decode frames from the match video (media/video.py) when one exists
+USE_VIDEO = True
+
+# Feed decoded frames from the frame store (media/build_frame_stores.py) when it exists
+USE_FRAME_STORE = True
+
+# Threads decoding PNGs (or paging in frame store frames) ahead of inference
+DECODE_WORKERS = 4
+
+# Decoded frames buffered ahead of inference (~6 MB each at 1920x1080)
+PREFETCH_FRAMES = 32
+
+# Label files and MOT rows buffered for the writer thread
+WRITE_QUEUE_SIZE = 256
+
+# Save a checkpoint every CHECKPOINT_FRAMES frames (tracking/checkpoint.py) and resume
+# from it when restarted (e.g. after SLURM preemption); tracks with the in-repo ByteTrack,
+# whose state can be saved, with the same IDs as model.track
+CHECKPOINT = False
+CHECKPOINT_FRAMES = 250
+
+# Record per-frame stage timings (decode, preprocess, forward, NMS, tracking, output;
+# tracking/profiling.py): <match>/stage_timings.json and an aggregate stage_timings.json/.csv
+PROFILE_STAGES = False
+
+# Group each batch's frames by resolution and run every group at its own rectangular
+# input shape, boxes mapped back in one step (tracking/batching.py); in-repo tracker only
+GROUPED_INFERENCE = False
+
+# Detect players at a lower resolution and the ball on full-resolution tiles around its
+# predicted position, every tile while it is lost, merged with class-aware NMS
+# (tracking/ball_tiling.py); in-repo tracker only
+BALL_TILING = False
+
+# Calibrate batch size and torch intra-/inter-op threads once per host and model
+# (tracking/autotune.py, cached); sequential runs only, parallel workers split the CPUs
+AUTOTUNE = False
+
+# Frames per inference batch when AUTOTUNE is off (fits a 16 GB P100 at imgsz 1280)
+DEFAULT_BATCH_SIZE = 8
+
+# Track every sequence in its own process (own model and tracker, torch threads split
+# over the CPUs, tracking/parallel.py); False tracks them one after another
+PARALLEL = False
+
+def new_tracking_stats():
+    """
+    Running summary statistics. Size depends on the number of tracks, not frames,
+    so memory stays flat however long a sequence is.
+    """
+    return {
+        'frames_processed': 0,
+        'total_detections': 0,
+        'track_ids_per_class': {0: set(), 1: set(), 2: set(), 3: set()},
+    }
+
+def update_tracking_stats(stats, det, dataset_name):
+    """
+    Add one frame's detections (tracking.export.frame_detections) to the running statistics.
+    Track IDs restart at 1 in every sequence, so they are counted as (sequence, ID) pairs.
+    """
+    stats['frames_processed'] += 1
+    stats['total_detections'] += len(det)
+
+    # Collect track IDs per class
+    tracked = det[det[:, TRACK_ID] >= 0]
+    for cls_id, track_ids in stats['track_ids_per_class'].items():
+        track_ids.update((dataset_name, track_id)
+                         for track_id in tracked[tracked[:, CLS] == cls_id, TRACK_ID].astype(int).tolist())
+
+def merge_tracking_stats(stats, other):
+    """Add the statistics of another sequence (e.g. from a worker process)"""
+    stats['frames_processed'] += other['frames_processed']
+    stats['total_detections'] += other['total_detections']
+    for cls_id, track_ids in other['track_ids_per_class'].items():
+        stats['track_ids_per_class'][cls_id].update(track_ids)
+
+def tracking_stats_to_json(stats):
+    """Running statistics as JSON values (for checkpoints)"""
+    return {
+        'frames_processed': stats['frames_processed'],
+        'total_detections': stats['total_detections'],
+        'track_ids_per_class': {str(cls_id): sorted(track_ids)
+                                for cls_id, track_ids in stats['track_ids_per_class'].items()},
+    }
+
+def tracking_stats_from_json(data):
+    """Inverse of tracking_stats_to_json()"""
+    return {
+        'frames_processed': data['frames_processed'],
+        'total_detections': data['total_detections'],
+        'track_ids_per_class': {int(cls_id): {tuple(pair) for pair in pairs}
+                                for cls_id, pairs in data['track_ids_per_class'].items()},
+    }
+
+def result_writer(write_queue, errors):
+    """
+    Writer thread: write (path, text, append) items until None arrives.
+    append=True streams into one open file per path (the MOT file of a sequence),
+    otherwise the file is replaced (per-frame labels).
+    Errors are collected (and the queue still drained) so the producer never blocks.
+    Streams are flushed whenever the queue runs empty, so after write_queue.join()
+    everything queued before is written (checkpoints rely on this).
+    """
+    streams = {}
+    try:
+        while True:
+            item = write_queue.get()
+            try:
+                if item is None:
+                    break
+                if errors:
+                    continue
+                path, text, append = item
+                try:
+                    if append:
+                        if path not in streams:
+                            streams[path] = open(path, 'w')
+                        streams[path].write(text)
+                    else:
+                        with open(path, 'w') as f:
+                            f.write(text)
+                    if write_queue.empty():
+                        for stream in streams.values():
+                            stream.flush()
+                except OSError as e:
+                    errors.append(e)
+            finally:
+                write_queue.task_done()
+    finally:
+        for stream in streams.values():
+            stream.close()
+
+@contextmanager
+def result_writer_thread():
+    """
+    Queue of (path, text, append) items written by a background thread.
+    On exit waits for the remaining items and raises the first write error.
+    """
+    write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+    errors = []
+    writer = threading.Thread(target=result_writer, args=(write_queue, errors), daemon=True)
+    writer.start()
+    try:
+        yield write_queue
+    finally:
+        write_queue.put(None)
+        writer.join()
+    if errors:
+        raise errors[0]
+
+# Validation inputs
+MODEL_PATH = Path('/cluster/work/tmstorma/Football2025/training/runs/yolov8s_4class2/weights/best.pt')
+VAL_DIR = Path('/cluster/work/tmstorma/Football2025/dataset/images/val')
+TRACKER_CONFIG = Path('/cluster/work/tmstorma/Football2025/tracking/bytetrack_custom.yaml')
+
+# Process each dataset separately to avoid tracking across matches
+# Frame numbers refer to image filenames (e.g., frame_001623.png)
+# These correspond to XML frames + 1 (image 001623 = XML frame 1622)
+VALIDATION_SEQUENCES = [
+    ('RBK-AALESUND', list(range(1623, 1803))),  # frames 1623-1802 (180 frames)
+    ('RBK-FREDRIKSTAD', list(range(1636, 1817))),  # frames 1636-1816 (181 frames) - FIXED
+    ('RBK-HamKam', list(range(1372, 1524)))  # frames 1372-1523 (152 frames)
+]
+
+def sequence_output_dir(output_dir, dataset_name):
+    """Create output_dir/<match>/labels and return output_dir/<match>"""
+    dataset_output_dir = output_dir / dataset_name
+    (dataset_output_dir / 'labels').mkdir(parents=True, exist_ok=True)
+    return dataset_output_dir
+
+def queue_frame_outputs(write_queue, dataset_output_dir, dataset_name, frame_number, det):
+    """Queue the YOLO label file and MOT rows of one frame for the writer thread"""
+    # MOT frame = image frame number (XML frame + 1), as in gt.txt
+    label_file = dataset_output_dir / 'labels' / f"{dataset_name}_frame_{frame_number:06d}.txt"
+    write_queue.put((label_file, yolo_text(det), False))
+    write_queue.put((dataset_output_dir / 'mot.txt', mot_text(det, frame_number), True))
+
+def detect_batch(model, frames, conf, device, profiler, two_stage=None):
+    """
+    [((N, 6) detections, orig_shape)] of a batch of BGR frames: from a TwoStageDetector
+    (tracking/ball_tiling.py) when given, else grouped by resolution with per-resolution
+    input shapes when GROUPED_INFERENCE is set (tracking/batching.py)
+    """
+    if two_stage is not None:
+        return two_stage.detect(frames)
+    if GROUPED_INFERENCE:
+        detections = predict_grouped(model, frames, batch_size=len(frames), conf=conf, iou=DETECT_IOU,
+                                     device=device, profiler=profiler)
+        return [(det, frame.shape[:2]) for det, frame in zip(detections, frames)]
+
+    start = time.perf_counter()
+    results = model.predict(source=frames, conf=conf, iou=DETECT_IOU, device=device, verbose=False)
+    profiler.add_results(results, 1000 * (time.perf_counter() - start), 'other')
+    return [(result.boxes.data.cpu().numpy(), result.orig_shape) for result in results]
+
+def track_frame(tracker, det, orig_shape):
+    """
+    In-repo ByteTrack update of one frame's (N, 6) detections, as (N, 11) export rows.
+    Like model.track: frames without detections do not advance the tracker, and when no
+    track is output the detections are kept without IDs.
+    """
+    tracks = tracker.update(det) if len(det) else ()
+    return box_detections(tracks[:, :7] if len(tracks) else det, orig_shape)
+
+def sequence_key(model_file, tracker_config, frame_numbers, ball_tiling=BALL_TILING, cache=None):
+    """
+    Everything a sequence's tracking output depends on (tracking/checkpoint.py): model and
+    tracker config hashes, frames, detection thresholds, grouped inference, ball tiling, cache
+    """
+    return checkpoint_key(model_file, tracker_config, frame_numbers, detect_conf=DETECT_CONF,
+                          detect_iou=DETECT_IOU, grouped_inference=GROUPED_INFERENCE,
+                          ball_tiling=ball_tiling_settings() if ball_tiling else None,
+                          cache=str(cache) if cache is not None else None)
+
+def write_sequence_checkpoint(path, key, write_queue, frame_number, tracker, sequence_stats, done=False,
+                              two_stage=None):
+    """
+    Checkpoint after frame_number, once the writer thread has written everything queued so far
+    (with ball tiling, the TwoStageDetector's ball predictor too)
+    """
+    write_queue.join()
+    save_checkpoint(path, {
+        'key': key,
+        'frame': frame_number,
+        'done': done,
+        'tracker': tracker.state_dict(),
+        'ball_tiling': two_stage.state_dict() if two_stage is not None else None,
+        'stats': tracking_stats_to_json(sequence_stats),
+    })
+
+def track_sequence(model, dataset_name, frame_indices, output_dir, write_queue, stats,
+                   val_dir=VAL_DIR, tracker_config=TRACKER_CONFIG, device=None, cache=None, tuning=None,
+                   ball_tiling=BALL_TILING):
+    """
+    Track one sequence, streaming label files and MOT rows to the writer thread.
+    With a cache directory (tracking/detection_cache.py) the raw detections are stored too,
+    batch by batch (a resumed sequence keeps those up to its checkpoint);
+    with autotuned settings (tracking/autotune.py) the batch size fits the frame resolution;
+    with ball_tiling the two-stage detector's activity is saved as <match>/ball_tiling.json.
+    Returns the number of frames processed.
+    """
+    print(f"\n{'='*60}")
+    print(f"Processing {dataset_name} ({len(frame_indices)} frames)")
+    print(f"{'='*60}")
+
+    # Frame source: match video > frame store > PNG files
+    # Frame numbers are image frame numbers (the _frame_XXXXXX suffix)
+    video_path = find_video(dataset_name) if USE_VIDEO else None
+    store = open_store(dataset_name) if USE_FRAME_STORE and video_path is None else None
+
+    if video_path is not None:
+        video_index = load_video_index(video_path)
+        frame_numbers = [i for i in frame_indices if i in video_index]
+    else:
+        # The store holds every frame of a match, the PNGs in val_dir only its validation clip
+        frame_numbers = [i for i in frame_indices
+                         if (store is not None and i in store)
+                         or (val_dir / f"{dataset_name}_frame_{i:06d}.png").exists()]
+
+    if len(frame_numbers) == 0:
+        print(f"  Warning: No frames found for {dataset_name}")
+        return 0
+
+    print(f"  Found {len(frame_numbers)} frames")
+
+    # Create dataset-specific output directory
+    dataset_output_dir = sequence_output_dir(output_dir, dataset_name)
+    checkpoint_path = dataset_output_dir / 'checkpoint.json'
+    total_frames = len(frame_numbers)
+
+    # Each sequence starts with an empty tracker (IDs from 1), as in its own worker process
+    reset_tracker(model)
+    use_in_repo_tracker = (TRACKER == 'vectorized' or cache is not None or CHECKPOINT or GROUPED_INFERENCE
+                           or ball_tiling)
+    tracker = ByteTrack.from_config(tracker_config) if use_in_repo_tracker else None
+    sequence_stats = new_tracking_stats()
+
+    # Resume after the last checkpoint of the same model, config, settings and frames:
+    # restore tracker and statistics, keep the MOT rows so far
+    key = sequence_key(model.ckpt_path, tracker_config, frame_numbers, ball_tiling, cache) if CHECKPOINT else None
+    checkpoint = load_checkpoint(checkpoint_path, key) if CHECKPOINT else None
+    if checkpoint is not None and checkpoint['done']:
+        print(f"  Already completed (checkpoint), skipping")
+        sequence_stats = tracking_stats_from_json(checkpoint['stats'])
+        merge_tracking_stats(stats, sequence_stats)
+        return sequence_stats['frames_processed']
+
+    # Detections are cached per batch; a resumed sequence keeps those up to the checkpoint
+    cache_writer = None
+    if cache is not None:
+        cache_writer = DetectionCacheWriter(sequence_path(cache, dataset_name),
+                                            resume_after=checkpoint['frame'] if checkpoint is not None else None)
+        if checkpoint is not None and cache_writer.num_frames != checkpoint['stats']['frames_processed']:
+            print(f"  Cached detections do not cover the checkpoint, starting over")
+            checkpoint = None
+            cache_writer = DetectionCacheWriter(sequence_path(cache, dataset_name))
+
+    if checkpoint is not None:
+        sequence_stats = tracking_stats_from_json(checkpoint['stats'])
+        tracker.load_state_dict(checkpoint['tracker'])
+        frame_numbers = [i for i in frame_numbers if i > checkpoint['frame']]
+        write_queue.put((dataset_output_dir / 'mot.txt',
+                         resumed_mot_text(dataset_output_dir / 'mot.txt', checkpoint['frame']), True))
+        print(f"  Resuming after frame {checkpoint['frame']} ({len(frame_numbers)} frames left)")
+
+    if store is not None and not all(i in store for i in frame_numbers):
+        print(f"  Frame store incomplete for {dataset_name}, decoding the missing frames from PNGs")
+
+    # Decoded frames are produced ahead of inference into a bounded buffer:
+    # the video decoder thread, or a thread pool reading the store / PNGs
+    if video_path is not None:
+        print(f"  Frame source: video {video_path} ({video_index.fps:.2f} fps)")
+        frames = iter_frames(frame_numbers, None, video_path=video_path)
+    else:
+        if store is not None:
+            print(f"  Frame source: frame store {store.store_dir}")
+            load = lambda i: store[i] if i in store else cv2.imread(str(val_dir / f"{dataset_name}_frame_{i:06d}.png"))
+        else:
+            print(f"  Frame source: PNG files ({DECODE_WORKERS} decode threads)")
+            load = lambda i: cv2.imread(str(val_dir / f"{dataset_name}_frame_{i:06d}.png"))
+        frames = prefetch_frames(frame_numbers, load, workers=DECODE_WORKERS, prefetch=PREFETCH_FRAMES)
+
+    print(f"  Processing {len(frame_numbers)} frames with ByteTrack...")
+
+    # Process frames in batches to avoid OOM
+    batch_size = DEFAULT_BATCH_SIZE
+    if tuning is not None:
+        first = next(frames, None)
+        if first is not None:
+            batch_size = tuned_batch_size(tuning, first[1].shape)
+            frames = chain([first], frames)
+        print(f"  Autotuned batch size: {batch_size}")
+    frame_count = sequence_stats['frames_processed']
+    last_checkpoint = frame_count
+    profiler = StageProfiler(PROFILE_STAGES)
+    # A resumed sequence follows the ball from the checkpointed predictor state
+    two_stage = TwoStageDetector(model, CACHE_CONF if cache is not None else DETECT_CONF, DETECT_IOU,
+                                 device=device, profiler=profiler) if ball_tiling else None
+    if two_stage is not None and checkpoint is not None:
+        two_stage.load_state_dict(checkpoint['ball_tiling'])
+
+    while True:
+        start = time.perf_counter()
+        batch = list(islice(frames, batch_size))
+        if not batch:
+            break
+        profiler.add('decode', 1000 * (time.perf_counter() - start), len(batch))
+
+        # Track this batch with persist=True to maintain state across batches
+        # (decoded BGR arrays, Ultralytics treats them like cv2.imread output)
+        if tracker is not None:
+            # The in-repo tracker keeps its own state across batches
+            detections = detect_batch(model, [frame for _, frame in batch],
+                                      CACHE_CONF if cache is not None else DETECT_CONF, device, profiler, two_stage)
+            if cache is not None:
+                # Cache every detection, track the ones above the tracking threshold
+                cache_writer.append([(frame_number, det, orig_shape)
+                                     for (det, orig_shape), (frame_number, _) in zip(detections, batch)])
+                detections = [(det[det[:, 4] >= DETECT_CONF], orig_shape) for det, orig_shape in detections]
+            with profiler.stage('track', frames=len(batch)):
+                frame_dets = [track_frame(tracker, det, orig_shape) for det, orig_shape in detections]
+        else:
+            # Ultralytics tracks inside the call: the time besides Results.speed is the tracker
+            start = time.perf_counter()
+            results = model.track(
+                source=[frame for _, frame in batch],
+                tracker=str(tracker_config),
+                save=False,  # We'll save manually
+                conf=DETECT_CONF,
+                iou=DETECT_IOU,
+                save_txt=False,
+                persist=True,  # CRITICAL: maintain tracker state across batches
+                stream=False,  # Process batch at once
+                device=device,
+                verbose=False
+            )
+            profiler.add_results(results, 1000 * (time.perf_counter() - start), 'track')
+            # One host transfer per frame (in the loop below); statistics, YOLO labels and MOT rows all use it
+            frame_dets = map(frame_detections, results)
+
+        with profiler.stage('write', frames=len(batch)):
+            for det, (frame_number, _) in zip(frame_dets, batch):
+                frame_count += 1
+                update_tracking_stats(sequence_stats, det, dataset_name)
+                queue_frame_outputs(write_queue, dataset_output_dir, dataset_name, frame_number, det)
+
+                if frame_count % 50 == 0:
+                    print(f"  Processed {frame_count}/{total_frames} frames")
+
+        if CHECKPOINT and frame_count - last_checkpoint >= CHECKPOINT_FRAMES:
+            write_sequence_checkpoint(checkpoint_path, key, write_queue, batch[-1][0], tracker, sequence_stats,
+                                      two_stage=two_stage)
+            last_checkpoint = frame_count
+
+        del batch, frame_dets
+
+    # The cache is complete before the checkpoint marks the sequence done
+    if cache_writer is not None:
+        num_cached = cache_writer.finalize()
+        print(f"  Cached {num_cached} detections in {sequence_path(cache, dataset_name)}")
+
+    if CHECKPOINT:
+        write_sequence_checkpoint(checkpoint_path, key, write_queue, None, tracker, sequence_stats, done=True,
+                                  two_stage=two_stage)
+    merge_tracking_stats(stats, sequence_stats)
+    profiler.save(dataset_output_dir / 'stage_timings.json')
+
+    if two_stage is not None:
+        ball_summary = two_stage.summary()
+        with open(dataset_output_dir / 'ball_tiling.json', 'w') as f:
+            json.dump(ball_summary, f, indent=2)
+        print(f"  Ball pass: {ball_summary.get('followed_frames', 0)} frames around the predicted ball, "
+              f"{ball_summary.get('lost_frames', 0)} on all tiles ({ball_summary['tiles_per_frame']:.1f} tiles/frame), "
+              f"input pixels {100 * ball_summary['compute_share']:.0f}% of single-pass detection")
+
+    print(f"  Completed {dataset_name}: {frame_count} frames processed")
+    return frame_count
+
+def replay_sequence(cache, dataset_name, frame_indices, output_dir, write_queue, stats,
+                    tracker_config=TRACKER_CONFIG):
+    """
+    Tracker-only run of one sequence: its cached detections go through the in-repo
+    ByteTrack, with the same outputs as track_sequence. Returns the number of frames processed.
+    """
+    path = sequence_path(cache, dataset_name)
+    if not path.exists():
+        raise FileNotFoundError(f"No cached detections for {dataset_name} at {path} "
+                                f"(run once with CACHE_DETECTIONS = True)")
+
+    wanted = set(frame_indices)
+    frames = [frame for frame in load_detections(path, min_conf=DETECT_CONF) if frame[0] in wanted]
+    dataset_output_dir = sequence_output_dir(output_dir, dataset_name)
+    tracker = ByteTrack.from_config(tracker_config)
+    profiler = StageProfiler(PROFILE_STAGES)
+
+    for frame_number, det, orig_shape in frames:
+        with profiler.stage('track'):
+            det = track_frame(tracker, det, orig_shape)
+        with profiler.stage('write'):
+            update_tracking_stats(stats, det, dataset_name)
+            queue_frame_outputs(write_queue, dataset_output_dir, dataset_name, frame_number, det)
+    profiler.save(dataset_output_dir / 'stage_timings.json')
+
+    print(f"  {dataset_name}: {len(frames)} frames replayed")
+    return len(frames)
+
+def tracking_summary(stats):
+    """JSON summary of the running statistics"""
+    class_names = {0: 'home', 1: 'away', 2: 'referee', 3: 'ball'}
+    frames_processed = stats['frames_processed']
+    total_detections = stats['total_detections']
+    return {
+        'frames_processed': frames_processed,
+        'total_detections': total_detections,
+        'avg_detections_per_frame': total_detections / frames_processed if frames_processed > 0 else 0,
+        'unique_tracks_per_class': {
+            class_names[cls_id]: len(track_ids)
+            for cls_id, track_ids in stats['track_ids_per_class'].items()
+        }
+    }
+
+def track_sequence_worker(model_path, backend, dataset_name, frame_indices, output_dir,
+                          val_dir=VAL_DIR, tracker_config=TRACKER_CONFIG, device=None, cache=None):
+    """Worker process: track one sequence with its own model, tracker and writer thread"""
+    model = load_model(model_path, backend)
+    stats = new_tracking_stats()
+    with result_writer_thread() as write_queue:
+        track_sequence(model, dataset_name, frame_indices, output_dir, write_queue, stats,
+                       val_dir=val_dir, tracker_config=tracker_config, device=device, cache=cache)
+    return stats
+
+def remove_sequence_checkpoints(output_dir, sequences):
+    """Drop the sequences' checkpoints once the whole run is written (a rerun starts afresh)"""
+    for dataset_name, _ in sequences:
+        remove_checkpoint(output_dir / dataset_name / 'checkpoint.json')
+
+def write_tracking_summary(stats, output_dir):
+    """Save tracking_summary.json and return the summary"""
+    summary = tracking_summary(stats)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_dir / 'tracking_summary.json', 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+def report_stage_timings(output_dir, sequences=VALIDATION_SEQUENCES):
+    """Aggregate the sequences' stage_timings.json into output_dir/stage_timings.json/.csv"""
+    sequence_timings = {dataset_name: load_timings(output_dir / dataset_name / 'stage_timings.json')
+                        for dataset_name, _ in sequences
+                        if (output_dir / dataset_name / 'stage_timings.json').exists()}
+    if not sequence_timings:
+        return None
+    return write_stage_report(sequence_timings, output_dir)
+
+def track_validation_set(model, output_dir, sequences=VALIDATION_SEQUENCES, val_dir=VAL_DIR,
+                         tracker_config=TRACKER_CONFIG, device=None, cache=None, tuning=None,
+                         ball_tiling=BALL_TILING):
+    """
+    Track all validation sequences into output_dir/<match>/{labels/, mot.txt}.
+    Returns the summary dict (also saved as output_dir/tracking_summary.json).
+    """
+    # Summary statistics are accumulated per frame, so no Results are kept around
+    stats = new_tracking_stats()
+
+    # Label files and MOT rows are written by a background thread while inference runs
+    with result_writer_thread() as write_queue:
+        for dataset_name, frame_indices in sequences:
+            track_sequence(model, dataset_name, frame_indices, output_dir, write_queue, stats,
+                           val_dir=val_dir, tracker_config=tracker_config, device=device, cache=cache,
+                           tuning=tuning, ball_tiling=ball_tiling)
+
+    # Finished sequences keep their done checkpoint until here, so a requeued run skips them
+    if CHECKPOINT:
+        remove_sequence_checkpoints(output_dir, sequences)
+    return write_tracking_summary(stats, output_dir)
+
+def replay_validation_set(cache, output_dir, sequences=VALIDATION_SEQUENCES, tracker_config=TRACKER_CONFIG):
+    """track_validation_set() from cached detections (tracker only, seconds on a CPU)"""
+    stats = new_tracking_stats()
+    with result_writer_thread() as write_queue:
+        for dataset_name, frame_indices in sequences:
+            replay_sequence(cache, dataset_name, frame_indices, output_dir, write_queue, stats,
+                            tracker_config=tracker_config)
+
+    return write_tracking_summary(stats, output_dir)
+
+def track_validation_set_parallel(model_path, backend, output_dir, sequences=VALIDATION_SEQUENCES,
+                                  val_dir=VAL_DIR, tracker_config=TRACKER_CONFIG, device=None, workers=None,
+                                  cache=None):
+    """
+    track_validation_set() with one worker process per sequence.
+    Outputs (labels/, mot.txt, tracking_summary.json) are identical to a serial run.
+    """
+    jobs = [(model_path, backend, dataset_name, frame_indices, output_dir, val_dir, tracker_config, device, cache)
+            for dataset_name, frame_indices in sequences]
+
+    stats = new_tracking_stats()
+    for sequence_stats in run_in_processes(track_sequence_worker, jobs, workers):
+        merge_tracking_stats(stats, sequence_stats)
+
+    if CHECKPOINT:
+        remove_sequence_checkpoints(output_dir, sequences)
+    return write_tracking_summary(stats, output_dir)
 
 def main():
     print("="*60)
@@ -14,13 +604,26 @@ def main():
     print("="*60)
 
     # Paths
-    model_path = Path('/cluster/work/tmstorma/Football2025/training/runs/yolov8s_4class2/weights/best.pt')
-    val_dir = Path('/cluster/work/tmstorma/Football2025/dataset/images/val')
-    tracker_config = Path('/cluster/work/tmstorma/Football2025/tracking/bytetrack_custom.yaml')
+    model_path = MODEL_PATH
+    val_dir = VAL_DIR
+    tracker_config = TRACKER_CONFIG
     output_dir = Path('/cluster/work/tmstorma/Football2025/tracking/runs/val_tracking')
 
     print(f"\nConfiguration:")
     print(f"  Model: {model_path}")
+    print(f"  Backend: {BACKEND}")
+    print(f"  Tracker: {TRACKER}")
+    print(f"  Mode: {'one process per sequence' if PARALLEL else 'sequential'}")
+    if CACHE_DETECTIONS or REPLAY_DETECTIONS:
+        print(f"  Detections: {'replayed from' if REPLAY_DETECTIONS else 'cached in'} {CACHE_DIR}")
+    if CHECKPOINT:
+        print(f"  Checkpoints: every {CHECKPOINT_FRAMES} frames (resumes where a previous run stopped)")
+    if PROFILE_STAGES:
+        print(f"  Stage timings: on")
+    if BALL_TILING:
+        print(f"  Ball tiling: players at imgsz {PLAYER_IMGSZ}, ball on {TILE_SIZE}px full-resolution tiles")
+    if AUTOTUNE:
+        print(f"  Autotune: {'off (parallel workers split the CPUs)' if PARALLEL else 'batch size and threads'}")
     print(f"  Validation images: {val_dir}")
     print(f"  Tracker config: {tracker_config}")
     print(f"  Output directory: {output_dir}")
@@ -37,10 +640,33 @@ def main():
     val_images = sorted(val_dir.glob('*.png'))
     print(f"\nFound {len(val_images)} validation images")
 
-    # Load model
-    print("\nLoading trained model...")
-    model = YOLO(str(model_path))
-    print("Model loaded successfully")
+    # Detection cache of this model, backend and inference settings
+    cache = None
+    if CACHE_DETECTIONS or REPLAY_DETECTIONS:
+        settings = cache_settings(model_path, BACKEND)
+        if BALL_TILING:
+            settings['ball_tiling'] = ball_tiling_settings()
+        if GROUPED_INFERENCE:
+            # Rectangular per-resolution inputs (settings['imgsz'] is their long side)
+            settings['grouped_inference'] = True
+            settings['stride'] = STRIDE
+        cache = cache_dir(settings)
+
+    # Batch size and threads of this host and model (calibrated before the model is loaded,
+    # inter-op threads can only be set before the first parallel op)
+    tuning = None
+    if AUTOTUNE and not PARALLEL and not REPLAY_DETECTIONS:
+        print()
+        tuning = autotune(model_path, BACKEND, image_path=val_images[0] if val_images else None)
+        apply_threads(tuning)
+        print(f"Autotuned: {tuning['intra_op_threads']} intra-op / {tuning['inter_op_threads']} inter-op threads, "
+              f"batch size {tuning['batch_size']}")
+
+    # Load model (worker processes load their own, replay needs none)
+    if not PARALLEL and not REPLAY_DETECTIONS:
+        print("\nLoading trained model...")
+        model = load_model(model_path, BACKEND)
+        print("Model loaded successfully")
 
     # Run tracking
     print("\n" + "="*60)
@@ -56,137 +682,40 @@ def main():
     print("  - conf=0.3: ByteTrack uses low/high thresholds for robustness")
     print()
 
-    # Process each dataset separately to avoid tracking across matches
-    # Frame numbers refer to image filenames (e.g., frame_001623.png)
-    # These correspond to XML frames + 1 (image 001623 = XML frame 1622)
-    datasets = [
-        ('RBK-AALESUND', list(range(1623, 1803))),  # frames 1623-1802 (180 frames)
-        ('RBK-FREDRIKSTAD', list(range(1636, 1817))),  # frames 1636-1816 (181 frames) - FIXED
-        ('RBK-HamKam', list(range(1372, 1524)))  # frames 1372-1523 (152 frames)
-    ]
-
-    all_results = []
-    for dataset_name, frame_indices in datasets:
-        print(f"\n{'='*60}")
-        print(f"Processing {dataset_name} ({len(frame_indices)} frames)")
-        print(f"{'='*60}")
-
-        # Get frames for this dataset
-        dataset_frames = [val_dir / f"{dataset_name}_frame_{i:06d}.png" for i in frame_indices]
-        dataset_frames = [f for f in dataset_frames if f.exists()]
-
-        if len(dataset_frames) == 0:
-            print(f"  Warning: No frames found for {dataset_name}")
-            continue
-
-        print(f"  Found {len(dataset_frames)} frames")
+    if REPLAY_DETECTIONS:
+        print(f"Replaying cached detections from {cache}")
+        summary = replay_validation_set(cache, output_dir)
+    elif PARALLEL:
+        summary = track_validation_set_parallel(model_path, BACKEND, output_dir, device=backend_device(BACKEND),
+                                                cache=cache)
+    else:
+        summary = track_validation_set(model, output_dir, device=backend_device(BACKEND), cache=cache,
+                                       tuning=tuning)
 
-        print(f"  Processing {len(dataset_frames)} frames with ByteTrack...")
-
-        # Create dataset-specific output directory
-        dataset_output_dir = output_dir / dataset_name
-        dataset_output_dir.mkdir(parents=True, exist_ok=True)
-        (dataset_output_dir / 'labels').mkdir(exist_ok=True)
-
-        # Process frames in batches to avoid OOM
-        # Use batch_size=8 to stay within GPU memory limits (P100 has 16GB)
-        batch_size = 8
-        frame_count = 0
-
-        for batch_start in range(0, len(dataset_frames), batch_size):
-            batch_end = min(batch_start + batch_size, len(dataset_frames))
-            batch_frames = dataset_frames[batch_start:batch_end]
-
-            # Track this batch with persist=True to maintain state across batches
-            results = model.track(
-                source=[str(f) for f in batch_frames],
-                tracker=str(tracker_config),
-                save=False,  # We'll save manually
-                conf=0.3,
-                iou=0.7,
-                save_txt=False,
-                persist=True,  # CRITICAL: maintain tracker state across batches
-                stream=False,  # Process batch at once
-                verbose=False
-            )
-
-            # Process results
-            for idx, (result, frame_path) in enumerate(zip(results, batch_frames)):
-                all_results.append(result)
-                frame_count += 1
-                global_idx = batch_start + idx
-
-                # Save tracking results manually in YOLO format
-                original_frame_name = frame_path.stem
-                label_file = dataset_output_dir / 'labels' / f'{original_frame_name}.txt'
-
-                # Write tracking results
-                with open(label_file, 'w') as f:
-                    if result.boxes is not None and len(result.boxes) > 0:
-                        boxes = result.boxes
-                        for box_idx in range(len(boxes)):
-                            cls_id = int(boxes.cls[box_idx].cpu().numpy())
-                            bbox = boxes.xywhn[box_idx].cpu().numpy()  # normalized xywh
-                            x, y, w, h = bbox
-
-                            # Include track ID if available
-                            if boxes.id is not None:
-                                track_id = int(boxes.id[box_idx].cpu().numpy())
-                                f.write(f"{cls_id} {x:.6f} {y:.6f} {w:.6f} {h:.6f} {track_id}\n")
-                            else:
-                                f.write(f"{cls_id} {x:.6f} {y:.6f} {w:.6f} {h:.6f}\n")
-
-                if frame_count % 50 == 0:
-                    print(f"  Processed {frame_count}/{len(dataset_frames)} frames")
-
-        print(f"  Completed {dataset_name}: {frame_count} frames processed")
-
-    # Process results and collect tracking statistics
     print("\n" + "="*60)
-    print("Processing tracking results...")
+    print("Tracking statistics")
     print("="*60)
 
-    track_ids_per_class = {0: set(), 1: set(), 2: set(), 3: set()}
-    class_names = {0: 'home', 1: 'away', 2: 'referee', 3: 'ball'}
-    total_detections = 0
-    frames_processed = 0
-
-    for result in all_results:
-        frames_processed += 1
-        if result.boxes is not None and len(result.boxes) > 0:
-            boxes = result.boxes
-            total_detections += len(boxes)
-
-            # Collect track IDs per class
-            if boxes.id is not None:
-                for cls_id, track_id in zip(boxes.cls.cpu().numpy(), boxes.id.cpu().numpy()):
-                    track_ids_per_class[int(cls_id)].add(int(track_id))
-
     print(f"\nTracking Summary:")
-    print(f"  Frames processed: {frames_processed}")
-    print(f"  Total detections: {total_detections}")
-    print(f"  Average detections per frame: {total_detections/frames_processed:.1f}")
+    print(f"  Frames processed: {summary['frames_processed']}")
+    print(f"  Total detections: {summary['total_detections']}")
+    print(f"  Average detections per frame: {summary['avg_detections_per_frame']:.1f}")
     print(f"\nUnique Track IDs by Class:")
-    for cls_id, track_ids in track_ids_per_class.items():
-        print(f"  {class_names[cls_id]}: {len(track_ids)} unique tracks")
-
-    # Save summary
-    summary = {
-        'frames_processed': frames_processed,
-        'total_detections': total_detections,
-        'avg_detections_per_frame': total_detections / frames_processed,
-        'unique_tracks_per_class': {
-            class_names[cls_id]: len(track_ids)
-            for cls_id, track_ids in track_ids_per_class.items()
-        }
-    }
+    for class_name, num_tracks in summary['unique_tracks_per_class'].items():
+        print(f"  {class_name}: {num_tracks} unique tracks")
 
     summary_path = output_dir / 'tracking_summary.json'
-    with open(summary_path, 'w') as f:
-        json.dump(summary, f, indent=2)
-
     print(f"\nTracking summary saved to: {summary_path}")
 
+    if PROFILE_STAGES:
+        report = report_stage_timings(output_dir)
+        if report is not None:
+            print("\n" + "="*60)
+            print("Stage timings (ms per frame, all sequences)")
+            print("="*60)
+            print_stage_summary(report['aggregate'])
+            print(f"\nStage timings saved to: {output_dir / 'stage_timings.json'} (.csv)")
+
     print("\n" + "="*60)
     print("Tracking Complete!")
     print("="*60)
@@ -197,7 +726,8 @@ def main():
     print("  - RBK-HamKam/")
     print("\nGenerated files per dataset:")
     print("  - Annotated images with track IDs")
-    print("  - Tracking results in MOT format (labels/*.txt)")
+    print("  - Tracking results in YOLO format with track IDs (labels/*.txt)")
+    print("  - Tracking results in MOT format (mot.txt, read by prepare_hota_data.py)")
     print("\nNext steps:")
     print("  1. Visual inspection of tracked images")
     print("  2. HOTA evaluation using ground truth from XML")
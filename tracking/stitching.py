@@ -0,0 +1,158 @@
+"""
+Chunked tracking: chunk planning and track ID stitching
+
+A long match is split into chunks that share OVERLAP frames with the next
+chunk. Every chunk is tracked independently (track IDs start at 1 in each),
+so the chunks can run on different processes or nodes. Stitching maps the
+chunk-local IDs to one ID space per match: in the shared frames, tracklets of
+consecutive chunks that keep overlapping (same class, IoU >= threshold) get
+the same ID. Each side of a boundary keeps its rows up to the middle of the
+overlap, where both trackers have had half the overlap to settle.
+
+Rows are MOT rows as written by run_tracking_validation.py (mot.txt):
+frame, id, x, y, w, h, conf, class, visibility.
+"""
+
+from collections import Counter
+
+import numpy as np
+
+from tracking.export import MOT_LINE
+
+FRAME, ID, X, Y, W, H, CONF, CLASS = range(8)
+
+
+def plan_chunks(num_frames, chunk_frames, overlap):
+    """
+    [start, end) index ranges covering num_frames frames; consecutive chunks share
+    overlap frames. The last chunk absorbs a remainder shorter than the overlap.
+    """
+    # Overlaps of one chunk with its two neighbours must not overlap each other
+    if 2 * overlap > chunk_frames:
+        raise ValueError(f"overlap ({overlap}) must be at most half of chunk_frames ({chunk_frames})")
+    chunks = []
+    start = 0
+    while True:
+        end = min(start + chunk_frames, num_frames)
+        if num_frames - end <= overlap:
+            chunks.append((start, num_frames))
+            return chunks
+        chunks.append((start, end))
+        start = end - overlap
+
+
+def load_mot(path):
+    """MOT rows of a file as an (N, 9) float array (empty if the file has no rows)"""
+    rows = np.loadtxt(path, delimiter=',', ndmin=2) if path.stat().st_size > 0 else np.empty((0, 9))
+    return rows.reshape(-1, 9)
+
+
+def write_mot(rows, path):
+    """Write MOT rows sorted by frame and ID"""
+    rows = rows[np.lexsort((rows[:, ID], rows[:, FRAME]))]
+    with open(path, 'w') as f:
+        f.write(''.join(MOT_LINE % tuple(row) for row in rows))
+
+
+def box_iou(a, b):
+    """IoU matrix of (N, 4) and (M, 4) boxes in x, y, w, h"""
+    a_x2, a_y2 = a[:, 0] + a[:, 2], a[:, 1] + a[:, 3]
+    b_x2, b_y2 = b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+    inter_w = np.clip(np.minimum(a_x2[:, None], b_x2) - np.maximum(a[:, None, 0], b[:, 0]), 0, None)
+    inter_h = np.clip(np.minimum(a_y2[:, None], b_y2) - np.maximum(a[:, None, 1], b[:, 1]), 0, None)
+    inter = inter_w * inter_h
+    union = (a[:, 2] * a[:, 3])[:, None] + b[:, 2] * b[:, 3] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def _greedy_pairs(scores):
+    """One-to-one (i, j) pairs with positive score, highest score first"""
+    pairs = []
+    used_i, used_j = set(), set()
+    for flat in np.argsort(-scores, axis=None):
+        i, j = np.unravel_index(flat, scores.shape)
+        if scores[i, j] <= 0:
+            break
+        if i not in used_i and j not in used_j:
+            pairs.append((i, j))
+            used_i.add(i)
+            used_j.add(j)
+    return pairs
+
+
+def match_tracklets(prev_rows, cur_rows, shared_frames, iou_threshold=0.5, min_frames=3):
+    """
+    Match track IDs of two chunks on their shared frames.
+    Every shared frame votes for the one-to-one box pairs (same class, IoU >= iou_threshold);
+    ID pairs with at least min_frames votes are matched greedily, most votes first.
+    Returns {current chunk ID: previous chunk ID}.
+    """
+    votes = Counter()
+    for frame in shared_frames:
+        prev = prev_rows[prev_rows[:, FRAME] == frame]
+        cur = cur_rows[cur_rows[:, FRAME] == frame]
+        if len(prev) == 0 or len(cur) == 0:
+            continue
+        iou = box_iou(prev[:, X:H + 1], cur[:, X:H + 1])
+        iou[prev[:, CLASS][:, None] != cur[:, CLASS]] = 0
+        iou[iou < iou_threshold] = 0
+        for i, j in _greedy_pairs(iou):
+            votes[int(prev[i, ID]), int(cur[j, ID])] += 1
+
+    id_map = {}
+    used_prev = set()
+    for (prev_id, cur_id), count in votes.most_common():
+        if count < min_frames:
+            break
+        if cur_id not in id_map and prev_id not in used_prev:
+            id_map[cur_id] = prev_id
+            used_prev.add(prev_id)
+    return id_map
+
+
+def stitch_tracks(chunk_rows, chunk_frames, iou_threshold=0.5, min_frames=3):
+    """
+    Merge the MOT rows of consecutive chunks into one ID space.
+    chunk_rows: MOT rows per chunk (chunk-local IDs); chunk_frames: frame numbers per chunk.
+    Returns (rows, report) where report counts continued and new tracks per boundary.
+    """
+    next_id = 1
+    output = []
+    report = []
+    pending = None  # rows of the previous chunk (global IDs) not yet emitted
+
+    for k, rows in enumerate(chunk_rows):
+        id_map = {}
+        if k > 0:
+            shared = sorted(set(chunk_frames[k - 1]) & set(chunk_frames[k]))
+            id_map = match_tracklets(pending, rows, shared, iou_threshold, min_frames)
+
+            # Tracks present in the overlap that were not continued
+            cur_in_overlap = set(rows[np.isin(rows[:, FRAME], shared), ID].astype(int).tolist())
+            prev_in_overlap = set(pending[np.isin(pending[:, FRAME], shared), ID].astype(int).tolist())
+            report.append({
+                'boundary': k,
+                'shared_frames': len(shared),
+                'continued': len(id_map),
+                'new_in_overlap': len(cur_in_overlap - set(id_map)),
+                'ended_in_overlap': len(prev_in_overlap - set(id_map.values())),
+            })
+
+            split = shared[len(shared) // 2] if shared else chunk_frames[k][0]
+            output.append(pending[pending[:, FRAME] < split])
+            rows = rows[rows[:, FRAME] >= split]
+
+        # Unmatched chunk-local IDs get new global IDs (in order of first appearance)
+        rows = rows.copy()
+        local_ids = rows[:, ID].astype(int)
+        for local_id in dict.fromkeys(local_ids.tolist()):
+            if local_id not in id_map:
+                id_map[local_id] = next_id
+                next_id += 1
+        rows[:, ID] = [id_map[i] for i in local_ids]
+        pending = rows
+
+    if pending is not None:
+        output.append(pending)
+    rows = np.concatenate(output) if output else np.empty((0, 9))
+    return rows, report
@@ -0,0 +1,283 @@
+"""
+Live-feed tracking under a latency budget
+
+LiveSource stands in for a broadcast feed: it replays a match video at a fixed
+frame rate, each frame becoming available at its presentation time whether
+or not the tracker is ready for it. Frames wait in a small capture buffer;
+when it is full the oldest frame is overwritten (an overrun), like a capture
+card's ring buffer, so a tracker that falls behind never builds up an
+unbounded backlog.
+
+LatencyController decides per frame how to catch up when the latency (frame
+arrival to tracks emitted) exceeds the budget, according to a policy:
+
+    'drop'        skip waiting frames that can no longer be tracked within the budget
+    'resolution'  step the inference size down (and back up once there is headroom)
+    'skip-ball'   skip the full-resolution ball-only pass until there is headroom
+
+Tracked frames go to downstream consumers through a bounded output queue;
+a consumer that cannot keep up loses the oldest frames, never blocks tracking.
+"""
+
+import json
+import queue
+import threading
+import time
+from array import array
+from collections import Counter, deque
+
+import numpy as np
+
+from media.video import VideoReader
+
+POLICIES = ('drop', 'resolution', 'skip-ball')
+
+# Frames held by the capture buffer before the oldest is overwritten
+SOURCE_BUFFER = 8
+
+# Smoothing of the processing time estimate (exponential moving average)
+PROCESSING_EMA = 0.1
+
+# Per-frame records kept in memory for the report (all of them are streamed to disk)
+RECENT_FRAMES = 250
+
+# A degraded controller steps back up after this many frames under RECOVER_RATIO * budget
+RECOVER_FRAMES = 25
+RECOVER_RATIO = 0.7
+
+
+class LiveSource:
+    """
+    A video replayed in real time.
+
+        with LiveSource(path, fps=25) as source:
+            while (item := source.get()) is not None:
+                (frame_number, frame, arrival), dropped = item
+
+    arrival is the time.perf_counter() at which the frame became available
+    (its presentation time, or later if decoding could not keep up).
+    """
+
+    def __init__(self, video_path, fps=25.0, start=1, end=None, buffer_size=SOURCE_BUFFER):
+        self.video_path = video_path
+        self.fps = fps
+        self.start = start
+        self.end = end
+        self.frames = deque(maxlen=buffer_size)
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.done = False
+        self.overruns = 0
+        self.error = None
+        self.thread = None
+
+    def _replay(self):
+        try:
+            with VideoReader(self.video_path, start=self.start, end=self.end) as reader:
+                start_time = None
+                for k, (frame_number, frame) in enumerate(reader):
+                    if start_time is None:
+                        start_time = time.perf_counter()
+                    # Wait for the frame's presentation time (stop_event ends the wait early)
+                    delay = start_time + k / self.fps - time.perf_counter()
+                    if delay > 0 and self.stop_event.wait(delay):
+                        break
+                    if self.stop_event.is_set():
+                        break
+                    with self.condition:
+                        if len(self.frames) == self.frames.maxlen:
+                            self.overruns += 1
+                        self.frames.append((frame_number, frame, time.perf_counter()))
+                        self.condition.notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            with self.condition:
+                self.done = True
+                self.condition.notify()
+
+    def start_replay(self):
+        """Start the feed (the first frame is available immediately)"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._replay, daemon=True)
+            self.thread.start()
+
+    def pending(self):
+        """Frames waiting in the capture buffer"""
+        with self.condition:
+            return len(self.frames)
+
+    def get(self, max_age=None):
+        """
+        ((frame_number, frame, arrival), dropped) of the oldest waiting frame, blocking
+        until one arrives; None when the feed has ended. With max_age (seconds), waiting
+        frames older than that are dropped as long as a newer one is waiting.
+        """
+        self.start_replay()
+        with self.condition:
+            while not self.frames and not self.done:
+                self.condition.wait()
+            if not self.frames:
+                if self.error is not None:
+                    raise self.error
+                return None
+            dropped = 0
+            if max_age is not None:
+                now = time.perf_counter()
+                while len(self.frames) > 1 and now - self.frames[0][2] > max_age:
+                    self.frames.popleft()
+                    dropped += 1
+            return self.frames.popleft(), dropped
+
+    def close(self):
+        """Stop the feed"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LatencyController:
+    """
+    Degradation level driven by the measured latency.
+    Level 0 is full quality; 'resolution' has one level per entry of imgsz_steps,
+    'skip-ball' has two (ball pass on / off), 'drop' never degrades (it drops frames).
+    """
+
+    def __init__(self, policy, budget_ms, imgsz_steps, recover_frames=RECOVER_FRAMES,
+                 recover_ratio=RECOVER_RATIO):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy '{policy}' (expected one of {POLICIES})")
+        self.policy = policy
+        self.budget_ms = budget_ms
+        self.imgsz_steps = list(imgsz_steps)
+        self.recover_frames = recover_frames
+        self.recover_ratio = recover_ratio
+        self.level = 0
+        self.headroom_frames = 0
+        self.processing_ms = None
+
+    @property
+    def max_level(self):
+        if self.policy == 'resolution':
+            return len(self.imgsz_steps) - 1
+        return 1 if self.policy == 'skip-ball' else 0
+
+    @property
+    def imgsz(self):
+        """Inference size of the player/full pass"""
+        return self.imgsz_steps[self.level if self.policy == 'resolution' else 0]
+
+    @property
+    def ball_pass(self):
+        """Whether the ball-only pass runs"""
+        return not (self.policy == 'skip-ball' and self.level > 0)
+
+    @property
+    def max_age(self):
+        """
+        Frames older than this (seconds) are dropped by LiveSource.get(), None keeps all:
+        with 'drop', frames that would miss the budget given the expected processing time
+        """
+        if self.policy != 'drop':
+            return None
+        return max(self.budget_ms - (self.processing_ms or 0.0), 0.0) / 1000
+
+    def update(self, latency_ms, processing_ms, pending=0):
+        """
+        Record the latency and processing time of a frame (and the frames still waiting)
+        and adapt the level
+        """
+        self.processing_ms = processing_ms if self.processing_ms is None else \
+            (1 - PROCESSING_EMA) * self.processing_ms + PROCESSING_EMA * processing_ms
+        if latency_ms > self.budget_ms or pending > 0:
+            self.level = min(self.level + 1, self.max_level)
+            self.headroom_frames = 0
+        elif latency_ms < self.recover_ratio * self.budget_ms:
+            self.headroom_frames += 1
+            if self.headroom_frames >= self.recover_frames:
+                self.level = max(self.level - 1, 0)
+                self.headroom_frames = 0
+        else:
+            self.headroom_frames = 0
+
+
+def put_latest(output_queue, item):
+    """
+    Put an item without blocking; when the queue is full the oldest item is discarded.
+    Returns the number of discarded items.
+    """
+    discarded = 0
+    while True:
+        try:
+            output_queue.put_nowait(item)
+            return discarded
+        except queue.Full:
+            try:
+                output_queue.get_nowait()
+                discarded += 1
+            except queue.Empty:
+                pass
+
+
+def latency_summary(latencies_ms, budget_ms):
+    """p50/p95/p99/max latency and the share of frames over budget"""
+    latencies_ms = np.asarray(latencies_ms, dtype=np.float64)
+    if len(latencies_ms) == 0:
+        return {'frames': 0}
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99]).tolist()
+    return {
+        'frames': len(latencies_ms),
+        'p50_ms': p50,
+        'p95_ms': p95,
+        'p99_ms': p99,
+        'mean_ms': float(latencies_ms.mean()),
+        'max_ms': float(latencies_ms.max()),
+        'over_budget': float((latencies_ms > budget_ms).mean()),
+    }
+
+
+class FrameLog:
+    """
+    Per-frame records of a stream, bounded in memory however long the stream runs.
+
+    Every record is appended to a JSON-lines file as it is logged. In memory
+    remain running aggregates (frames per inference size, ball passes), the
+    latencies as a packed float64 array (8 bytes per frame, for exact
+    percentiles) and a ring of the last `recent` records.
+    """
+
+    def __init__(self, path, recent=RECENT_FRAMES):
+        self.path = path
+        self.file = open(path, 'w', buffering=1)
+        self.latencies_ms = array('d')
+        self.imgsz_frames = Counter()
+        self.ball_pass_frames = 0
+        self.recent = deque(maxlen=recent)
+
+    def __len__(self):
+        return len(self.latencies_ms)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def append(self, frame, latency_ms, imgsz, ball_pass, tracks):
+        """Log one tracked frame"""
+        record = {'frame': frame, 'latency_ms': latency_ms, 'imgsz': imgsz,
+                  'ball_pass': ball_pass, 'tracks': tracks}
+        self.file.write(json.dumps(record) + '\n')
+        self.latencies_ms.append(latency_ms)
+        self.imgsz_frames[imgsz] += 1
+        self.ball_pass_frames += bool(ball_pass)
+        self.recent.append(record)
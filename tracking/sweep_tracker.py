@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+ByteTrack hyperparameter sweep scored by HOTA
+
+Replays the cached validation detections (tracking/detection_cache.py, written
+by run_tracking_validation.py with CACHE_DETECTIONS = True) through the in-repo
+ByteTrack for every configuration of a grid or random search over the tracker
+parameters and the detection conf/iou thresholds. Configurations run in a
+process pool; each worker tracks, writes trackers/<config>/<seq>/data.txt and
+scores it with TrackEval (HOTA, CLEAR, Identity) against a shared gt/.
+
+Outputs in runs/tracker_sweep/: sweep_results.csv and .json (ranked by HOTA),
+sweep_pareto.png (HOTA against tracker time per frame) and bytetrack_best.yaml.
+"""
+
+import csv
+import itertools
+import json
+import random
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+# Add repository root to path for the shared tracking package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tracking.bytetrack import ByteTrack
+from tracking.detection_cache import cache_settings, cache_dir, sequence_path, load_detections, class_nms
+from tracking.parallel import available_cpus, run_in_processes
+from tracking.prepare_hota_data import prepare_hota_data
+from tracking.run_hota_evaluation import evaluate_hota
+from tracking.run_tracking_validation import (BACKEND, MODEL_PATH, TRACKER_CONFIG, VALIDATION_SEQUENCES,
+                                              DETECT_CONF, DETECT_IOU)
+from tracking.stitching import write_mot
+
+OUTPUT_DIR = Path('/cluster/work/tmstorma/Football2025/tracking/runs/tracker_sweep')
+
+# 'grid' (every combination) or 'random' (RANDOM_CONFIGS samples of the grid values)
+SEARCH = 'grid'
+RANDOM_CONFIGS = 200
+RANDOM_SEED = 0
+
+# Values per parameter; conf/iou are the detection thresholds (iou <= DETECT_IOU,
+# lower values re-run NMS on the cached boxes)
+GRID = {
+    'track_high_thresh': [0.4, 0.5, 0.6],
+    'track_low_thresh': [0.1, 0.2, 0.3],
+    'new_track_thresh': [0.5, 0.6, 0.7],
+    'track_buffer': [15, 30, 60],
+    'match_thresh': [0.7, 0.8, 0.9],
+    'conf': [0.1, 0.3],
+    'iou': [0.7, 0.5],
+}
+
+# Worker processes (one configuration each at a time)
+WORKERS = None  # all allocated CPUs
+
+TRACKER_KEYS = ('track_high_thresh', 'track_low_thresh', 'new_track_thresh', 'track_buffer',
+                'match_thresh', 'fuse_score')
+
+def baseline_params(tracker_config=TRACKER_CONFIG):
+    """Parameters of the current bytetrack_custom.yaml and tracking thresholds"""
+    with open(tracker_config) as f:
+        cfg = yaml.safe_load(f)
+    params = {key: cfg[key] for key in TRACKER_KEYS if key in cfg}
+    return {**params, 'conf': DETECT_CONF, 'iou': DETECT_IOU}
+
+def sweep_configs(grid=GRID, search=SEARCH, count=RANDOM_CONFIGS, seed=RANDOM_SEED):
+    """Parameter dicts of the search (track_low_thresh < track_high_thresh), without duplicates"""
+    keys = list(grid)
+    if search == 'grid':
+        candidates = [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+    elif search == 'random':
+        rng = random.Random(seed)
+        candidates = [{key: rng.choice(grid[key]) for key in keys} for _ in range(count)]
+    else:
+        raise ValueError(f"Unknown search '{search}' (expected 'grid' or 'random')")
+
+    configs = {}
+    for params in candidates:
+        if params['track_low_thresh'] < params['track_high_thresh']:
+            configs.setdefault(tuple(sorted(params.items())), params)
+    return list(configs.values())
+
+@lru_cache(maxsize=None)
+def cached_sequences(cache):
+    """{sequence: [(frame_number, det, orig_shape)]} of the validation frames (loaded once per process)"""
+    sequences = {}
+    for dataset_name, frame_indices in VALIDATION_SEQUENCES:
+        wanted = set(frame_indices)
+        sequences[dataset_name] = [frame for frame in load_detections(sequence_path(cache, dataset_name))
+                                   if frame[0] in wanted]
+    return sequences
+
+def track_cached(frames, params):
+    """
+    MOT rows of one sequence tracked from cached detections with one configuration,
+    and the seconds spent in NMS and ByteTrack.
+    """
+    start = time.perf_counter()
+    tracker = ByteTrack(**{key: params[key] for key in TRACKER_KEYS if key in params})
+    rows = []
+    for frame_number, det, _ in frames:
+        det = det[det[:, 4] >= params['conf']]
+        if params['iou'] < DETECT_IOU:
+            det = class_nms(det, params['iou'])
+        if len(det) == 0:
+            continue
+        tracks = tracker.update(det)
+        if len(tracks):
+            rows.append(np.column_stack([np.full(len(tracks), frame_number), tracks[:, 4], tracks[:, 0], tracks[:, 1],
+                                         tracks[:, 2] - tracks[:, 0], tracks[:, 3] - tracks[:, 1],
+                                         tracks[:, 5], tracks[:, 6], np.ones(len(tracks))]))
+    seconds = time.perf_counter() - start
+    return (np.concatenate(rows) if rows else np.empty((0, 9))), seconds
+
+def sweep_worker(config_id, params, cache, hota_dir, results_dir):
+    """Worker process: track the validation sequences with one configuration and score them"""
+    sequences = cached_sequences(cache)
+    seconds, frames = 0.0, 0
+    for dataset_name, seq_frames in sequences.items():
+        rows, seq_seconds = track_cached(seq_frames, params)
+        seconds += seq_seconds
+        frames += len(seq_frames)
+        seq_dir = hota_dir / 'trackers' / config_id / dataset_name
+        seq_dir.mkdir(parents=True, exist_ok=True)
+        write_mot(rows, seq_dir / 'data.txt')
+
+    metrics = evaluate_hota(hota_dir / 'gt', hota_dir / 'trackers', results_dir,
+                            trackers=[config_id], verbose=False)[config_id]
+    return {
+        'config': config_id,
+        'params': params,
+        'ms_per_frame': 1000 * seconds / max(frames, 1),
+        'metrics': metrics['COMBINED_SEQ'],
+        'sequences': {seq: m for seq, m in metrics.items() if seq != 'COMBINED_SEQ'},
+    }
+
+def pareto_front(rows):
+    """Rows not beaten on both HOTA (higher) and ms/frame (lower) by another row"""
+    front = []
+    for row in sorted(rows, key=lambda r: (r['ms_per_frame'], -r['metrics']['HOTA'])):
+        if not front or row['metrics']['HOTA'] > front[-1]['metrics']['HOTA']:
+            front.append(row)
+    return front
+
+def plot_pareto(rows, front, baseline, output_path):
+    """Scatter of HOTA against tracker time per frame with the Pareto front"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.scatter([r['ms_per_frame'] for r in rows], [r['metrics']['HOTA'] for r in rows],
+               s=12, alpha=0.5, color='#3498db', label='Configurations')
+    ax.plot([r['ms_per_frame'] for r in front], [r['metrics']['HOTA'] for r in front],
+            '-o', color='#e74c3c', markersize=4, label='Pareto front')
+    ax.scatter([baseline['ms_per_frame']], [baseline['metrics']['HOTA']], marker='*', s=200,
+               color='#2ecc71', edgecolor='black', zorder=5, label='bytetrack_custom.yaml')
+    ax.set_xlabel('Tracker time per frame (ms)', fontsize=12)
+    ax.set_ylabel('HOTA (%)', fontsize=12)
+    ax.set_title('ByteTrack Sweep - Accuracy vs Runtime', fontsize=14, fontweight='bold')
+    ax.legend(loc='lower right')
+    ax.grid(alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    plt.close(fig)
+
+def write_results(rows, output_dir):
+    """Ranked CSV (one column per parameter and metric) and JSON"""
+    param_keys = list(dict.fromkeys(key for row in rows for key in row['params']))
+    metric_keys = list(rows[0]['metrics'])
+    with open(output_dir / 'sweep_results.csv', 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['rank', 'config', *param_keys, 'ms_per_frame', *metric_keys])
+        for rank, row in enumerate(rows, 1):
+            writer.writerow([rank, row['config'], *(row['params'].get(k, '') for k in param_keys),
+                             f"{row['ms_per_frame']:.4f}", *(row['metrics'][k] for k in metric_keys)])
+    with open(output_dir / 'sweep_results.json', 'w') as f:
+        json.dump(rows, f, indent=2)
+
+def write_best_config(params, output_path, tracker_config=TRACKER_CONFIG):
+    """bytetrack_custom.yaml with the tracker parameters of the best configuration"""
+    with open(tracker_config) as f:
+        cfg = yaml.safe_load(f)
+    cfg.update({key: params[key] for key in TRACKER_KEYS if key in params})
+    with open(output_path, 'w') as f:
+        f.write(f"# Best HOTA of tracking/sweep_tracker.py; detection conf={params['conf']}, iou={params['iou']}\n")
+        yaml.safe_dump(cfg, f, sort_keys=False)
+
+def main():
+    print("="*80)
+    print("ByteTrack Hyperparameter Sweep - HOTA on Cached Detections")
+    print("="*80)
+
+    cache = cache_dir(cache_settings(MODEL_PATH, BACKEND))
+    missing = [name for name, _ in VALIDATION_SEQUENCES if not sequence_path(cache, name).exists()]
+    if missing:
+        raise FileNotFoundError(f"No cached detections for {', '.join(missing)} in {cache} "
+                                f"(run run_tracking_validation.py with CACHE_DETECTIONS = True)")
+
+    configs = sweep_configs()
+    workers = WORKERS or available_cpus()
+    print(f"  Detections: {cache}")
+    print(f"  Search: {SEARCH}, {len(configs)} configurations on {workers} workers")
+    print(f"  Output: {OUTPUT_DIR}")
+
+    # Ground truth once (written by prepare_hota_data next to the baseline run)
+    print("\n" + "="*80)
+    print("Baseline (bytetrack_custom.yaml)")
+    print("="*80)
+    hota_dir = OUTPUT_DIR / 'hota_data'
+    baseline_dir = OUTPUT_DIR / 'baseline'
+    params = baseline_params()
+    for dataset_name, frames in cached_sequences(cache).items():
+        (baseline_dir / dataset_name).mkdir(parents=True, exist_ok=True)
+        write_mot(track_cached(frames, params)[0], baseline_dir / dataset_name / 'mot.txt')
+    prepare_hota_data(baseline_dir, hota_dir, tracker_name='baseline')
+
+    print("\n" + "="*80)
+    print(f"Sweeping {len(configs)} configurations")
+    print("="*80)
+    start = time.perf_counter()
+    jobs = [('baseline', params, cache, hota_dir, OUTPUT_DIR / 'hota_results')]
+    jobs += [(f'config_{i:04d}', p, cache, hota_dir, OUTPUT_DIR / 'hota_results') for i, p in enumerate(configs)]
+    rows = run_in_processes(sweep_worker, jobs, workers)
+    print(f"  Done in {time.perf_counter() - start:.0f}s")
+
+    rows.sort(key=lambda r: -r['metrics']['HOTA'])
+    baseline = next(r for r in rows if r['config'] == 'baseline')
+    front = pareto_front(rows)
+    write_results(rows, OUTPUT_DIR)
+    plot_pareto(rows, front, baseline, OUTPUT_DIR / 'sweep_pareto.png')
+    write_best_config(rows[0]['params'], OUTPUT_DIR / 'bytetrack_best.yaml')
+
+    print("\n" + "="*80)
+    print("Top configurations (combined HOTA)")
+    print("="*80)
+    print(f"{'Rank':>4} {'Config':<12} {'high':>5} {'low':>5} {'new':>5} {'buf':>4} {'match':>5} {'conf':>5} "
+          f"{'iou':>4} {'HOTA':>7} {'IDF1':>7} {'MOTA':>7} {'IDSW':>5} {'ms/fr':>6}")
+    for rank, row in enumerate(rows, 1):
+        if rank > 20 and row is not baseline:
+            continue
+        p, m = row['params'], row['metrics']
+        print(f"{rank:>4} {row['config']:<12} {p.get('track_high_thresh', '-'):>5} {p.get('track_low_thresh', '-'):>5} "
+              f"{p.get('new_track_thresh', '-'):>5} {p.get('track_buffer', '-'):>4} {p.get('match_thresh', '-'):>5} {p['conf']:>5} "
+              f"{p['iou']:>4} {m['HOTA']:>7.2f} {m['IDF1']:>7.2f} {m['MOTA']:>7.2f} {m['IDSW']:>5} "
+              f"{row['ms_per_frame']:>6.2f}")
+
+    print(f"\nPareto front: {len(front)} configurations")
+    print(f"Best HOTA: {rows[0]['metrics']['HOTA']:.2f} ({rows[0]['config']}) vs baseline "
+          f"{baseline['metrics']['HOTA']:.2f}")
+    print(f"\nResults saved to: {OUTPUT_DIR}")
+
+if __name__ == '__main__':
+    main()
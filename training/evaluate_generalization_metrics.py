@@ -4,45 +4,52 @@ Compute detection metrics (Precision, Recall, mAP) for generalization datasets
 with merged player class (home+away+referee → player)
 """
 
-from ultralytics import YOLO
 from pathlib import Path
-import xml.etree.ElementTree as ET
+import sys
+import time
 import numpy as np
 import json
 
-def parse_xml_annotations(xml_path, frame_number):
-    """Parse XML to get ground truth boxes for a specific frame"""
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
+# Add repository root to path for the shared annotations and tracking packages
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
+from annotations.cache import load_annotations
+from annotations.index import FrameIndex
+from tracking.export import CLS, CONF, X1, Y1, X2, Y2, frame_detections
+from tracking.backend import load_model, backend_device
+from tracking.profiling import StageProfiler, profiled_results, write_stage_report, print_stage_summary
+
+# Inference backend: 'pytorch', or 'onnx' / 'openvino' on CPU nodes (tracking/backend.py)
+BACKEND = 'pytorch'
+
+# Record per-frame stage timings (image loading, preprocess, forward, NMS, metric
+# computation; tracking/profiling.py) next to metrics.json
+PROFILE_STAGES = False
+
+def frame_ground_truth(frame_index, frame_number):
+    """Get ground truth boxes for a specific frame from a prebuilt FrameIndex"""
     boxes = []
-    for track in root.findall('.//track'):
-        label = track.get('label')
-        for box in track.findall('box'):
-            if int(box.get('frame')) == frame_number:
-                xtl = float(box.get('xtl'))
-                ytl = float(box.get('ytl'))
-                xbr = float(box.get('xbr'))
-                ybr = float(box.get('ybr'))
-
-                # Map label to merged class
-                # For VIKING/BODO: label is "player" or "ball"
-                # All players (home/away/referee) are labeled as "player"
-                if label == 'player':
-                    merged_label = 'player'
-                elif label == 'ball':
-                    merged_label = 'ball'
-                else:
-                    # For other datasets with separate labels
-                    if label in ['home', 'away', 'referee', 'home_player']:
-                        merged_label = 'player'
-                    else:
-                        continue
-
-                boxes.append({
-                    'label': merged_label,
-                    'bbox': [xtl, ytl, xbr, ybr]
-                })
+    for box in frame_index.boxes(frame_number):
+        label = box.label
+
+        # Map label to merged class
+        # For VIKING/BODO: label is "player" or "ball"
+        # All players (home/away/referee) are labeled as "player"
+        if label == 'player':
+            merged_label = 'player'
+        elif label == 'ball':
+            merged_label = 'ball'
+        else:
+            # For other datasets with separate labels
+            if label in ['home', 'away', 'referee', 'home_player']:
+                merged_label = 'player'
+            else:
+                continue
+
+        boxes.append({
+            'label': merged_label,
+            'bbox': [box.xtl, box.ytl, box.xbr, box.ybr]
+        })
 
     return boxes
 
@@ -107,82 +114,98 @@ def main():
     # Paths
     model_path = Path('/cluster/work/tmstorma/Football2025/training/runs/yolov8s_4class2/weights/best.pt')
 
+    # 'frames': None evaluates every annotated frame of the match
     datasets = [
         {
             'name': 'RBK-VIKING',
             'xml': '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-VIKING/annotations.xml',
             'img_dir': '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-VIKING/data/images/train',
-            'frames': [99, 499]  # XML frame numbers (0-indexed)
+            'frames': None
+        },
+        {
+            'name': 'RBK-BODO-part1',
+            'xml': '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-BODO/part1/RBK_BODO_PART1/annotations.xml',
+            'img_dir': '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-BODO/part1/RBK_BODO_PART1/data/images/train',
+            'frames': None
+        },
+        {
+            'name': 'RBK-BODO-part2',
+            'xml': '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-BODO/part2/RBK_BODO_PART2/annotations.xml',
+            'img_dir': '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-BODO/part2/RBK_BODO_PART2/data/images/train',
+            'frames': None
         },
         {
             'name': 'RBK-BODO-part3',
             'xml': '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-BODO/part3/RBK_BODO_PART3/annotations.xml',
             'img_dir': '/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-BODO/part3/RBK_BODO_PART3/data/images/train',
-            'frames': [99, 499]
+            'frames': None
         }
     ]
 
     # Load model
     print("\nLoading model...")
-    model = YOLO(str(model_path))
+    model = load_model(model_path, BACKEND)
 
     all_results = []
+    sequence_timings = {}
 
     for dataset in datasets:
         print(f"\n{'='*80}")
         print(f"Processing {dataset['name']}")
         print(f"{'='*80}")
 
-        for frame_idx in dataset['frames']:
-            img_path = Path(dataset['img_dir']) / f"frame_{frame_idx+1:06d}.png"
-
-            print(f"\nFrame {frame_idx+1:06d}:")
+        # Parse the XML once; every frame lookup after this is a slice
+        table = load_annotations(dataset['xml'])
+        frame_index = FrameIndex(table)
+
+        img_dir = Path(dataset['img_dir'])
+        frames = dataset['frames'] if dataset['frames'] is not None else range(table.frames)
+        frames = [f for f in frames if (img_dir / f"frame_{f+1:06d}.png").exists()]
+        print(f"Evaluating {len(frames)} frames")
+
+        # Stream predictions so results are not all kept in memory
+        # (images are read inside the stream: the time besides Results.speed is decoding)
+        profiler = StageProfiler(PROFILE_STAGES)
+        results = model.predict(
+            source=[str(img_dir / f"frame_{f+1:06d}.png") for f in frames],
+            conf=0.25,
+            iou=0.7,
+            stream=True,
+            device=backend_device(BACKEND),
+            verbose=False
+        )
+
+        for n, (frame_idx, result) in enumerate(zip(frames, profiled_results(results, profiler, 'decode')), 1):
+            start = time.perf_counter()
 
             # Get ground truth
-            gt_boxes = parse_xml_annotations(dataset['xml'], frame_idx)
+            gt_boxes = frame_ground_truth(frame_index, frame_idx)
             gt_player = [b for b in gt_boxes if b['label'] == 'player']
             gt_ball = [b for b in gt_boxes if b['label'] == 'ball']
 
-            print(f"  Ground truth: {len(gt_player)} players, {len(gt_ball)} balls")
-
-            # Run inference
-            results = model.predict(
-                source=str(img_path),
-                conf=0.25,
-                iou=0.7,
-                verbose=False
-            )
-
-            result = results[0]
-            boxes = result.boxes
+            # All boxes of the frame in one host transfer
+            det = frame_detections(result)
 
             # Convert predictions to merged classes
             pred_boxes = []
-            if len(boxes) > 0:
-                for i in range(len(boxes)):
-                    cls_id = int(boxes.cls[i].cpu().numpy())
-                    conf = float(boxes.conf[i].cpu().numpy())
-                    xyxy = boxes.xyxy[i].cpu().numpy()
-
-                    # Merge classes: 0=home, 1=away, 2=referee → player; 3=ball → ball
-                    if cls_id in [0, 1, 2]:
-                        label = 'player'
-                    elif cls_id == 3:
-                        label = 'ball'
-                    else:
-                        continue
-
-                    pred_boxes.append({
-                        'label': label,
-                        'bbox': [float(xyxy[0]), float(xyxy[1]), float(xyxy[2]), float(xyxy[3])],
-                        'conf': conf
-                    })
+            for cls_id, conf, x1, y1, x2, y2 in det[:, [CLS, CONF, X1, Y1, X2, Y2]].tolist():
+                # Merge classes: 0=home, 1=away, 2=referee → player; 3=ball → ball
+                if cls_id in [0, 1, 2]:
+                    label = 'player'
+                elif cls_id == 3:
+                    label = 'ball'
+                else:
+                    continue
+
+                pred_boxes.append({
+                    'label': label,
+                    'bbox': [x1, y1, x2, y2],
+                    'conf': conf
+                })
 
             pred_player = [b for b in pred_boxes if b['label'] == 'player']
             pred_ball = [b for b in pred_boxes if b['label'] == 'ball']
 
-            print(f"  Predictions: {len(pred_player)} players, {len(pred_ball)} balls")
-
             # Compute metrics for mAP@0.5
             prec_player_50, rec_player_50, tp_p_50, fp_p_50, fn_p_50 = compute_metrics(pred_player, gt_player, iou_threshold=0.5)
             prec_ball_50, rec_ball_50, tp_b_50, fp_b_50, fn_b_50 = compute_metrics(pred_ball, gt_ball, iou_threshold=0.5)
@@ -226,27 +249,32 @@ def main():
             }
 
             all_results.append(result_data)
+            profiler.add('evaluate', 1000 * (time.perf_counter() - start))
+
+            if n % 100 == 0 or n == len(frames):
+                print(f"  {n}/{len(frames)} frames")
 
-            print(f"  Player - Precision: {prec_player_50:.3f}, Recall: {rec_player_50:.3f}")
-            print(f"  Ball   - Precision: {prec_ball_50:.3f}, Recall: {rec_ball_50:.3f}")
+        if profiler.enabled:
+            sequence_timings[dataset['name']] = {stage: np.asarray(values) for stage, values in profiler.timings.items()}
 
     # Print summary table
     print("\n" + "="*80)
     print("\nDETECTION METRICS SUMMARY (Merged Classes)")
     print("="*80)
-    print("\n## Player Detection Metrics\n")
-    print(f"{'Dataset':<20} {'Frame':<18} {'Precision':<12} {'Recall':<10} {'mAP@0.5':<10} {'mAP@0.5:0.95':<12}")
-    print("-" * 80)
-
-    for r in all_results:
-        print(f"{r['dataset']:<20} {r['frame']:<18} {r['player']['precision']:<12.3f} {r['player']['recall']:<10.3f} {r['player']['mAP50']:<10.3f} {r['player']['mAP50_95']:<12.3f}")
-
-    print("\n## Ball Detection Metrics\n")
-    print(f"{'Dataset':<20} {'Frame':<18} {'Precision':<12} {'Recall':<10} {'mAP@0.5':<10} {'mAP@0.5:0.95':<12}")
-    print("-" * 80)
-
-    for r in all_results:
-        print(f"{r['dataset']:<20} {r['frame']:<18} {r['ball']['precision']:<12.3f} {r['ball']['recall']:<10.3f} {r['ball']['mAP50']:<10.3f} {r['ball']['mAP50_95']:<12.3f}")
+    for cls_name, key in [('Player', 'player'), ('Ball', 'ball')]:
+        print(f"\n## {cls_name} Detection Metrics (mean over frames)\n")
+        print(f"{'Dataset':<20} {'Frames':<8} {'Precision':<12} {'Recall':<10} {'mAP@0.5':<10} {'mAP@0.5:0.95':<12}")
+        print("-" * 80)
+
+        for dataset in datasets:
+            rows = [r[key] for r in all_results if r['dataset'] == dataset['name']]
+            if not rows:
+                continue
+            print(f"{dataset['name']:<20} {len(rows):<8} "
+                  f"{np.mean([r['precision'] for r in rows]):<12.3f} "
+                  f"{np.mean([r['recall'] for r in rows]):<10.3f} "
+                  f"{np.mean([r['mAP50'] for r in rows]):<10.3f} "
+                  f"{np.mean([r['mAP50_95'] for r in rows]):<12.3f}")
 
     # Calculate averages
     avg_player_prec = np.mean([r['player']['precision'] for r in all_results])
@@ -291,6 +319,12 @@ def main():
 
     print(f"\n{'='*80}")
     print(f"\nMetrics saved to: {output_file}")
+
+    if PROFILE_STAGES and sequence_timings:
+        report = write_stage_report(sequence_timings, output_file.parent)
+        print("\nStage timings (ms per frame, all datasets):")
+        print_stage_summary(report['aggregate'])
+        print(f"Stage timings saved to: {output_file.parent / 'stage_timings.json'} (.csv)")
     print("\n" + "="*80)
     print("\nNote: mAP@0.5:0.95 is approximated as average of mAP@0.5 and mAP@0.75")
     print("For precise mAP@0.5:0.95, would need to compute at all IoU thresholds 0.5-0.95")
@@ -3,14 +3,22 @@
 Run inference on sample validation images from each dataset
 """
 
-from ultralytics import YOLO
 from pathlib import Path
+import sys
+
+# Add repository root to path for the shared tracking package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tracking.backend import load_model, backend_device
+
+# Inference backend: 'pytorch', or 'onnx' / 'openvino' on CPU nodes (tracking/backend.py)
+BACKEND = 'pytorch'
 
 def main():
     # Load trained model
     model_path = Path('/cluster/work/tmstorma/Football2025/training/runs/yolov8s_4class2/weights/best.pt')
     print(f"Loading model: {model_path}")
-    model = YOLO(str(model_path))
+    model = load_model(model_path, BACKEND)
 
     # Select 2 images from each validation dataset
     val_dir = Path('/cluster/work/tmstorma/Football2025/dataset/images/val')
@@ -48,6 +56,7 @@ def main():
         source=[str(img) for img in test_images if img.exists()],
         conf=0.25,           # Confidence threshold
         iou=0.7,             # NMS IoU threshold
+        device=backend_device(BACKEND),
         save=True,           # Save annotated images
         project=str(output_dir.parent),
         name='inference_results',
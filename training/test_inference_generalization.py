@@ -4,8 +4,16 @@ Run inference on VIKING and BODO-part3 frames
 to verify the model detects home/away/referee correctly despite wrong labels
 """
 
-from ultralytics import YOLO
 from pathlib import Path
+import sys
+
+# Add repository root to path for the shared tracking package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tracking.backend import load_model, backend_device
+
+# Inference backend: 'pytorch', or 'onnx' / 'openvino' on CPU nodes (tracking/backend.py)
+BACKEND = 'pytorch'
 
 def main():
     print("="*60)
@@ -15,7 +23,7 @@ def main():
     # Load trained model
     model_path = Path('/cluster/work/tmstorma/Football2025/training/runs/yolov8s_4class2/weights/best.pt')
     print(f"\nLoading model: {model_path}")
-    model = YOLO(str(model_path))
+    model = load_model(model_path, BACKEND)
 
     # Select test images
     viking_dir = Path('/cluster/projects/vc/courses/TDT17/other/Football2025/RBK-VIKING/data/images/train')
@@ -68,6 +76,7 @@ def main():
             source=str(img_path),
             conf=0.25,
             iou=0.7,
+            device=backend_device(BACKEND),
             save=False,  # Don't auto-save, we'll save manually
             show_labels=True,
             show_conf=True,
@@ -51,6 +51,7 @@ def main():
         'save': True,
         'save_period': 5,  # Save checkpoint every 5 epochs
         'workers': 8,
+        'cache': False,  # 'ram' or 'disk' keeps decoded frames instead of decoding PNGs every epoch
         'device': 0,  # GPU 0
         'project': str(project_dir),
         'name': 'yolov8s_4class2',
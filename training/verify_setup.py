@@ -50,16 +50,24 @@ def check_dataset():
         n_train_labels = len(list(train_labels.glob('*.txt')))
         print(f"  ✓ Train labels: {n_train_labels}")
     else:
-        print(f"  ✗ Train labels directory missing!")
+        print(f"  ✗ Train labels directory missing! (run export_yolo_labels.py)")
         return False
 
     if val_labels.exists():
         n_val_labels = len(list(val_labels.glob('*.txt')))
         print(f"  ✓ Val labels: {n_val_labels}")
     else:
-        print(f"  ✗ Val labels directory missing!")
+        print(f"  ✗ Val labels directory missing! (run export_yolo_labels.py)")
         return False
 
+    # Packed label shards (the converter's output; the .txt labels are exported from them)
+    for split in ['train', 'val']:
+        if (dataset_dir / 'shards' / split / 'index.json').exists():
+            print(f"  ✓ {split.capitalize()} label shard")
+        else:
+            print(f"  ✗ {split.capitalize()} label shard missing! (run xml_to_yolo_converter.py)")
+            return False
+
     print(f"  Dataset OK: {n_train_imgs} train, {n_val_imgs} val images\n")
     return True
 